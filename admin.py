@@ -1,7 +1,20 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from database import get_all_incidents, update_incident, delete_incident
+import os
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from outbox import get_delivery_status
+from metrics import stage_summary, METRICS_WINDOW_SECONDS
+from database import (get_incident_stats, get_incident_page, get_incident, update_incident, delete_incident,
+                      verify_proof, get_proof_preview)
+
+# Reports per page in the admin table
+PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', '25'))
+
+# Categories an admin can assign (must match nlp_model.TRAINING_DATA)
+CATEGORIES = ["Ragging", "Harassment", "Violence", "Verbal Abuse", "Theft",
+              "Safety Concern", "Discrimination", "Other", "Fake/Spam"]
 
 def admin_panel():
     # Reuse the same CSS for consistency
@@ -43,69 +56,188 @@ def admin_panel():
         st.session_state.admin_logged_in = False
         st.rerun()
 
+    reports_tab, performance_tab = st.tabs(["📋 Reports", "⏱️ Performance"])
+    with performance_tab:
+        performance_panel()
+    with reports_tab:
+        reports_panel()
+
+
+def performance_panel():
+    """
+    Per-stage latency percentiles, error rates and throughput for this
+    app process over the last hour (see metrics.py).
+    """
+    st.subheader("⏱️ Pipeline Performance")
+    st.caption(f"Timings recorded by this app process over the last {METRICS_WINDOW_SECONDS // 60} minutes.")
+    summary = stage_summary()
+    if not summary:
+        st.info("No timings recorded yet. Stages are timed as reports are submitted and alerts are sent.")
+        return
+
+    table = pd.DataFrame([{
+        "Stage": row['stage'],
+        "Calls": row['calls'],
+        "Errors": row['errors'],
+        "Error Rate": f"{row['error_rate']:.1%}",
+        "p50 (ms)": round(row['p50_ms'], 1),
+        "p95 (ms)": round(row['p95_ms'], 1),
+        "p99 (ms)": round(row['p99_ms'], 1),
+        "Calls / min": round(row['per_minute'], 2),
+    } for row in summary])
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+    stages = [row['stage'] for row in summary]
+    fig = go.Figure(data=[
+        go.Bar(name=label, x=stages, y=[row[key] for row in summary], marker_color=color)
+        for label, key, color in (("p50", 'p50_ms', '#4ecdc4'), ("p95", 'p95_ms', '#feca57'),
+                                  ("p99", 'p99_ms', '#ff6b6b'))
+    ])
+    fig.update_layout(barmode='group', yaxis_title="ms")
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def reports_panel():
     # ---- Fetch Data ----
-    incidents = get_all_incidents()
+    # Grouped counts computed by the database, cached until the next write
+    stats = get_incident_stats(use_cache=not st.button("🔄 Refresh Data"))
     
-    if incidents is None:
+    if stats is None:
         st.error("Using existing database connection failed. Please check your connection.")
         return
 
-    if not incidents:
+    total_reports = sum(stats["status"].values())
+    if not total_reports:
         st.info("No reports available in the database yet.")
         return
 
-    df = pd.DataFrame(incidents)
-
     # ---- Statistics ----
     st.subheader("📊 Incident Statistics")
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Total Reports", total_reports)
+    for col, status in zip(metric_cols[1:], ["Pending", "Under Review", "Resolved"]):
+        col.metric(status, stats["status"].get(status, 0))
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.caption("Incident Categories")
-        fig_cat = go.Figure(data=[go.Bar(x=df["category"].value_counts().index, y=df["category"].value_counts().values, marker_color='#ff6b6b')])
+        categories = stats["category"]
+        fig_cat = go.Figure(data=[go.Bar(x=list(categories), y=list(categories.values()), marker_color='#ff6b6b')])
         st.plotly_chart(fig_cat, use_container_width=True)
 
     with col2:
         st.caption("Urgency Levels")
-        fig_urg = go.Figure(data=[go.Pie(labels=df["urgency"].value_counts().index, values=df["urgency"].value_counts().values, hole=.3)])
+        urgencies = stats["urgency"]
+        fig_urg = go.Figure(data=[go.Pie(labels=list(urgencies), values=list(urgencies.values()), hole=.3)])
         st.plotly_chart(fig_urg, use_container_width=True)
 
+    st.caption("Reports per Day")
+    days = stats["day"]
+    fig_day = go.Figure(data=[go.Scatter(x=list(days), y=list(days.values()), mode='lines+markers',
+                                         line_color='#4ecdc4')])
+    st.plotly_chart(fig_day, use_container_width=True)
+
     # ---- Update Section ----
     st.divider()
     st.subheader("📋 Manage Reports")
 
-    report_ids = df["report_id"].tolist()
-    selected_id = st.selectbox("Select Report ID to Update", report_ids)
-
-    selected_row = df[df["report_id"] == selected_id].iloc[0]
-
-    col_details, col_action = st.columns([2, 1])
+    # Keyset pagination: cursors[i] is the cursor that loads page i
+    if "page_cursors" not in st.session_state:
+        st.session_state.page_cursors = [None]
+    cursors = st.session_state.page_cursors
+    page_index = len(cursors) - 1
+
+    status_filter = st.selectbox("Filter by Status", ["All", "Pending", "Under Review", "Resolved"],
+                                 key="status_filter", on_change=lambda: st.session_state.update(page_cursors=[None]))
+    page_rows, next_cursor = get_incident_page(cursors[-1], page_size=PAGE_SIZE,
+                                               status=None if status_filter == "All" else status_filter)
+
+    if not page_rows:
+        st.info("No reports on this page.")
+    else:
+        st.dataframe(pd.DataFrame(page_rows), use_container_width=True)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Previous", disabled=page_index == 0):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {page_index + 1}")
+    with col_next:
+        if st.button("Next ➡️", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
 
-    with col_details:
-        st.markdown(f"""
-        **Report ID:** `{selected_id}`  
-        **Location:** {selected_row['location']}  
-        **Time:** {selected_row['timestamp']}  
-        **Description:**  
-        > {selected_row['description']}
-        """)
-    
-    with col_action:
-        st.info(f"Current Status: **{selected_row['status']}**")
-        new_status = st.selectbox("Update Status", ["Pending", "Under Review", "Resolved"], 
-                                key="status_select")
-        remark = st.text_area("Admin Remark", value=selected_row['admin_remark'] or "")
+    if not page_rows:
+        selected_row = None
+    else:
+        report_ids = [row["report_id"] for row in page_rows]
+        selected_id = st.selectbox("Select Report ID to Update", report_ids)
+        # Full record (description, proof, remark) for the selected report only
+        selected_row = get_incident(selected_id)
+
+    if selected_row is not None:
+        col_details, col_action = st.columns([2, 1])
+
+        with col_details:
+            st.markdown(f"""
+            **Report ID:** `{selected_id}`  
+            **Location:** {selected_row['location']}  
+            **Time:** {selected_row['timestamp']}  
+            **Description:**  
+            > {selected_row['description']}
+            """)
+            delivery = get_delivery_status(selected_id)
+            if delivery:
+                alert_note = f"Discord alert: **{delivery['status']}** ({delivery['attempts']} attempt(s))"
+                if delivery['status'] == 'failed' and delivery['last_error']:
+                    alert_note += f" — {delivery['last_error']}"
+                st.caption(alert_note)
+            if selected_row.get('proof'):
+                preview = get_proof_preview(selected_row.get('proof_sha256'))
+                if preview:
+                    # Local proof store: st.image wants a path, not a file:// URL
+                    st.image(url2pathname(urlparse(preview).path) if preview.startswith('file:') else preview,
+                             caption="Preview (metadata stripped)")
+                st.markdown(f"**Evidence:** [original {selected_row.get('proof_type') or 'file'}]"
+                            f"({selected_row['proof']})")
+                if selected_row.get('proof_sha256') and st.button("Verify Evidence Integrity"):
+                    verified = verify_proof(selected_id)
+                    if verified:
+                        st.success(f"SHA-256 matches: `{selected_row['proof_sha256'][:16]}…`")
+                    else:
+                        st.error("Stored evidence does not match its recorded SHA-256")
         
-        if st.button("Update Report"):
-            update_incident(selected_id, new_status, remark)
-            st.success("Updated Successfully!")
-            st.rerun()
+        with col_action:
+            st.info(f"Current Status: **{selected_row['status']}**")
+            new_status = st.selectbox("Update Status", ["Pending", "Under Review", "Resolved"], 
+                                    key="status_select")
+            current_category = selected_row['category'] if selected_row['category'] in CATEGORIES else "Other"
+            new_category = st.selectbox("Category", CATEGORIES, index=CATEGORIES.index(current_category),
+                                        key="category_select")
+            remark = st.text_area("Admin Remark", value=selected_row.get('admin_remark') or "")
+            
+            if st.button("Update Report"):
+                update_incident(selected_id, new_status, remark,
+                                category=new_category if new_category != selected_row['category'] else None)
+                st.success("Updated Successfully!")
+                st.rerun()
 
-        st.markdown("---")
-        if st.button("🗑️ Delete Report", type="primary"):
-            delete_incident(selected_id)
-            st.warning(f"Report {selected_id} deleted.")
-            st.rerun()
+            st.markdown("---")
+            if st.button("🗑️ Delete Report", type="primary"):
+                delete_incident(selected_id)
+                st.warning(f"Report {selected_id} deleted.")
+                st.rerun()
 
-    st.subheader("All Data")
-    st.dataframe(df)
+    # ---- Online Learning ----
+    if os.environ.get('CLASSIFIER_MODE', 'batch') == 'online':
+        st.divider()
+        st.subheader("🧠 Classifier Learning")
+        st.caption("Teach the classifier from reports resolved since the last run.")
+        if st.button("Learn from Resolved Reports"):
+            from nlp_model import learn_from_resolved_incidents
+            with st.spinner("Updating classifier..."):
+                learned = learn_from_resolved_incidents()
+            st.success(f"Learned from {learned} resolved report(s).")
@@ -1,18 +1,95 @@
+import time
+_script_start = time.perf_counter()
+
+import os
+import sys
+import importlib
+import threading
 import streamlit as st
 import uuid
-import requests
-import json
 from datetime import datetime
-from nlp_model import classify_incident, sentiment_score, analyze_incident
-from database import init_db, insert_incident, get_status, upload_proof
-from admin import admin_panel
 
-# Initialize Database
-db_connected = init_db()
+# Heavy modules are imported by the page that needs them (see lazy_import):
+# nlp_model (sklearn, numpy, textblob) on Report, admin (pandas, plotly) on
+# Admin and database (supabase) on pages that read or write incidents.
+
+# Import-time budgets in seconds. The Home page budget covers everything
+# imported above; the module budget applies to each lazy_import.
+HOME_IMPORT_BUDGET = float(os.environ.get("HOME_IMPORT_BUDGET", "1.0"))
+MODULE_IMPORT_BUDGET = float(os.environ.get("MODULE_IMPORT_BUDGET", "3.0"))
+
+@st.cache_resource
+def get_import_times():
+    """
+    Process-wide record of import times in seconds, by module name.
+    """
+    return {}
+
+def lazy_import(module_name):
+    """
+    Imports a module on first use and records how long it took.
+    Prints a warning if the import exceeds MODULE_IMPORT_BUDGET.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    
+    get_import_times()[module_name] = elapsed
+    print(f"Import time: {module_name} {elapsed:.3f}s (budget {MODULE_IMPORT_BUDGET:.1f}s)")
+    if elapsed > MODULE_IMPORT_BUDGET:
+        print(f"Warning: importing {module_name} exceeded the import budget")
+    return module
+
+@st.cache_resource
+def report_startup_imports(_elapsed):
+    """
+    Reports the Home page import time once per process (the leading
+    underscore keeps the argument out of the cache key).
+    """
+    elapsed = _elapsed
+    get_import_times()["home"] = elapsed
+    print(f"Import time: home page {elapsed:.3f}s (budget {HOME_IMPORT_BUDGET:.1f}s)")
+    if elapsed > HOME_IMPORT_BUDGET:
+        print("Warning: Home page imports exceeded the import budget")
+    return elapsed
+
+report_startup_imports(time.perf_counter() - _script_start)
+
+@st.cache_resource
+def resume_alert_delivery():
+    """
+    Resumes delivery of alerts left in the outbox by an earlier run, once per
+    process. Runs in a background thread to keep it off the page's path.
+    """
+    thread = threading.Thread(target=lambda: importlib.import_module("outbox").resume_worker(),
+                              name='outbox-resume', daemon=True)
+    thread.start()
+    return thread
+
+resume_alert_delivery()
+
+@st.cache_resource
+def warm_up_nlp():
+    """
+    Imports the NLP stack and preloads its resources once per process.
+    """
+    nlp_model = lazy_import("nlp_model")
+    nlp_model.warm_up()
+    return nlp_model
 
-if not db_connected:
-    st.error("❌ Database Connection Failed. Please check your Supabase credentials.")
-    st.stop()
+def require_database():
+    """
+    Imports the database module and checks the connection.
+    Stops the page if the database is unavailable.
+    """
+    database = lazy_import("database")
+    if not database.init_db():
+        st.error("❌ Database Connection Failed. Please check your Supabase credentials (or set STORAGE_BACKEND=sqlite).")
+        st.stop()
+    return database
 
 # Page Configuration
 st.set_page_config(
@@ -134,37 +211,6 @@ if st.sidebar.button("🔐 Admin Panel"):
 
 page = st.session_state.page
 
-def send_to_discord(report_id, proof_file, report_data):
-    webhook_url = "https://discordapp.com/api/webhooks/1464631979491201211/gVERDrnBmxhLnIpJIZyHTabE7psdCxrG4WA7Y4frYQ3pOwaB6alyw80OLRMZ7Tvo_Lav"
-    
-    embed = {
-        "title": f"🚨 New Incident Report: {report_id}",
-        "description": report_data['description'],
-        "color": 0xFF6B6B,
-        "fields": [
-            {"name": "📂 Category", "value": report_data['category'], "inline": True},
-            {"name": "⚠️ Urgency", "value": report_data['urgency'], "inline": True},
-            {"name": "📍 Location", "value": report_data['location'], "inline": True},
-            {"name": "🧠 Sentiment Score", "value": str(report_data['sentiment']), "inline": True},
-            {"name": "Status", "value": "Pending", "inline": True},
-        ],
-        "footer": {"text": "CampusSafe • Secure Reporting"}
-    }
-    
-    payload = {"embeds": [embed]}
-    
-    try:
-        if proof_file:
-            proof_file.seek(0)
-            files = {"file": (proof_file.name, proof_file.read(), proof_file.type)}
-            response = requests.post(webhook_url, data={"payload_json": json.dumps(payload)}, files=files)
-        else:
-            response = requests.post(webhook_url, json=payload)
-        return True
-    except Exception as e:
-        print(f"Discord Error: {e}")
-        return False
-
 # ---------------- HOME ----------------
 if page == "Home":
     st.markdown("<h1 style='text-align: center;'>🛡️ CampusSafe</h1>", unsafe_allow_html=True)
@@ -182,6 +228,12 @@ if page == "Home":
 
 # ---------------- REPORT ----------------
 elif page == "Report":
+    nlp_model = warm_up_nlp()
+    database = require_database()
+    # Seeds the near-duplicate index once per process, then picks up reports
+    # from other processes at most every INCIDENT_CACHE_TTL seconds
+    database.sync_duplicate_index()
+    
     st.markdown("<div class='card'><h2>📢 Report an Incident</h2></div>", unsafe_allow_html=True)
     
     with st.form("report_form"):
@@ -221,12 +273,15 @@ elif page == "Report":
             if description and location:
                 # Perform comprehensive analysis
                 with st.spinner("🧠 Analyzing your report with AI..."):
-                    analysis = analyze_incident(description)
+                    analysis = nlp_model.analyze_incident(description)
                 
                 # Check if input is valid
                 if not analysis['valid']:
                     st.error(f"❌ {analysis['error']}")
                 else:
+                    if analysis.get('warning'):
+                        st.warning(analysis['warning'])
+                    
                     # Display AI Analysis Results
                     st.markdown("---")
                     st.markdown("### 🤖 AI Analysis Results")
@@ -290,33 +345,22 @@ elif page == "Report":
                         'sentiment': analysis['sentiment_score'],
                         'timestamp': timestamp,
                         'status': 'Pending',
-                        'proof_type': proof.type if proof else None
+                        'proof_type': proof.type if proof else None,
+                        'model_version': nlp_model.model_version()
                     }
                     
-                    # 1. Upload Proof to Supabase Storage if exists
-                    proof_url = None
-                    if proof:
-                        with st.spinner("📤 Uploading evidence..."):
-                            # Create a unique filename
-                            file_ext = proof.name.split('.')[-1]
-                            file_name = f"{report_id}.{file_ext}"
-                            # Upload
-                            proof_url = upload_proof(proof, file_name)
-                            if not proof_url and proof:
-                                st.warning("⚠️ Warning: Evidence upload failed, but attempting to save report.")
-
-                    # Update data with proof URL
-                    data['proof'] = proof_url
-
-                    # 2. Save to Supabase
+                    # Upload the evidence, save the report and alert Discord,
+                    # overlapping the independent steps (see async_database.py)
                     with st.spinner("💾 Saving report securely..."):
-                        res = insert_incident(data)
+                        submission = lazy_import("async_database").submit_report(data, proof)
+                    res = submission['saved']
+                    
+                    if proof and not submission['proof_uploaded']:
+                        st.warning("⚠️ Warning: Evidence upload failed, but attempting to save report.")
                     
                     if res:
-                        # 3. Send to Discord
-                        discord_sent = send_to_discord(report_id, proof, data)
-                        if not discord_sent:
-                            st.warning("⚠️ Report saved, but failed to alert admin on Discord.")
+                        if not submission['notified']:
+                            st.warning("⚠️ Report saved, but the Discord alert to the admins could not be queued.")
 
                         # SUCCESS STATE
                         st.markdown("""
@@ -352,11 +396,13 @@ elif page == "Report":
 
 # ---------------- TRACK ----------------
 elif page == "Track":
+    database = require_database()
+    
     st.markdown("<div class='card'><h2>🔍 Track Report Status</h2></div>", unsafe_allow_html=True)
     
     rid = st.text_input("Enter Report ID")
     if st.button("Check Status"):
-        res = get_status(rid)
+        res = database.get_status(rid)
         if res:
             status, remark = res
             st.info(f"Status: **{status}**")
@@ -367,4 +413,6 @@ elif page == "Track":
 
 # ---------------- ADMIN ----------------
 elif page == "Admin":
-    admin_panel()
+    require_database()
+    admin = lazy_import("admin")
+    admin.admin_panel()
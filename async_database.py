@@ -0,0 +1,241 @@
+import io
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import database
+import media
+import metrics
+from outbox import enqueue_alert, release_alert
+from evidence import Evidence
+
+# ==================== CONFIGURATION ====================
+
+# Worker threads for blocking database/storage calls (the backends use
+# synchronous clients, so each call runs on this pool)
+IO_POOL_SIZE = int(os.environ.get('IO_POOL_SIZE', '8'))
+
+# Seconds before a single database/storage call is abandoned
+IO_TIMEOUT = float(os.environ.get('IO_TIMEOUT', '30'))
+
+_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix='campussafe-io')
+
+# Fire-and-forget tasks (e.g. storing evidence previews), kept referenced
+# until they finish
+_background_tasks = set()
+
+# One event loop in a background thread serves every Streamlit session
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='campussafe-async', daemon=True).start()
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """
+    Runs a coroutine on the background loop and waits for its result.
+    This is the synchronous facade the Streamlit pages call.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+async def run_io(func, *args, timeout=IO_TIMEOUT):
+    """
+    Runs a blocking call on the I/O pool with a timeout.
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(loop.run_in_executor(_pool, func, *args), timeout)
+
+
+# ==================== ASYNC DATABASE ====================
+
+async def upload_proof_async(file_obj, file_name):
+    return await run_io(database.upload_proof, file_obj, file_name)
+
+
+def _store_proof(evidence, file_name):
+    """
+    Uploads the evidence unless the proof store already holds the same
+    content. Returns (url, reused).
+    """
+    if database.proof_exists(file_name):
+        return database.get_proof_url(file_name), True
+    return database.upload_proof(evidence.reader(), file_name), False
+
+
+async def insert_incident_async(data):
+    return await run_io(database.insert_incident, data)
+
+
+def _read_evidence(proof):
+    """
+    Buffers the upload and starts its preview/thumbnail processing.
+    Returns (evidence, media_job).
+    """
+    evidence = Evidence.from_upload(proof)
+    return evidence, media.submit_processing(evidence)
+
+
+def _media_result(media_job):
+    if media_job is None:
+        return None
+    try:
+        return media_job.result(media.MEDIA_TIMEOUT)
+    except Exception as e:
+        print(f"Media Processing Error: {e}")
+        return None
+
+
+def _insert_and_queue_alert(data, proof, notify, hold=0.0):
+    """
+    Inserts the incident and, in the same step, writes its Discord alert
+    to the durable outbox. hold keeps the alert back while the evidence
+    is being shrunk (see _finish_media).
+    Returns (row, queued).
+    """
+    row = database.insert_incident(data)
+    if not row or not notify:
+        return row, None
+    return row, enqueue_alert(data['report_id'], data, proof, hold=hold)
+
+
+def _finish_media(data, sha256, media_job, alert_name=None, store=True):
+    """
+    Runs in the background once an image is processed. If the report's
+    alert is held (alert_name is its attachment's name), swaps in the
+    preview and releases it; then stores the preview and thumbnail next
+    to the original. Returns the sizes (see media.size_report) or None.
+    """
+    processed = _media_result(media_job)
+    if alert_name:
+        preview = None
+        if processed and processed['bytes_saved'] > 0:
+            preview = (f"{os.path.splitext(alert_name)[0]}.jpg", processed['preview'], 'image/jpeg')
+        release_alert(data['report_id'], data.get('urgency'), preview)
+    if not processed or not store:
+        return None
+    media.record(processed)
+    for file_name, content in ((media.preview_name(sha256), processed['preview']),
+                               (media.thumbnail_name(sha256), processed['thumbnail'])):
+        if not database.proof_exists(file_name):
+            upload = io.BytesIO(content)
+            upload.type = 'image/jpeg'
+            database.upload_proof(upload, file_name)
+    return media.size_report(processed)
+
+
+async def get_status_async(report_id):
+    return await run_io(database.get_status, report_id)
+
+
+async def submit_report_async(data, proof=None, notify=True):
+    """
+    Saves a report, queues its Discord alert and uploads its evidence.
+    The proof URL is known up front, so the upload runs alongside the
+    insert instead of before it. The alert is written to the outbox with
+    the insert and delivered by the outbox worker (see outbox.py), so
+    Discord's latency never reaches the reporter.
+    The evidence is read once into a spooled buffer (see evidence.py)
+    that the upload and the alert stream from independently. It is stored
+    under its SHA-256, so evidence that is already stored is not uploaded
+    again. Images are also shrunk in the media worker pool (see media.py):
+    the alert carries the preview, and the preview and thumbnail are
+    stored in the background.
+    If the upload fails, the stored proof URL is cleared again.
+    Returns a dict with 'saved' (stored row or None), 'proof_url',
+    'proof_uploaded', 'proof_reused', 'notified' (alert queued), per-step
+    'timings' in seconds, 'evidence' (size, sha256, spooled_to_disk,
+    peak_memory) or None and 'media' (original/preview/thumbnail sizes and
+    bytes_saved) or None.
+    """
+    started = time.perf_counter()
+    timings = {}
+    report_id = data['report_id']
+
+    async def timed(name, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        except Exception as e:
+            print(f"Submission step '{name}' failed: {e}")
+            return None
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    # Read the evidence once; the upload and the alert stream from the buffer
+    evidence = None
+    media_job = None
+    proof_data = None
+    upload = None
+    data = dict(data)
+    if proof:
+        evidence, media_job = await timed('read_evidence', run_io(_read_evidence, proof)) or (None, None)
+    if evidence:
+        proof_data = (evidence.name, evidence.reader(), evidence.type)
+        file_name = evidence.content_name()
+        data['proof'] = database.get_proof_url(file_name)
+        data['proof_sha256'] = evidence.sha256
+        upload = asyncio.create_task(timed('upload', run_io(_store_proof, evidence, file_name)))
+    else:
+        data['proof'] = None
+
+    try:
+        hold = media.MEDIA_TIMEOUT if media_job is not None else 0.0
+        saved, notified = await timed('insert', run_io(_insert_and_queue_alert, data, proof_data, notify,
+                                                       hold)) or (None, None)
+        proof_url, reused = (await upload if upload else None) or (None, False)
+    finally:
+        if evidence:
+            evidence.close()
+
+    if proof and not proof_url:
+        data['proof'] = None
+        if saved:
+            await timed('clear_proof', run_io(database.set_incident_proof, report_id, None))
+
+    processed = None
+    if media_job is not None and (notified or proof_url):
+        processed = _media_result(media_job) if media_job.done() else None
+        # The preview swap and the derivatives don't hold up the reporter
+        task = asyncio.create_task(run_io(_finish_media, data, evidence.sha256, media_job,
+                                          evidence.name if notified else None, bool(proof_url)))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    timings['total'] = time.perf_counter() - started
+    metrics.record('submit_report', timings['total'], ok=bool(saved) and (not proof or bool(proof_url)))
+
+    return {
+        'saved': saved,
+        'proof_url': proof_url,
+        'proof_uploaded': bool(proof_url) if proof else None,
+        'proof_reused': reused,
+        'notified': notified,
+        'timings': timings,
+        'evidence': evidence.stats() if evidence else None,
+        'media': media.size_report(processed) if processed else None,
+    }
+
+
+# ==================== SYNC FACADE ====================
+
+def submit_report(data, proof=None, notify=True):
+    """
+    Synchronous wrapper around submit_report_async for Streamlit pages.
+    """
+    return run_sync(submit_report_async(data, proof, notify))
+
+
+def get_status(report_id):
+    """
+    Synchronous wrapper around get_status_async.
+    """
+    return run_sync(get_status_async(report_id))
@@ -0,0 +1,278 @@
+"""
+Microbenchmarks for the nlp_model stages on a synthetic incident corpus.
+
+    python benchmark_nlp.py                         # 1k texts, all stages
+    python benchmark_nlp.py --sizes 1000,100000 --stages classify_incident,sentiment_score
+    python benchmark_nlp.py --save-baseline         # store the results as the baseline
+    python benchmark_nlp.py --check                 # fail if there is no baseline
+    python benchmark_nlp.py --sizes 1000000 --stages preprocess_text
+
+Each stage is timed per call over the corpus (p50/p99 latency and
+texts/sec). Peak traced memory is measured in a separate pass over a sample,
+so tracemalloc's overhead doesn't skew the timings. Results are compared
+against the stored baseline (benchmarks/baseline.json, committed with the
+repo), and the exit status is 1 if any stage regressed by more than
+--tolerance, or 2 with --check if there is no baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import resource
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+import nlp_model
+from nlp_model import (TRAINING_DATA, preprocess_text, validate_input, detect_fake_report, classify_incident,
+                       sentiment_score, analyze_emotions, analyze_incident, analyze_incidents,
+                       clear_analysis_cache)
+
+# ==================== CONFIGURATION ====================
+
+BENCHMARK_BASELINE = os.environ.get(
+    'BENCHMARK_BASELINE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json')
+)
+
+# Texts per stage traced for peak memory
+MEMORY_SAMPLE = 1000
+
+# Texts per analyze_incidents call in the batch stage
+BATCH_SIZE = 500
+
+STAGES = {
+    'preprocess_text': preprocess_text,
+    'validate_input': validate_input,
+    'detect_fake_report': detect_fake_report,
+    'classify_incident': lambda text: classify_incident(text, return_confidence=True),
+    'sentiment_score': sentiment_score,
+    'analyze_emotions': analyze_emotions,
+    'analyze_incident': lambda text: analyze_incident(text, check_duplicates=False),
+}
+BATCH_STAGE = 'analyze_incidents'
+
+
+# ==================== SYNTHETIC CORPUS ====================
+
+LOCATIONS = ["the library", "Hostel Block A", "Hostel Block C", "the cafeteria", "the main gate",
+             "the parking lot", "the sports complex", "Lab 204", "the auditorium", "the bus stop"]
+TIMES = ["this morning", "last night", "around 9 pm", "during the lunch break", "yesterday evening",
+         "on Monday", "after the exam", "at about 2 am"]
+DETAILS = [
+    "Several students saw it happen.", "Security was informed but nobody came.",
+    "This has happened more than once this week.", "I am worried it will happen again.",
+    "There is CCTV near the entrance that might have recorded it.", "I felt unsafe walking back alone.",
+    "The warden said they would look into it.", "Please take action as soon as possible.",
+]
+FAKES = [
+    "test {n}", "testing testing 123", "asdfghjkl {n}", "qwerty qwerty qwerty", "this is a test report",
+    "lorem ipsum dolor sit amet", "aaaaaaaaaaaaaaaa", "hello world {n}", "blah blah blah blah",
+]
+
+
+def generate_corpus(n, fake_ratio=0.1, seed=0):
+    """
+    Yields n synthetic incident texts. Genuine texts start from a training
+    example and add a place, a time and detail sentences up to a
+    log-normal word count (median ~27 words, capped at 2000 characters).
+    About fake_ratio of the texts are test/spam/gibberish submissions.
+    """
+    rng = random.Random(seed)
+    genuine = [text for category, texts in TRAINING_DATA.items() if category != "Fake/Spam" for text in texts]
+    fakes = FAKES + list(TRAINING_DATA.get("Fake/Spam", []))
+    for i in range(n):
+        if rng.random() < fake_ratio:
+            yield rng.choice(fakes).format(n=i)
+            continue
+        target_words = min(300, max(4, int(rng.lognormvariate(3.3, 0.6))))
+        words = f"{rng.choice(genuine)} near {rng.choice(LOCATIONS)} {rng.choice(TIMES)}.".split()
+        while len(words) < target_words:
+            words += rng.choice(DETAILS).split()
+        yield " ".join(words[:target_words])[:2000] + f" Ref {i}."
+
+
+# ==================== MEASUREMENT ====================
+
+def _peak_memory(func, texts):
+    """
+    Peak traced allocation in bytes while func runs over texts.
+    """
+    clear_analysis_cache()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        for text in texts:
+            func(text)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def _time_batch(batch):
+    call = time.perf_counter_ns()
+    analyze_incidents(batch)
+    return (time.perf_counter_ns() - call) / len(batch)
+
+
+def bench_stage(name, n, fake_ratio=0.1, seed=0):
+    """
+    Times one stage over an n-text corpus. Returns its results dict.
+    """
+    clear_analysis_cache()
+    if name == BATCH_STAGE:
+        # Latency per text is the batch time divided by the batch size
+        started = time.perf_counter_ns()
+        latencies = []
+        batch = []
+        for text in generate_corpus(n, fake_ratio, seed):
+            batch.append(text)
+            if len(batch) == BATCH_SIZE:
+                latencies.append(_time_batch(batch))
+                batch = []
+        if batch:
+            latencies.append(_time_batch(batch))
+        latencies = np.array(latencies)
+        total_seconds = (time.perf_counter_ns() - started) / 1e9
+        sample = list(generate_corpus(min(n, MEMORY_SAMPLE), fake_ratio, seed))
+        peak = _peak_memory(analyze_incidents, [sample])
+    else:
+        func = STAGES[name]
+        latencies = np.empty(n, dtype=np.int64)
+        for i, text in enumerate(generate_corpus(n, fake_ratio, seed)):
+            call = time.perf_counter_ns()
+            func(text)
+            latencies[i] = time.perf_counter_ns() - call
+        total_seconds = latencies.sum() / 1e9
+        peak = _peak_memory(func, generate_corpus(min(n, MEMORY_SAMPLE), fake_ratio, seed))
+
+    return {
+        'stage': name,
+        'texts': n,
+        'p50_us': float(np.percentile(latencies, 50)) / 1000,
+        'p99_us': float(np.percentile(latencies, 99)) / 1000,
+        'texts_per_sec': n / total_seconds if total_seconds else 0.0,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+# ==================== BASELINE ====================
+
+def compare(results, baseline, tolerance):
+    """
+    Returns {key: verdict} for every result with a baseline entry:
+    'regression' if throughput dropped or p50 rose by more than tolerance
+    (or p99, which is noisier, by more than twice that), 'faster' if
+    throughput rose by more than tolerance, otherwise 'ok'.
+    """
+    verdicts = {}
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if result['texts_per_sec'] < base['texts_per_sec'] * (1 - tolerance) or \
+                result['p50_us'] > base['p50_us'] * (1 + tolerance) or \
+                result['p99_us'] > base['p99_us'] * (1 + 2 * tolerance):
+            verdicts[key] = 'regression'
+        elif result['texts_per_sec'] > base['texts_per_sec'] * (1 + tolerance):
+            verdicts[key] = 'faster'
+        else:
+            verdicts[key] = 'ok'
+    return verdicts
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get('results', {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    """
+    Stores results as the baseline, keeping entries for other sizes and
+    stages from earlier runs.
+    """
+    results = dict(load_baseline(path), **results)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'model_version': nlp_model.model_version(),
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the nlp_model stages on a synthetic corpus.")
+    parser.add_argument('--sizes', default='1000', help="comma-separated corpus sizes (1000 to 1000000)")
+    parser.add_argument('--stages', default=','.join(list(STAGES) + [BATCH_STAGE]),
+                        help="comma-separated stages to run")
+    parser.add_argument('--fake-ratio', type=float, default=0.1, help="share of fake/spam texts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE, help="baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--check', action='store_true', help="fail if there is no baseline to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    unknown = set(stages) - set(STAGES) - {BATCH_STAGE}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    baseline = load_baseline(args.baseline)
+    if args.check and not baseline:
+        print(f"❌ No baseline at {args.baseline}; record one with --save-baseline")
+        return 2
+
+    nlp_model.warm_up()
+    results = {}
+
+    print("=" * 96)
+    print(f"NLP Stage Benchmark (model {nlp_model.model_version()}, fake ratio {args.fake_ratio:.0%})")
+    print("=" * 96)
+    print(f"{'stage':<22}{'texts':>10}{'p50 µs':>12}{'p99 µs':>12}{'texts/sec':>14}{'peak KB':>12}  vs baseline")
+    print("-" * 96)
+    for n in sizes:
+        for stage in stages:
+            result = bench_stage(stage, n, args.fake_ratio, args.seed)
+            key = f"{stage}@{n}"
+            results[key] = result
+            verdict = compare({key: result}, baseline, args.tolerance).get(key, '-')
+            if verdict != '-':
+                change = result['texts_per_sec'] / baseline[key]['texts_per_sec'] - 1
+                verdict = f"{verdict} ({change:+.0%})"
+            print(f"{stage:<22}{n:>10,}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}"
+                  f"{result['texts_per_sec']:>14,.0f}{result['peak_memory_kb']:>12,.0f}  {verdict}")
+    print("-" * 96)
+    print(f"Process peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+
+    regressions = [key for key, verdict in compare(results, baseline, args.tolerance).items()
+                   if verdict == 'regression']
+    if regressions:
+        print(f"❌ Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    if baseline:
+        print("✅ No regressions against the baseline")
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}; nothing compared (record one with --save-baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
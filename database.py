@@ -1,7 +1,14 @@
 import os
-from supabase import create_client, Client
+import time
+import threading
+from datetime import datetime
 from dotenv import load_dotenv
 import streamlit as st
+from dedup import add_incident, remove_incident, rebuild_index, DUPLICATE_WINDOW_SECONDS
+from storage import create_backend, STORAGE_BACKEND
+from evidence import sha256_of_url
+from media import preview_name
+from metrics import timed, failed_if_none
 
 load_dotenv()
 
@@ -16,64 +23,188 @@ def get_secret(key_name):
 url = get_secret("SUPABASE_URL") or os.environ.get("SUPABASE_URL")
 key = get_secret("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 
-if not url or not key:
-    # Don't raise error immediately to allow importing safely, but operations will fail
-    print("Warning: Supabase URL and SERVICE_ROLE_KEY not found.")
-    supabase = None
-else:
-    try:
-        supabase: Client = create_client(url, key)
-    except Exception as e:
-        print(f"Failed to initialize Supabase client: {e}")
-        supabase = None
+# Supabase by default; STORAGE_BACKEND=sqlite runs on an embedded database
+# with proofs on the local filesystem (see storage.py)
+backend = create_backend(STORAGE_BACKEND, url, key)
+
+def use_backend(new_backend):
+    """
+    Switches this process to another storage backend (e.g. one built for a
+    test or a one-off job) and drops what was cached from the old one.
+    Returns new_backend.
+    """
+    global backend
+    backend = new_backend
+    invalidate_incident_cache()
+    with _dedup_lock:
+        _dedup_sync.update(seeded=False, synced_at=0.0, watermark=None)
+    return new_backend
+
+# ==================== DATA VERSION ====================
+
+# Seconds the dashboard counts are reused. Writes through this module drop
+# them right away, so the TTL only bounds staleness from other processes.
+INCIDENT_CACHE_TTL = float(os.environ.get('INCIDENT_CACHE_TTL', '60'))
+
+# Bumped on every write through this module, so callers can key derived
+# data (cached counts, DataFrames, charts) on it
+_data_version = {'version': 0}
+_cache_lock = threading.Lock()
+
+
+def get_data_version():
+    """
+    Returns the current incident data version token.
+    """
+    return _data_version['version']
+
+
+def invalidate_incident_cache():
+    """
+    Bumps the data version, which drops the cached counts.
+    """
+    with _cache_lock:
+        _data_version['version'] += 1
+
+
+# ==================== DUPLICATE INDEX SYNC ====================
+
+# Columns the near-duplicate index is seeded from
+DEDUP_COLUMNS = ('report_id', 'description', 'last_updated', 'updated_at')
+
+# watermark is the highest updated_at (time of the last write) seen
+_dedup_sync = {'seeded': False, 'synced_at': 0.0, 'watermark': None}
+_dedup_lock = threading.Lock()
+
+
+def sync_duplicate_index():
+    """
+    Keeps the Report page's near-duplicate index in step with the database.
+    The first call seeds it with the reports of the last
+    DUPLICATE_WINDOW_SECONDS; later calls, at most every INCIDENT_CACHE_TTL
+    seconds, add the reports other processes wrote since the watermark.
+    Writes through this module update the index directly.
+    Returns True once the index is seeded.
+    """
+    if not backend: return False
+    with _dedup_lock:
+        now = time.time()
+        seeded = _dedup_sync['seeded']
+        if seeded and now - _dedup_sync['synced_at'] < INCIDENT_CACHE_TTL:
+            return True
+        since = datetime.fromtimestamp(now - DUPLICATE_WINDOW_SECONDS).strftime("%Y-%m-%d %H:%M:%S")
+        rows = get_recent_incidents(since, changed_since=_dedup_sync['watermark'] if seeded else None)
+        if rows is None:
+            return seeded
+        if seeded:
+            for row in rows:
+                add_incident(row['report_id'], row.get('description'), row.get('last_updated'))
+        else:
+            rebuild_index(rows)
+        watermark = max((row['updated_at'] for row in rows if row.get('updated_at')), key=str,
+                        default=_dedup_sync['watermark'])
+        _dedup_sync.update(seeded=True, synced_at=now, watermark=watermark)
+        return True
 
 def init_db():
     """
     Checks the database connection.
     Returns True if connected, False otherwise.
     """
-    if not supabase:
+    if not backend:
         return False
     try:
         # Simple health check query
-        supabase.table('incidents').select('count', count='exact').limit(0).execute()
-        return True
+        return backend.check()
     except Exception as e:
-        print(f"Supabase Connection Check Error: {e}")
+        print(f"{backend.name} Connection Check Error: {e}")
         return False
 
+@timed('upload_proof', failed=failed_if_none)
 def upload_proof(file_obj, file_name):
     """
-    Uploads a file to Supabase Storage 'proofs' bucket.
+    Uploads a file to the proof store (Supabase Storage 'proofs' bucket,
+    or PROOF_STORE_DIR on the SQLite backend). The file is streamed, not
+    read into memory first.
     Returns the public URL of the uploaded file.
     """
-    if not supabase: return None
+    if not backend: return None
     try:
-        bucket_name = "proofs"
-        file_path = f"{file_name}"
         file_obj.seek(0)
-        file_content = file_obj.read()
-        
-        # Upload
-        supabase.storage.from_(bucket_name).upload(
-            file=file_content,
-            path=file_path,
-            file_options={"content-type": file_obj.type}
-        )
         
-        # Get Public URL
-        res = supabase.storage.from_(bucket_name).get_public_url(file_path)
-        return res
+        # Upload and get the public URL
+        return backend.upload_proof(file_name, file_obj, getattr(file_obj, 'type', None))
     except Exception as e:
-        print(f"Supabase Storage Error: {e}")
+        print(f"{backend.name} Storage Error: {e}")
         return None
 
+def get_proof_url(file_name):
+    """
+    Returns the URL a proof will have once uploaded, without uploading it.
+    """
+    if not backend: return None
+    try:
+        return backend.proof_url(file_name)
+    except Exception as e:
+        print(f"{backend.name} Storage Error: {e}")
+        return None
+
+def proof_exists(file_name):
+    """
+    Returns True if the proof store already holds file_name. Proofs are
+    named by content hash, so an existing file can be reused as is.
+    """
+    if not backend: return False
+    try:
+        return backend.proof_exists(file_name)
+    except Exception as e:
+        print(f"{backend.name} Storage Error: {e}")
+        return False
+
+def get_proof_preview(proof_sha256):
+    """
+    Returns the URL of the downscaled preview of a proof (see media.py),
+    or None if the proof wasn't an image or hasn't been processed yet.
+    """
+    if not backend or not proof_sha256: return None
+    file_name = preview_name(proof_sha256)
+    return get_proof_url(file_name) if proof_exists(file_name) else None
+
+def verify_proof(report_id):
+    """
+    Re-hashes a report's stored proof and compares it with the recorded
+    SHA-256. Returns True/False, or None if there is nothing to verify.
+    """
+    if not backend: return None
+    try:
+        row = backend.get(report_id, 'proof, proof_sha256')
+        if not row or not row.get('proof') or not row.get('proof_sha256'):
+            return None
+        return sha256_of_url(row['proof']) == row['proof_sha256']
+    except Exception as e:
+        print(f"{backend.name} Storage Error: {e}")
+        return False
+
+def set_incident_proof(report_id, proof_url):
+    """
+    Sets (or clears, with None) the proof URL of a stored incident.
+    Clearing it also clears the recorded hash.
+    """
+    if not backend: return None
+    try:
+        changes = {'proof': proof_url} if proof_url else {'proof': None, 'proof_sha256': None}
+        return backend.update(report_id, changes)
+    except Exception as e:
+        print(f"{backend.name} Update Error: {e}")
+        return None
+
+@timed('insert_incident', failed=failed_if_none)
 def insert_incident(data):
     """
-    Inserts a new incident into the Supabase 'incidents' table.
-    Returns the response object or None on failure.
+    Inserts a new incident into the 'incidents' table.
+    Returns the stored row or None on failure.
     """
-    if not supabase: return None
+    if not backend: return None
     try:
         # Map generic 'timestamp' to 'last_updated' as per actual schema
         payload = data.copy()
@@ -81,11 +212,64 @@ def insert_incident(data):
         # Ensure we have a valid timestamp compatible with Supabase (ISO format preferred)
         if 'timestamp' in payload:
             payload['last_updated'] = payload.pop('timestamp')
+        payload.setdefault('updated_at', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
-        response = supabase.table('incidents').insert(payload).execute()
-        return response
+        row = backend.insert(payload)
+        invalidate_incident_cache()
+        add_incident(payload.get('report_id'), payload.get('description'), payload.get('last_updated'))
+        return row
+    except Exception as e:
+        print(f"{backend.name} Insert Error: {e}")
+        return None
+
+def insert_incidents(rows):
+    """
+    Bulk-inserts incidents in one request (one transaction on SQLite).
+    Rows whose report_id is already stored are skipped.
+    Returns the number of rows written, or None on failure.
+    """
+    if not backend: return None
+    try:
+        payloads = []
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for data in rows:
+            payload = dict(data)
+            if 'timestamp' in payload:
+                payload['last_updated'] = payload.pop('timestamp')
+            payload.setdefault('updated_at', now)
+            payloads.append(payload)
+        written = backend.insert_many(payloads)
+        invalidate_incident_cache()
+        return written
+    except Exception as e:
+        print(f"{backend.name} Insert Error: {e}")
+        return None
+
+def update_scores(rows):
+    """
+    Bulk-writes re-scored category, sentiment and model_version values
+    (rows of {report_id, category, sentiment, model_version}).
+    Returns the number of rows updated, or None on failure.
+    """
+    if not backend: return None
+    try:
+        updated = backend.update_scores(rows)
+        invalidate_incident_cache()
+        return updated
+    except Exception as e:
+        print(f"{backend.name} Update Error: {e}")
+        return None
+
+def stamp_model_version(report_ids, version):
+    """
+    Records that the model at version re-scored these incidents without
+    changing them. Returns the number of rows updated, or None on failure.
+    """
+    if not backend: return None
+    try:
+        return backend.stamp_model_version(report_ids, version)
     except Exception as e:
-        print(f"Supabase Insert Error: {e}")
+        print(f"{backend.name} Update Error: {e}")
         return None
 
 def get_status(report_id):
@@ -93,15 +277,14 @@ def get_status(report_id):
     Retrieves the status and admin remark for a given report_id.
     Returns (status, admin_remark) tuple or None if not found.
     """
-    if not supabase: return None
+    if not backend: return None
     try:
-        response = supabase.table('incidents').select('status, admin_remark').eq('report_id', report_id).execute()
-        if response.data and len(response.data) > 0:
-            record = response.data[0]
+        record = backend.get(report_id, 'status, admin_remark')
+        if record:
             return record.get('status'), record.get('admin_remark')
         return None
     except Exception as e:
-        print(f"Supabase Get Status Error: {e}")
+        print(f"{backend.name} Get Status Error: {e}")
         return None
 
 def get_all_incidents():
@@ -109,11 +292,10 @@ def get_all_incidents():
     Retrieves all incidents, ordered by timestamp descending.
     Returns a list of dictionaries.
     """
-    if not supabase: return []
+    if not backend: return []
     try:
         # Sort by last_updated which acts as our timestamp
-        response = supabase.table('incidents').select('*').order('last_updated', desc=True).execute()
-        data = response.data if response.data else []
+        data = backend.select_all()
         
         # Map 'last_updated' back to 'timestamp' for app compatibility
         for row in data:
@@ -122,32 +304,151 @@ def get_all_incidents():
         
         return data
     except Exception as e:
-        print(f"Supabase Get All Error: {e}")
+        print(f"{backend.name} Get All Error: {e}")
         return []
 
-def update_incident(report_id, status, remark):
+def get_recent_incidents(since, changed_since=None, columns=DEDUP_COLUMNS):
+    """
+    Retrieves the columns of incidents reported at or after since
+    ("%Y-%m-%d %H:%M:%S"), oldest first; with changed_since, only those
+    written at or after it. Returns None on failure.
+    """
+    if not backend: return None
+    try:
+        return backend.reported_since(since, columns, changed_since)
+    except Exception as e:
+        print(f"{backend.name} Get Recent Error: {e}")
+        return None
+
+def get_resolved_incidents(since=None, limit=1000):
+    """
+    Retrieves resolved incidents ordered by (updated_at, report_id),
+    starting after the since = (updated_at, report_id) watermark.
+    Used by online learning to read only newly resolved reports.
+    """
+    if not backend: return []
+    try:
+        return backend.resolved_since(since, limit)
+    except Exception as e:
+        print(f"{backend.name} Get Resolved Error: {e}")
+        return []
+
+# Aggregates are cached until the data version changes or INCIDENT_CACHE_TTL passes
+_stats_cache = {'stats': None, 'loaded_at': 0.0, 'version': -1}
+
+
+def get_incident_stats(use_cache=True):
+    """
+    Returns incident counts grouped by category, urgency, status and day as
+    {dimension: {value: count}}, each sorted by count descending (day by date).
+    Counts are computed in the database (the incident_stats function from
+    supabase_functions.sql, or GROUP BY on SQLite), so only a few dozen rows
+    are transferred. Returns None on failure.
+    """
+    if not backend: return None
+    with _cache_lock:
+        if use_cache and _stats_cache['version'] == _data_version['version'] \
+                and time.time() - _stats_cache['loaded_at'] < INCIDENT_CACHE_TTL:
+            return _stats_cache['stats']
+        version = _data_version['version']
+    try:
+        stats = backend.stats()
+        
+        for dimension, counts in stats.items():
+            if dimension == 'day':
+                stats[dimension] = dict(sorted(counts.items(), key=lambda item: str(item[0])))
+            else:
+                stats[dimension] = dict(sorted(counts.items(), key=lambda item: -item[1]))
+        
+        with _cache_lock:
+            _stats_cache.update(stats=stats, loaded_at=time.time(), version=version)
+        return stats
+    except Exception as e:
+        print(f"{backend.name} Stats Error: {e}")
+        return None
+
+
+# Columns shown in list views; description and proof are loaded per record
+LIST_COLUMNS = ('report_id', 'category', 'urgency', 'status', 'location', 'last_updated')
+
+
+def get_incident_page(cursor=None, page_size=25, columns=LIST_COLUMNS, status=None):
+    """
+    Retrieves one page of incidents, newest first, ordered by
+    (last_updated, report_id) descending.
+    cursor is the (last_updated, report_id) of the last row of the previous
+    page (None for the first page). Only the given columns are selected.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if not backend: return [], None
+    try:
+        columns = tuple(dict.fromkeys(('report_id', 'last_updated') + tuple(columns)))
+        # One extra row tells us whether another page exists
+        rows = backend.page(cursor, page_size + 1, columns, status)
+        
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = (rows[-1]['last_updated'], rows[-1]['report_id'])
+        
+        for row in rows:
+            row['timestamp'] = row['last_updated']
+        return rows, next_cursor
+    except Exception as e:
+        print(f"{backend.name} Get Page Error: {e}")
+        return [], None
+
+def get_incident(report_id):
+    """
+    Retrieves a single incident with all columns, or None if not found.
+    """
+    if not backend: return None
+    try:
+        row = backend.get(report_id)
+        if not row:
+            return None
+        if 'last_updated' in row:
+            row['timestamp'] = row['last_updated']
+        return row
+    except Exception as e:
+        print(f"{backend.name} Get Incident Error: {e}")
+        return None
+
+def update_incident(report_id, status, remark, category=None):
     """
     Updates the status and admin_remark for a specific incident.
+    Pass category to correct the predicted category; the correction is
+    marked (category_source 'admin') so re-scoring keeps it. updated_at is
+    set to now so incremental readers pick up the change; the report time
+    (last_updated) is kept.
     """
-    if not supabase: return None
+    if not backend: return None
     try:
-        response = supabase.table('incidents').update({
+        changes = {
             'status': status, 
-            'admin_remark': remark
-        }).eq('report_id', report_id).execute()
-        return response
+            'admin_remark': remark,
+            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if category:
+            changes['category'] = category
+            changes['category_source'] = 'admin'
+        row = backend.update(report_id, changes)
+        invalidate_incident_cache()
+        return row
     except Exception as e:
-        print(f"Supabase Update Error: {e}")
+        print(f"{backend.name} Update Error: {e}")
         return None
 
 def delete_incident(report_id):
     """
-    Deletes an incident from the Supabase 'incidents' table.
+    Deletes an incident from the 'incidents' table.
     """
-    if not supabase: return None
+    if not backend: return None
     try:
-        response = supabase.table('incidents').delete().eq('report_id', report_id).execute()
-        return response
+        deleted = backend.delete(report_id)
+        invalidate_incident_cache()
+        remove_incident(report_id)
+        return deleted
     except Exception as e:
-        print(f"Supabase Delete Error: {e}")
+        print(f"{backend.name} Delete Error: {e}")
         return None
@@ -0,0 +1,236 @@
+import os
+import re
+import time
+import zlib
+import threading
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+
+# MinHash signature length, split into LSH bands of NUM_PERM // LSH_BANDS rows
+NUM_PERM = 64
+LSH_BANDS = 16
+
+# Character n-gram size used as shingles
+SHINGLE_SIZE = 5
+
+# Estimated Jaccard similarity at which a report is rejected or flagged
+DUPLICATE_REJECT_THRESHOLD = float(os.environ.get('DUPLICATE_REJECT_THRESHOLD', '0.9'))
+DUPLICATE_FLAG_THRESHOLD = float(os.environ.get('DUPLICATE_FLAG_THRESHOLD', '0.7'))
+
+# Only incidents from this time window are kept, up to DUPLICATE_MAX_ENTRIES
+DUPLICATE_WINDOW_SECONDS = float(os.environ.get('DUPLICATE_WINDOW_SECONDS', str(7 * 24 * 3600)))
+DUPLICATE_MAX_ENTRIES = int(os.environ.get('DUPLICATE_MAX_ENTRIES', '20000'))
+
+# Mersenne prime for the universal hash family
+_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(42)
+# a < 2**31 and shingle hashes < 2**32 keep a * x + b inside uint64
+_HASH_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_HASH_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+
+# ==================== MINHASH ====================
+
+def normalize_text(text):
+    """
+    Lowercases text and collapses everything but letters and digits to
+    single spaces, so punctuation and spacing changes don't affect shingles.
+    """
+    if not text or not isinstance(text, str):
+        return ""
+    return ' '.join(re.sub(r'[^\w]+', ' ', text.lower()).split())
+
+
+def minhash_signature(text):
+    """
+    Returns the MinHash signature (uint64 array of length NUM_PERM) of the
+    character shingles of the normalized text, or None for empty text.
+    """
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    return ((np.outer(hashes, _HASH_A) + _HASH_B) % _PRIME).min(axis=0)
+
+
+def estimate_similarity(signature_a, signature_b):
+    """
+    Estimated Jaccard similarity of two MinHash signatures.
+    """
+    return float(np.mean(signature_a == signature_b))
+
+
+# ==================== LSH INDEX ====================
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over recent incident descriptions.
+    Entries older than window_seconds, or beyond max_entries, are evicted
+    oldest first. Safe to share between Streamlit sessions.
+    """
+
+    def __init__(self, window_seconds=DUPLICATE_WINDOW_SECONDS, max_entries=DUPLICATE_MAX_ENTRIES):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._rows = NUM_PERM // LSH_BANDS
+        self._entries = {}     # report_id -> (signature, timestamp)
+        self._order = deque()  # (timestamp, report_id), oldest first
+        self._buckets = [{} for _ in range(LSH_BANDS)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature):
+        rows = self._rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(LSH_BANDS)]
+
+    def _remove(self, report_id):
+        signature, _ = self._entries.pop(report_id)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(report_id)
+                if not members:
+                    del bucket[key]
+
+    def _evict(self, now):
+        cutoff = now - self.window_seconds
+        while self._order and (self._order[0][0] < cutoff or len(self._entries) > self.max_entries):
+            timestamp, report_id = self._order.popleft()
+            entry = self._entries.get(report_id)
+            # Skip stale order records of re-added reports
+            if entry is not None and entry[1] == timestamp:
+                self._remove(report_id)
+
+    def add(self, report_id, text, timestamp=None):
+        """
+        Adds (or replaces) a report. Returns False if the text is empty.
+        """
+        signature = minhash_signature(text)
+        if signature is None:
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if report_id in self._entries:
+                self._remove(report_id)
+            self._entries[report_id] = (signature, timestamp)
+            self._order.append((timestamp, report_id))
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(key, set()).add(report_id)
+            self._evict(time.time())
+        return True
+
+    def discard(self, report_id):
+        """
+        Removes a report if present.
+        """
+        with self._lock:
+            if report_id in self._entries:
+                self._remove(report_id)
+
+    def query(self, text, threshold=DUPLICATE_FLAG_THRESHOLD):
+        """
+        Finds the most similar indexed report.
+        Returns (report_id, similarity) if its estimated similarity is at
+        least threshold, otherwise None.
+        """
+        signature = minhash_signature(text)
+        if signature is None:
+            return None
+
+        best = None
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            for report_id in candidates:
+                similarity = estimate_similarity(signature, self._entries[report_id][0])
+                if similarity >= threshold and (best is None or similarity > best[1]):
+                    best = (report_id, similarity)
+        return best
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+
+# Process-wide index shared by all sessions
+_index = NearDuplicateIndex()
+
+
+def _parse_timestamp(value):
+    """
+    Converts an incident timestamp ("%Y-%m-%d %H:%M:%S" or ISO) to epoch
+    seconds. Returns None if it can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def add_incident(report_id, description, timestamp=None):
+    """
+    Adds a stored incident to the near-duplicate index.
+    """
+    try:
+        return _index.add(report_id, description, _parse_timestamp(timestamp))
+    except Exception as e:
+        print(f"Duplicate index error: {e}")
+        return False
+
+
+def remove_incident(report_id):
+    """
+    Removes a deleted incident from the near-duplicate index.
+    """
+    _index.discard(report_id)
+
+
+def find_near_duplicate(text, threshold=DUPLICATE_FLAG_THRESHOLD):
+    """
+    Returns (report_id, similarity) of the closest recent incident with
+    similarity >= threshold, or None.
+    """
+    try:
+        return _index.query(text, threshold)
+    except Exception as e:
+        print(f"Duplicate index error: {e}")
+        return None
+
+
+def rebuild_index(incidents):
+    """
+    Rebuilds the index from incident rows (e.g. get_all_incidents()).
+    Rows outside the time window are skipped. Returns the number indexed.
+    """
+    _index.clear()
+    cutoff = time.time() - _index.window_seconds
+    rows = []
+    for row in incidents or []:
+        timestamp = _parse_timestamp(row.get('timestamp') or row.get('last_updated'))
+        if timestamp is None or timestamp >= cutoff:
+            rows.append((timestamp or time.time(), row))
+
+    # Oldest first so eviction order matches arrival order
+    rows.sort(key=lambda item: item[0])
+    for timestamp, row in rows:
+        _index.add(row.get('report_id'), row.get('description'), timestamp)
+    return len(_index)
@@ -0,0 +1,174 @@
+import os
+import hashlib
+import shutil
+import tempfile
+import threading
+import urllib.request
+
+# ==================== CONFIGURATION ====================
+
+# Uploads up to this size stay in memory; larger ones are spooled to a
+# temporary file so an mp4 doesn't sit in RAM once per session
+EVIDENCE_SPOOL_BYTES = int(os.environ.get('EVIDENCE_SPOOL_BYTES', str(4 * 1024 * 1024)))
+
+# Size of the chunks evidence is copied and streamed in
+EVIDENCE_CHUNK_BYTES = int(os.environ.get('EVIDENCE_CHUNK_BYTES', str(1024 * 1024)))
+
+
+# ==================== EVIDENCE BUFFER ====================
+
+class Evidence:
+    """
+    An uploaded proof file, read once into a shared buffer (spooled to disk
+    past EVIDENCE_SPOOL_BYTES). Storage and the notifier each stream it
+    through their own reader(), so the upload is never copied in full.
+    The SHA-256 of the content is computed as it is written.
+    """
+
+    def __init__(self, name, content_type=None, spool_bytes=EVIDENCE_SPOOL_BYTES):
+        self.name = name
+        self.type = content_type
+        self.size = 0
+        self.spool_bytes = spool_bytes
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self._lock = threading.Lock()
+        self._digest = hashlib.sha256()
+        # Most evidence bytes held in memory at once (the in-memory spool,
+        # or the largest chunk read once it is on disk)
+        self.peak_memory = 0
+
+    @classmethod
+    def from_upload(cls, file_obj, chunk_size=EVIDENCE_CHUNK_BYTES, spool_bytes=EVIDENCE_SPOOL_BYTES):
+        """
+        Copies an uploaded file (e.g. Streamlit's UploadedFile) into a new
+        Evidence buffer, chunk by chunk.
+        """
+        evidence = cls(getattr(file_obj, 'name', 'proof'), getattr(file_obj, 'type', None), spool_bytes)
+        file_obj.seek(0)
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            evidence.write(chunk)
+        return evidence
+
+    def write(self, chunk):
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(chunk)
+            self._digest.update(chunk)
+            self.size += len(chunk)
+            self._track(self.size if not self.spooled_to_disk else len(chunk))
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    @property
+    def extension(self):
+        return self.name.rsplit('.', 1)[-1].lower() if '.' in self.name else 'bin'
+
+    def content_name(self):
+        """
+        Content-addressed file name: '<sha256>.<ext>'. Identical evidence
+        attached to several reports maps to one stored file.
+        """
+        return f"{self.sha256}.{self.extension}"
+
+    @property
+    def spooled_to_disk(self):
+        return self._file._rolled
+
+    def _track(self, in_memory):
+        self.peak_memory = max(self.peak_memory, in_memory)
+
+    def read_at(self, offset, size):
+        """
+        Reads up to size bytes at offset. Safe to call from several threads.
+        """
+        with self._lock:
+            self._file.seek(offset)
+            chunk = self._file.read(size)
+        if self.spooled_to_disk:
+            self._track(len(chunk))
+        return chunk
+
+    def reader(self):
+        """
+        Returns a new file-like reader positioned at the start.
+        """
+        return EvidenceReader(self)
+
+    def chunks(self, chunk_size=EVIDENCE_CHUNK_BYTES):
+        """
+        Yields the evidence in chunks from the start.
+        """
+        offset = 0
+        while offset < self.size:
+            chunk = self.read_at(offset, chunk_size)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+
+    def save_to(self, path, chunk_size=EVIDENCE_CHUNK_BYTES):
+        """
+        Streams the evidence to a file (atomically replaced).
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as out:
+            shutil.copyfileobj(self.reader(), out, chunk_size)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        return {'size': self.size, 'sha256': self.sha256, 'spooled_to_disk': self.spooled_to_disk,
+                'peak_memory': self.peak_memory}
+
+    def close(self):
+        self._file.close()
+
+
+class EvidenceReader:
+    """
+    Independent read position over an Evidence buffer, usable anywhere a
+    binary file object is expected.
+    """
+
+    def __init__(self, evidence):
+        self.evidence = evidence
+        self.name = evidence.name
+        self.type = evidence.type
+        self.size = evidence.size
+        self.position = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.evidence.size - self.position
+        chunk = self.evidence.read_at(self.position, size)
+        self.position += len(chunk)
+        return chunk
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.evidence.size
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def __len__(self):
+        return self.evidence.size
+
+
+def sha256_of_url(url, chunk_size=EVIDENCE_CHUNK_BYTES):
+    """
+    Streams a stored proof (http(s) or file:// URL) and returns its SHA-256.
+    """
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        for chunk in iter(lambda: response.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
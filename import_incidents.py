@@ -0,0 +1,299 @@
+"""
+Bulk import of historical incident records (CSV or JSONL).
+
+    python import_incidents.py incidents.csv
+    python import_incidents.py export.jsonl --batch-size 1000 --workers 4
+
+Records are streamed from the file and analysed in batches across worker
+processes (validation, fake detection, classification and sentiment,
+see nlp_model.analyze_incidents), then inserted with one bulk request per
+batch. Progress is checkpointed after every batch, so re-running the same
+command after an interruption resumes where it stopped.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# ==================== CONFIGURATION ====================
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', str(os.cpu_count() or 1)))
+
+URGENCIES = ('Low', 'Medium', 'High')
+STATUSES = ('Pending', 'Under Review', 'Resolved')
+
+# Column names accepted from other systems' exports
+FIELD_ALIASES = {
+    'description': ('description', 'text', 'details', 'incident'),
+    'location': ('location', 'area', 'place'),
+    'timestamp': ('timestamp', 'last_updated', 'reported_at', 'created_at', 'date'),
+    'urgency': ('urgency', 'priority', 'severity'),
+    'category': ('category', 'type'),
+    'status': ('status',),
+    'admin_remark': ('admin_remark', 'remark', 'notes'),
+    'report_id': ('report_id', 'id'),
+}
+
+TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d',
+                     '%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+
+# ==================== READING ====================
+
+def read_records(path):
+    """
+    Yields the records of a CSV or JSONL file one at a time.
+    """
+    if path.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+
+
+def normalize_record(record):
+    """
+    Maps a source record onto incident fields using FIELD_ALIASES.
+    """
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+    normalized = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            value = lowered.get(alias)
+            if value not in (None, ''):
+                normalized[field] = str(value).strip()
+                break
+    return normalized
+
+
+def parse_timestamp(value):
+    """
+    Returns value in the app's '%Y-%m-%d %H:%M:%S' format, or None.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    return None
+
+
+def file_fingerprint(path):
+    """
+    Identifies an input file (size and a hash of its head) so a checkpoint
+    isn't applied to a different file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(64 * 1024))
+    return f"{os.path.getsize(path)}-{digest.hexdigest()[:16]}"
+
+
+# ==================== ANALYSIS ====================
+
+def analyze_batch(texts):
+    """
+    Runs the batch analysis on texts. Runs in the worker processes, which
+    load the model once on first use.
+    """
+    import nlp_model
+    results = nlp_model.analyze_incidents(texts)
+    version = nlp_model.model_version()
+    return [dict({key: result.get(key) for key in ('valid', 'error', 'is_fake', 'category',
+                                                    'sentiment_score', 'suggested_urgency')},
+                 model_version=version)
+            for result in results]
+
+
+def build_row(index, record, analysis, source_name, keep_category=False, default_status='Resolved'):
+    """
+    Builds the incident row for a record, or returns (None, reason) if the
+    record is rejected.
+    """
+    if not analysis['valid']:
+        return None, analysis.get('error') or "rejected by analysis"
+
+    timestamp = parse_timestamp(record.get('timestamp')) if record.get('timestamp') else \
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if timestamp is None:
+        return None, f"unreadable timestamp: {record.get('timestamp')}"
+
+    # Stable ids make re-sent batches no-ops
+    report_id = record.get('report_id') or \
+        "imp" + hashlib.sha1(f"{source_name}:{index}".encode()).hexdigest()[:9]
+    urgency = record.get('urgency', '').title()
+    status = record.get('status', '').title()
+    keep = keep_category and bool(record.get('category'))
+
+    return {
+        'report_id': report_id,
+        'description': record['description'],
+        'location': record.get('location') or "Unknown",
+        'urgency': urgency if urgency in URGENCIES else analysis['suggested_urgency'],
+        'category': record['category'] if keep else analysis['category'],
+        # Categories from the file are human labels that re-scoring keeps
+        'category_source': 'import' if keep else None,
+        'sentiment': analysis['sentiment_score'],
+        'timestamp': timestamp,
+        'status': status if status in STATUSES else default_status,
+        'proof_type': None,
+        'admin_remark': record.get('admin_remark'),
+        'model_version': analysis['model_version'],
+    }, None
+
+
+# ==================== CHECKPOINT ====================
+
+def load_checkpoint(path, fingerprint):
+    """
+    Returns the saved progress for this input file, or a fresh one.
+    """
+    fresh = {'fingerprint': fingerprint, 'records_done': 0, 'inserted': 0, 'rejected': 0}
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return fresh
+    if checkpoint.get('fingerprint') != fingerprint:
+        raise SystemExit(f"Checkpoint {path} belongs to a different input file; use --restart to start over")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(checkpoint, updated_at=datetime.now().isoformat()), f)
+    os.replace(tmp_path, path)
+
+
+# ==================== IMPORT ====================
+
+def run_import(path, batch_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS, checkpoint_path=None,
+               restart=False, dry_run=False, keep_category=False, default_status='Resolved',
+               rejects_path=None, insert=None):
+    """
+    Imports the records in path. Batches are analysed in a process pool
+    (up to 2 * workers in flight) and inserted in file order, each followed
+    by a checkpoint. insert defaults to database.insert_incidents.
+    Returns the final progress dict with 'rows_per_sec' for this run.
+    """
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path, file_fingerprint(path))
+    if insert is None and not dry_run:
+        from database import insert_incidents as insert
+    source_name = os.path.basename(path)
+    skip = checkpoint['records_done']
+    if skip:
+        print(f"Resuming after {skip:,} records ({checkpoint['inserted']:,} inserted so far)")
+
+    rejects = open(rejects_path, 'a', encoding='utf-8') if rejects_path else None
+    started = time.perf_counter()
+    processed = 0
+
+    def batches():
+        batch = []
+        for index, record in enumerate(read_records(path)):
+            if index < skip:
+                continue
+            batch.append((index, normalize_record(record)))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def commit(batch, analyses):
+        nonlocal processed
+        rows, rejected = [], 0
+        for (index, record), analysis in zip(batch, analyses):
+            row, reason = build_row(index, record, analysis, source_name, keep_category, default_status)
+            if row:
+                rows.append(row)
+            else:
+                rejected += 1
+                if rejects:
+                    rejects.write(json.dumps({'record': index, 'reason': reason, **record}) + "\n")
+        if rows and not dry_run:
+            written = insert(rows)
+            if written is None:
+                raise SystemExit(f"Insert failed at record {batch[0][0]:,}; re-run to resume from there")
+            checkpoint['inserted'] += written
+        checkpoint['records_done'] = batch[-1][0] + 1
+        checkpoint['rejected'] += rejected
+        if not dry_run:
+            save_checkpoint(checkpoint_path, checkpoint)
+        processed += len(batch)
+        rate = processed / max(time.perf_counter() - started, 1e-9)
+        print(f"  {checkpoint['records_done']:,} records | {checkpoint['inserted']:,} inserted | "
+              f"{checkpoint['rejected']:,} rejected | {rate:,.0f} rows/sec")
+
+    def texts(batch):
+        return [record.get('description', '') for _, record in batch]
+
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for batch in batches():
+                    in_flight.append((batch, pool.submit(analyze_batch, texts(batch))))
+                    if len(in_flight) >= 2 * workers:
+                        batch, future = in_flight.popleft()
+                        commit(batch, future.result())
+                while in_flight:
+                    batch, future = in_flight.popleft()
+                    commit(batch, future.result())
+        else:
+            for batch in batches():
+                commit(batch, analyze_batch(texts(batch)))
+    finally:
+        if rejects:
+            rejects.close()
+
+    elapsed = time.perf_counter() - started
+    checkpoint['rows_per_sec'] = processed / elapsed if elapsed else 0.0
+    print(f"Done: {processed:,} records in {elapsed:.1f}s ({checkpoint['rows_per_sec']:,.0f} rows/sec), "
+          f"{checkpoint['inserted']:,} inserted, {checkpoint['rejected']:,} rejected in total")
+    return checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import historical incidents from CSV or JSONL.")
+    parser.add_argument('path', help="CSV or JSONL (.jsonl/.ndjson) file")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help="records analysed and inserted per batch")
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS, help="analysis processes")
+    parser.add_argument('--checkpoint', help="checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--dry-run', action='store_true', help="analyse without inserting")
+    parser.add_argument('--keep-category', action='store_true',
+                        help="use the file's category when present instead of the model's")
+    parser.add_argument('--default-status', default='Resolved', choices=STATUSES,
+                        help="status for records without a valid one")
+    parser.add_argument('--rejects', help="append rejected records to this JSONL file")
+    args = parser.parse_args(argv)
+
+    run_import(args.path, args.batch_size, args.workers, args.checkpoint, args.restart, args.dry_run,
+               args.keep_category, args.default_status, args.rejects)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
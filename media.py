@@ -0,0 +1,170 @@
+import io
+import os
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# ==================== CONFIGURATION ====================
+
+# Processes for image re-encoding (0 disables evidence processing)
+MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', '2'))
+
+# Longest side of the preview sent to Discord and shown to admins, and of
+# the thumbnail
+MEDIA_PREVIEW_SIZE = int(os.environ.get('MEDIA_PREVIEW_SIZE', '1600'))
+MEDIA_THUMBNAIL_SIZE = int(os.environ.get('MEDIA_THUMBNAIL_SIZE', '320'))
+MEDIA_JPEG_QUALITY = int(os.environ.get('MEDIA_JPEG_QUALITY', '80'))
+
+# Longest an alert is held for its preview before it goes out with the original
+MEDIA_TIMEOUT = float(os.environ.get('MEDIA_TIMEOUT', '10'))
+
+# Larger images are left as they are
+MEDIA_MAX_INPUT_BYTES = int(os.environ.get('MEDIA_MAX_INPUT_BYTES', str(25 * 1024 * 1024)))
+
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg')
+
+_pool = None
+
+
+def preview_name(sha256):
+    return f"{sha256}.preview.jpg"
+
+
+def thumbnail_name(sha256):
+    return f"{sha256}.thumb.jpg"
+
+
+# ==================== IMAGE PROCESSING ====================
+
+def _encode_jpeg(image, max_size):
+    image = image.copy()
+    image.thumbnail((max_size, max_size))
+    out = io.BytesIO()
+    # A fresh save without exif/info drops location and device metadata
+    image.save(out, format='JPEG', quality=MEDIA_JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def process_image(source):
+    """
+    Strips metadata from an image (a file path, or bytes), re-encodes it as
+    a downscaled JPEG preview and makes a thumbnail. Runs in the worker
+    processes, which read the file themselves.
+    Returns {'preview', 'thumbnail', 'original_bytes', 'preview_bytes',
+    'thumbnail_bytes', 'bytes_saved'}, or None if the image can't be read.
+    """
+    if Image is None:
+        return None
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            original_bytes = len(source)
+            source = io.BytesIO(source)
+        else:
+            original_bytes = os.path.getsize(source)
+        with Image.open(source) as image:
+            # Apply the camera rotation before the orientation tag is dropped
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                background = Image.new('RGB', image.size, 'white')
+                rgba = image.convert('RGBA')
+                background.paste(rgba, mask=rgba.getchannel('A'))
+                image = background
+            preview = _encode_jpeg(image, MEDIA_PREVIEW_SIZE)
+            thumbnail = _encode_jpeg(image, MEDIA_THUMBNAIL_SIZE)
+    except Exception as e:
+        print(f"Media Processing Error: {e}")
+        return None
+
+    return {
+        'preview': preview,
+        'thumbnail': thumbnail,
+        'original_bytes': original_bytes,
+        'preview_bytes': len(preview),
+        'thumbnail_bytes': len(thumbnail),
+        'bytes_saved': original_bytes - len(preview),
+    }
+
+
+def size_report(result):
+    """
+    The sizes from a process_image result, without the image bytes.
+    """
+    return {key: value for key, value in result.items() if key.endswith('bytes') or key == 'bytes_saved'}
+
+
+_totals = {'files': 0, 'original_bytes': 0, 'preview_bytes': 0, 'thumbnail_bytes': 0, 'bytes_saved': 0}
+_totals_lock = threading.Lock()
+
+
+def record(result):
+    """
+    Adds a processed file's sizes to the running totals.
+    """
+    with _totals_lock:
+        _totals['files'] += 1
+        for key, value in size_report(result).items():
+            _totals[key] += value
+
+
+def media_stats():
+    """
+    Totals over the evidence processed by this process: files, original,
+    preview and thumbnail bytes, and bytes saved.
+    """
+    with _totals_lock:
+        return dict(_totals)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the app process runs Streamlit and I/O threads
+        _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def can_process(evidence):
+    """
+    True if the evidence is an image this module can shrink.
+    """
+    return (Image is not None and MEDIA_WORKERS > 0 and evidence.extension in IMAGE_EXTENSIONS
+            and evidence.size <= MEDIA_MAX_INPUT_BYTES)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def submit_processing(evidence, chunk_size=None):
+    """
+    Starts processing the evidence in the worker pool. The evidence is
+    streamed to a temporary file (in chunk_size chunks, default
+    EVIDENCE_CHUNK_BYTES) that the worker opens, so the image is neither
+    read into memory here nor pickled; the file is removed once the job
+    ends. Returns a concurrent.futures.Future for process_image's result,
+    or None if the evidence isn't a processable image.
+    """
+    if not can_process(evidence):
+        return None
+    fd, path = tempfile.mkstemp(prefix='campussafe-media-', suffix=f".{evidence.extension}")
+    os.close(fd)
+    try:
+        if chunk_size:
+            evidence.save_to(path, chunk_size)
+        else:
+            evidence.save_to(path)
+        job = _get_pool().submit(process_image, path)
+    except Exception as e:
+        print(f"Media Processing Error: {e}")
+        _remove(path)
+        return None
+    job.add_done_callback(lambda _: _remove(path))
+    return job
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from datetime import datetime
+
+# ==================== CONFIGURATION ====================
+
+# Stage timings are kept in per-minute buckets for the last hour
+METRICS_WINDOW_SECONDS = int(os.environ.get('METRICS_WINDOW_SECONDS', '3600'))
+METRICS_BUCKET_SECONDS = int(os.environ.get('METRICS_BUCKET_SECONDS', '60'))
+
+# Optional JSONL file: one summary line per stage for every finished bucket
+METRICS_EXPORT_PATH = os.environ.get('METRICS_EXPORT_PATH')
+
+# Histogram bin upper edges in seconds: 0.1ms to 100s, 10 bins per decade
+# (percentiles are interpolated within a bin, so they are within ~12%)
+HISTOGRAM_EDGES = [1e-4 * 10 ** (i / 10) for i in range(61)]
+
+
+class _Bucket:
+    __slots__ = ('start', 'counts', 'calls', 'errors', 'total')
+
+    def __init__(self, start):
+        self.start = start
+        self.counts = [0] * (len(HISTOGRAM_EDGES) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+
+
+def _percentile(counts, calls, q):
+    """
+    Approximate q-quantile (0-1) in seconds from merged histogram counts.
+    """
+    target = q * calls
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= target:
+            lower = HISTOGRAM_EDGES[i - 1] if i else HISTOGRAM_EDGES[0] / 10 ** 0.1
+            upper = HISTOGRAM_EDGES[i] if i < len(HISTOGRAM_EDGES) else HISTOGRAM_EDGES[-1]
+            # Geometric interpolation inside the bin
+            return lower * (upper / lower) ** ((target - seen) / count)
+        seen += count
+    return 0.0
+
+
+# ==================== STAGE METRICS ====================
+
+class StageMetrics:
+    """
+    Rolling per-stage latency histograms with call and error counts.
+    """
+
+    def __init__(self, window=METRICS_WINDOW_SECONDS, bucket_seconds=METRICS_BUCKET_SECONDS,
+                 export_path=METRICS_EXPORT_PATH):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.export_path = export_path
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, ok=True, now=None):
+        """
+        Adds one timing for stage; ok=False counts it as an error.
+        """
+        now = time.time() if now is None else now
+        start = now - now % self.bucket_seconds
+        finished = None
+        with self._lock:
+            buckets = self._stages.setdefault(stage, deque())
+            if not buckets or buckets[-1].start < start:
+                finished = buckets[-1] if buckets else None
+                buckets.append(_Bucket(start))
+            while buckets and buckets[0].start <= now - self.window - self.bucket_seconds:
+                buckets.popleft()
+            bucket = buckets[-1]
+            bucket.counts[bisect.bisect_left(HISTOGRAM_EDGES, seconds)] += 1
+            bucket.calls += 1
+            bucket.errors += 0 if ok else 1
+            bucket.total += seconds
+        if finished is not None and self.export_path:
+            self._export(stage, finished)
+
+    def _summarize(self, stage, buckets, span):
+        counts = [sum(column) for column in zip(*(bucket.counts for bucket in buckets))]
+        calls = sum(bucket.calls for bucket in buckets)
+        errors = sum(bucket.errors for bucket in buckets)
+        return {
+            'stage': stage,
+            'calls': calls,
+            'errors': errors,
+            'error_rate': errors / calls if calls else 0.0,
+            'mean_ms': sum(bucket.total for bucket in buckets) / calls * 1000 if calls else 0.0,
+            'p50_ms': _percentile(counts, calls, 0.50) * 1000,
+            'p95_ms': _percentile(counts, calls, 0.95) * 1000,
+            'p99_ms': _percentile(counts, calls, 0.99) * 1000,
+            'per_minute': calls / max(span / 60, 1),
+        }
+
+    def summary(self, window=None, now=None):
+        """
+        Returns one dict per stage over the last window seconds: calls,
+        errors, error_rate, mean/p50/p95/p99 in ms and calls per_minute.
+        """
+        now = time.time() if now is None else now
+        window = window or self.window
+        rows = []
+        with self._lock:
+            for stage, buckets in sorted(self._stages.items()):
+                recent = [bucket for bucket in buckets if bucket.start > now - window - self.bucket_seconds]
+                if recent:
+                    span = min(window, now - recent[0].start)
+                    rows.append(self._summarize(stage, recent, span))
+        return rows
+
+    def _export(self, stage, bucket):
+        try:
+            line = self._summarize(stage, [bucket], self.bucket_seconds)
+            line['start'] = datetime.fromtimestamp(bucket.start).isoformat()
+            with open(self.export_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(line) + "\n")
+        except Exception as e:
+            print(f"Metrics Export Error: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+_metrics = StageMetrics()
+
+
+def record(stage, seconds, ok=True):
+    """
+    Records one timing for stage in the process-wide metrics.
+    """
+    _metrics.record(stage, seconds, ok)
+
+
+def stage_summary(window=None):
+    """
+    Per-stage latency percentiles, error rates and throughput over the
+    last window seconds (default METRICS_WINDOW_SECONDS).
+    """
+    return _metrics.summary(window)
+
+
+def failed_if_none(result):
+    return result is None
+
+
+def timed(stage, failed=None):
+    """
+    Decorator that records each call's duration under stage. Exceptions
+    count as errors, as do results for which failed(result) is true (the
+    database helpers return None instead of raising).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                record(stage, time.perf_counter() - start, ok=False)
+                raise
+            record(stage, time.perf_counter() - start, ok=not (failed and failed(result)))
+            return result
+        return wrapper
+    return decorator
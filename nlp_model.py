@@ -1,9 +1,25 @@
+import os
 import re
+import json
+import hashlib
+import copy
+import time
+import threading
+from collections import Counter
+from functools import cached_property
 import numpy as np
-from textblob import TextBlob
-from sklearn.feature_extraction.text import TfidfVectorizer
+import joblib
+import sklearn
+try:
+    from textblob import TextBlob
+except ImportError:
+    TextBlob = None
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
+from dedup import find_near_duplicate, DUPLICATE_REJECT_THRESHOLD
+from result_cache import ResultCache, cache_key
+from metrics import timed
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -35,6 +51,18 @@ def preprocess_text(text):
     return text.strip()
 
 
+# Words keep internal punctuation ("well-known"); leading and trailing
+# punctuation marks become separate tokens, as in TextBlob's tokenizer
+_TOKEN_RE = re.compile(r'(?<![^\s,!?-])[,!?-]|\S*?[^\s.,!?-](?=[.,!?-]*(?:\s|$))|[.,!?-]')
+
+
+def tokenize_text(cleaned_text):
+    """
+    Splits preprocessed text into word and punctuation tokens.
+    """
+    return _TOKEN_RE.findall(cleaned_text)
+
+
 def validate_input(text, min_length=10, max_length=2000):
     """
     Validates user input text.
@@ -59,27 +87,13 @@ def validate_input(text, min_length=10, max_length=2000):
     return True, ""
 
 
-def detect_fake_report(text):
-    """
-    Detects fake, test, or spam reports.
-    Returns (is_fake, reason) tuple.
-    
-    
-    Checks for:
-    - Test patterns (test1, test2, testing, etc.)
-    - Gibberish/random text
-    - Repeated words/characters
-    - Common spam patterns
-    - Low information content
-    """
-    if not text or not isinstance(text, str):
-        return True, "Empty or invalid text"
-    
-    text_lower = text.lower().strip()
-    words = text_lower.split()
-    
-    # 1. Check for test patterns (expanded)
-    test_patterns = [
+# ==================== FAKE REPORT DETECTION ====================
+
+# Default rule pack for detect_fake_report.
+# A pack can be overridden from a JSON file with the same keys (see
+# reload_fake_rules), so new spam waves can be handled without a restart.
+FAKE_RULE_PACK = {
+    'test_patterns': [
         # Test variations
         r'\btest\s*\d+\b',           # test1, test2, test 1
         r'\btesting\b',              # testing
@@ -89,47 +103,47 @@ def detect_fake_report(text):
         r'\btest\s*case\b',          # test case
         r'\btester\b',               # tester
         r'\btests\b',                # tests
-        
+
         # Sample/Demo variations
         r'\bsample\s*\d*\b',         # sample, sample1
         r'\bdemo\s*\d*\b',           # demo, demo1
         r'\bexample\s*\d*\b',        # example, example1
         r'\bdummy\s*\d*\b',          # dummy, dummy1
         r'\bmock\s*\d*\b',           # mock, mock1
-        
+
         # Fake indicators
         r'\bfake\s+report\b',        # fake report
         r'\bfake\s+incident\b',      # fake incident
         r'\bfake\s+submission\b',    # fake submission
         r'\bnot\s+real\b',           # not real
         r'\bjust\s+kidding\b',       # just kidding
-        
+
         # Testing phrases
         r'\bthis\s+is\s+a\s+test\b', # this is a test
         r'\bjust\s+testing\b',       # just testing
         r'\btrying\s+to\s+test\b',   # trying to test
         r'\btest\s+run\b',           # test run
         r'\btest\s+submission\b',    # test submission
-        
+
         # Check/Try variations
         r'\bcheck\s*\d*\b',          # check, check1
         r'\bchecking\b',             # checking
         r'\btry\s*\d*\b',            # try, try1
         r'\btrying\b',               # trying
         r'\btrial\b',                # trial
-        
+
         # Keyboard patterns
         r'\bqwerty\b',               # keyboard pattern
         r'\basdf\b',                 # keyboard pattern
         r'\bzxcv\b',                 # keyboard pattern
         r'\bhjkl\b',                 # keyboard pattern
         r'\byuiop\b',                # keyboard pattern
-        
+
         # ABC/XYZ patterns
         r'\b(abc|xyz)\s*\d*\b',      # abc, xyz patterns
         r'\babcd\b',                 # abcd
         r'\b123\s*abc\b',            # 123 abc
-        
+
         # Spam indicators
         r'\bspam\b',                 # spam
         r'\bjunk\b',                 # junk
@@ -137,112 +151,281 @@ def detect_fake_report(text):
         r'\btrash\b',                # trash
         r'\bnonsense\b',             # nonsense
         r'\brandom\b',               # random
-        
+
         # Placeholder indicators
         r'\bplaceholder\b',          # placeholder
         r'\btemp\s*\d*\b',           # temp, temp1
         r'\btemporary\b',            # temporary
         r'\btbd\b',                  # to be determined
         r'\btba\b',                  # to be announced
-        
+
         # Debug/Dev patterns
         r'\bdebug\b',                # debug
         r'\bdebugging\b',            # debugging
         r'\bdev\s*\d*\b',            # dev, dev1
         r'\bprod\b',                 # prod
         r'\bstaging\b',              # staging
-    ]
+    ],
+
+    # Too many consonants in a row
+    'gibberish_pattern': r'[bcdfghjklmnpqrstvwxyz]{6,}',
+
+    'spam_phrases': [
+        'lorem ipsum',
+        'dolor sit amet',
+        'quick brown fox',
+        'the lazy dog',
+        'hello world',
+        'foo bar',
+        'blah blah',
+        'yada yada',
+        'etc etc',
+        'something something',
+    ],
+
+    'keyboard_patterns': [
+        'asdfgh', 'qwerty', 'zxcvbn', 'hjkl', 'yuiop',
+        '123456', '111111', '000000', 'aaaaaa', 'xxxxxx'
+    ],
+
+    'stop_words': [
+        'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been',
+        'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+        'would', 'should', 'could', 'may', 'might', 'must', 'can',
+        'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she',
+        'it', 'we', 'they', 'what', 'which', 'who', 'when', 'where',
+        'why', 'how', 'all', 'each', 'every', 'both', 'few', 'more',
+        'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only',
+        'own', 'same', 'so', 'than', 'too', 'very', 'just', 'but',
+        'and', 'or', 'if', 'because', 'as', 'until', 'while', 'of',
+        'at', 'by', 'for', 'with', 'about', 'against', 'between',
+        'into', 'through', 'during', 'before', 'after', 'above',
+        'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off'
+    ],
+
+    # Rejection message per rule id
+    'messages': {
+        'invalid_text': "Empty or invalid text",
+        'test_pattern': "Test/demo report detected. Please submit a real incident.",
+        'gibberish': "Gibberish detected. Please provide a meaningful description.",
+        'repeated_words': "Too many repeated words. Please provide a detailed description.",
+        'repeated_word': "Repeated word '{word}' detected. Please provide a genuine description.",
+        'short_words': "No substantial words found. Please provide details.",
+        'placeholder': "Placeholder text detected. Please describe a real incident.",
+        'numeric': "Too many numbers. Please provide a descriptive text.",
+        'low_information': "Not enough meaningful content. Please describe the incident in detail.",
+        'char_repetition': "Excessive character repetition detected. Please provide a real description.",
+        'keyboard_pattern': "Keyboard pattern detected. Please submit a genuine report.",
+    },
+}
+
+# Optional JSON file overriding keys of FAKE_RULE_PACK. detect_fake_report
+# reloads it when its modification time changes, checked at most every
+# FAKE_RULES_CHECK_SECONDS
+FAKE_RULES_PATH = os.environ.get('FAKE_RULES_PATH')
+FAKE_RULES_CHECK_SECONDS = float(os.environ.get('FAKE_RULES_CHECK_SECONDS', '5'))
+
+# Rules found by the single regex scan, highest priority first
+_SCAN_RULES = ('test_pattern', 'gibberish', 'placeholder')
+
+
+def compile_fake_rules(pack):
+    """
+    Compiles a rule pack into the structures used by detect_fake_report.
+    - One alternation regex for test patterns, gibberish and spam phrases.
+      Each branch sits inside a lookahead so overlapping matches of
+      different rules are all seen in a single pass.
+    - One alternation regex for keyboard patterns.
+    """
+    branches = {
+        'test_pattern': '|'.join(f'(?:{p})' for p in pack['test_patterns']),
+        'gibberish': pack['gibberish_pattern'],
+        'placeholder': '|'.join(re.escape(p) for p in pack['spam_phrases']),
+    }
+    scanner = '|'.join(
+        f'(?P<{rule}>{branches[rule]})' for rule in _SCAN_RULES if branches[rule]
+    )
+
+    keyboard = '|'.join(re.escape(p) for p in pack['keyboard_patterns'])
+
+    return {
+        'scanner': re.compile(f'(?=(?:{scanner}))') if scanner else None,
+        'keyboard': re.compile(keyboard) if keyboard else None,
+        'stop_words': frozenset(pack['stop_words']),
+        'messages': dict(pack['messages']),
+    }
+
+
+def load_fake_rule_pack(path=None):
+    """
+    Returns FAKE_RULE_PACK with keys overridden from a JSON file, if given.
+    """
+    pack = dict(FAKE_RULE_PACK)
+    path = path or FAKE_RULES_PATH
+
+    if path:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        messages = dict(pack['messages'])
+        messages.update(overrides.pop('messages', {}))
+        pack.update(overrides)
+        pack['messages'] = messages
+
+    return pack
+
+
+def _rules_mtime(path):
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+# The rule pack file being watched and its modification time when loaded
+_fake_rules_file = {'path': FAKE_RULES_PATH, 'mtime': _rules_mtime(FAKE_RULES_PATH), 'checked_at': time.time()}
+
+
+def reload_fake_rules(path=None):
+    """
+    Recompiles the fake detection rules, optionally from a JSON rule pack
+    (default FAKE_RULES_PATH), which is then watched for changes.
+    The compiled rules are swapped in one assignment, so requests running
+    concurrently see either the old or the new pack, never a mix.
+    Returns True on success, False if the pack could not be loaded.
+    """
+    global _fake_rules
+
+    path = path or FAKE_RULES_PATH
+    # Recorded even on failure, so a broken file isn't retried on every call
+    _fake_rules_file.update(path=path, mtime=_rules_mtime(path), checked_at=time.time())
+    try:
+        _fake_rules = compile_fake_rules(load_fake_rule_pack(path))
+        return True
+    except Exception as e:
+        print(f"Fake rule reload error: {e}")
+        return False
+
+
+def _check_fake_rules_file():
+    """
+    Reloads the watched rule pack if its file changed since it was loaded.
+    """
+    watched = _fake_rules_file
+    if not watched['path'] or time.time() - watched['checked_at'] < FAKE_RULES_CHECK_SECONDS:
+        return
+    watched['checked_at'] = time.time()
+    if _rules_mtime(watched['path']) != watched['mtime']:
+        reload_fake_rules(watched['path'])
+
+
+# Compile the rules once at import
+try:
+    _fake_rules = compile_fake_rules(load_fake_rule_pack())
+except Exception as e:
+    print(f"Fake rule pack error, using defaults: {e}")
+    _fake_rules = compile_fake_rules(FAKE_RULE_PACK)
+
+
+def detect_fake_report(text, return_rule=False):
+    """
+    Detects fake, test, or spam reports.
+    Returns (is_fake, reason) tuple, or (is_fake, reason, rule_id)
+    if return_rule is True. rule_id is None when no rule matched.
     
-    for pattern in test_patterns:
-        if re.search(pattern, text_lower):
-            return True, "Test/demo report detected. Please submit a real incident."
     
-    # 2. Check for gibberish (too many consonants or vowels in a row)
-    if re.search(r'[bcdfghjklmnpqrstvwxyz]{6,}', text_lower):
-        return True, "Gibberish detected. Please provide a meaningful description."
+    Checks for:
+    - Test patterns (test1, test2, testing, etc.)
+    - Gibberish/random text
+    - Repeated words/characters
+    - Common spam patterns
+    - Low information content
+    """
+    _check_fake_rules_file()
+    rules = _fake_rules
+    messages = rules['messages']
+
+    def result(rule_id, **kwargs):
+        reason = messages[rule_id].format(**kwargs) if rule_id else ""
+        is_fake = rule_id is not None
+        return (is_fake, reason, rule_id) if return_rule else (is_fake, reason)
+
+    if not text or not isinstance(text, str):
+        return result('invalid_text')
     
+    text_lower = text.lower().strip()
+    words = text_lower.split()
+
+    # Single regex pass for checks 1 (test patterns), 2 (gibberish)
+    # and 6 (placeholder text); keep the best priority rule seen.
+    scan_hit = None
+    if rules['scanner'] is not None:
+        best = len(_SCAN_RULES)
+        for match in rules['scanner'].finditer(text_lower):
+            rank = _SCAN_RULES.index(match.lastgroup)
+            if rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        if best < len(_SCAN_RULES):
+            scan_hit = _SCAN_RULES[best]
+
+    # 1. Check for test patterns
+    # 2. Check for gibberish (too many consonants in a row)
+    if scan_hit in ('test_pattern', 'gibberish'):
+        return result(scan_hit)
+
+    # One histogram pass over words and one over characters
+    word_counts = Counter(words)
+    char_counts = Counter(text_lower)
+
     # 3. Check for repeated words
     if len(words) >= 3:
         # Check if more than 50% of words are duplicates
-        unique_words = set(words)
-        if len(unique_words) / len(words) < 0.5:
-            return True, "Too many repeated words. Please provide a detailed description."
+        if len(word_counts) / len(words) < 0.5:
+            return result('repeated_words')
     
     # 4. Check for single word repeated multiple times
-    word_counts = {}
-    for word in words:
-        if len(word) > 2:  # Ignore short words like "a", "is"
-            word_counts[word] = word_counts.get(word, 0) + 1
-    
-    for word, count in word_counts.items():
-        if count >= 3 and len(words) <= 10:  # Same word 3+ times in short text
-            return True, f"Repeated word '{word}' detected. Please provide a genuine description."
+    # (ignore short words like "a", "is")
+    if len(words) <= 10:
+        for word, count in word_counts.items():
+            if count >= 3 and len(word) > 2:  # Same word 3+ times in short text
+                return result('repeated_word', word=word)
     
     # 5. Check for very short words only (no substance)
-    long_words = [w for w in words if len(w) > 3]
-    if len(words) >= 3 and len(long_words) == 0:
-        return True, "No substantial words found. Please provide details."
+    if len(words) >= 3 and not any(len(w) > 3 for w in word_counts):
+        return result('short_words')
     
     # 6. Check for common spam/placeholder patterns
-    spam_phrases = [
-        'lorem ipsum',
-        'dolor sit amet',
-        'quick brown fox',
-        'the lazy dog',
-        'hello world',
-        'foo bar',
-        'blah blah',
-        'yada yada',
-        'etc etc',
-        'something something',
-    ]
-    
-    for phrase in spam_phrases:
-        if phrase in text_lower:
-            return True, "Placeholder text detected. Please describe a real incident."
+    if scan_hit == 'placeholder':
+        return result('placeholder')
     
     # 7. Check for number-only or mostly numbers
-    numbers_count = sum(1 for char in text if char.isdigit())
+    numbers_count = sum(count for char, count in char_counts.items() if char.isdigit())
     if numbers_count / len(text) > 0.5:
-        return True, "Too many numbers. Please provide a descriptive text."
+        return result('numeric')
     
     # 8. Check for very low information content (too generic)
     # Count meaningful words (not common stop words)
-    stop_words = {'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 
-                  'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
-                  'would', 'should', 'could', 'may', 'might', 'must', 'can',
-                  'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she',
-                  'it', 'we', 'they', 'what', 'which', 'who', 'when', 'where',
-                  'why', 'how', 'all', 'each', 'every', 'both', 'few', 'more',
-                  'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only',
-                  'own', 'same', 'so', 'than', 'too', 'very', 'just', 'but',
-                  'and', 'or', 'if', 'because', 'as', 'until', 'while', 'of',
-                  'at', 'by', 'for', 'with', 'about', 'against', 'between',
-                  'into', 'through', 'during', 'before', 'after', 'above',
-                  'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off'}
-    
-    meaningful_words = [w for w in words if w not in stop_words and len(w) > 2]
-    
-    if len(words) >= 5 and len(meaningful_words) < 2:
-        return True, "Not enough meaningful content. Please describe the incident in detail."
+    stop_words = rules['stop_words']
+    meaningful_count = sum(
+        count for word, count in word_counts.items()
+        if word not in stop_words and len(word) > 2
+    )
+    
+    if len(words) >= 5 and meaningful_count < 2:
+        return result('low_information')
     
     # 9. Check for single character repeated
-    for char in set(text_lower):
-        if char.isalpha() and text_lower.count(char) / len(text_lower) > 0.4:
-            return True, "Excessive character repetition detected. Please provide a real description."
+    for char, count in char_counts.items():
+        if char.isalpha() and count / len(text_lower) > 0.4:
+            return result('char_repetition')
     
     # 10. Check for keyboard mashing patterns
-    keyboard_patterns = [
-        'asdfgh', 'qwerty', 'zxcvbn', 'hjkl', 'yuiop',
-        '123456', '111111', '000000', 'aaaaaa', 'xxxxxx'
-    ]
-    
-    for pattern in keyboard_patterns:
-        if pattern in text_lower.replace(' ', ''):
-            return True, "Keyboard pattern detected. Please submit a genuine report."
+    if rules['keyboard'] is not None and rules['keyboard'].search(text_lower.replace(' ', '')):
+        return result('keyboard_pattern')
     
     # All checks passed - appears to be legitimate
-    return False, ""
+    return result(None)
 
 
 # ==================== CATEGORY CLASSIFICATION ====================
@@ -449,6 +632,25 @@ TRAINING_DATA = {
     ]
 }
 
+# Classifier hyperparameters (part of the model fingerprint)
+CLASSIFIER_PARAMS = {
+    'tfidf': {
+        'max_features': 500,
+        'ngram_range': (1, 2),  # Use unigrams and bigrams
+        'stop_words': 'english',
+    },
+    'clf': {
+        'alpha': 0.1,
+    },
+}
+
+# Directory for persisted model artifacts
+MODEL_CACHE_DIR = os.environ.get(
+    'MODEL_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.model_cache')
+)
+
+
 # Create and train the classification model
 def create_classifier():
     """
@@ -465,12 +667,8 @@ def create_classifier():
     
     # Create pipeline
     classifier = Pipeline([
-        ('tfidf', TfidfVectorizer(
-            max_features=500,
-            ngram_range=(1, 2),  # Use unigrams and bigrams
-            stop_words='english'
-        )),
-        ('clf', MultinomialNB(alpha=0.1))
+        ('tfidf', TfidfVectorizer(**CLASSIFIER_PARAMS['tfidf'])),
+        ('clf', MultinomialNB(**CLASSIFIER_PARAMS['clf']))
     ])
     
     # Train the model
@@ -478,8 +676,322 @@ def create_classifier():
     
     return classifier
 
+
+def classifier_fingerprint():
+    """
+    Returns a short hash of the training data, the hyperparameters and the
+    scikit-learn version. A persisted model is only reused if it matches.
+    """
+    payload = json.dumps({
+        'training_data': TRAINING_DATA,
+        'params': CLASSIFIER_PARAMS,
+        'sklearn': sklearn.__version__,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load_classifier(cache_dir=None):
+    """
+    Loads the trained classifier from the model cache, memory-mapping its
+    arrays. The model is retrained and saved only when no artifact matches
+    the current fingerprint.
+    """
+    cache_dir = cache_dir or MODEL_CACHE_DIR
+    path = os.path.join(cache_dir, f"classifier-{classifier_fingerprint()}.joblib")
+    
+    if os.path.exists(path):
+        try:
+            return joblib.load(path, mmap_mode='r')
+        except Exception as e:
+            print(f"Model cache load error, retraining: {e}")
+    
+    classifier = create_classifier()
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so other processes never
+        # load a half-written artifact
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(classifier, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Model cache save error: {e}")
+    
+    return classifier
+
+
+# ==================== ONLINE LEARNING ====================
+
+# 'batch' trains TF-IDF + Naive Bayes on TRAINING_DATA. 'online' uses hashed
+# features with a fixed memory footprint and keeps learning from
+# admin-resolved incidents with partial_fit.
+CLASSIFIER_MODE = os.environ.get('CLASSIFIER_MODE', 'batch')
+
+# Online classifier hyperparameters (part of the online fingerprint).
+# Feature count fixes the model size: n_features x classes x 2 float64 arrays.
+ONLINE_PARAMS = {
+    'hashing': {
+        'n_features': 2 ** 17,
+        'ngram_range': (1, 2),
+        'stop_words': 'english',
+        'alternate_sign': False,  # Naive Bayes needs non-negative features
+        'norm': 'l2',
+    },
+    'clf': {
+        'alpha': 0.1,
+    },
+}
+
+# Minimum seconds between automatic checkpoints of the online model
+ONLINE_CHECKPOINT_INTERVAL = float(os.environ.get('ONLINE_CHECKPOINT_INTERVAL', '300'))
+
+_online_lock = threading.Lock()
+
+
+def online_fingerprint():
+    """
+    Returns a short hash of the online hyperparameters, the class labels
+    and the scikit-learn version. Checkpoints are only reused if it matches.
+    """
+    payload = json.dumps({
+        'params': ONLINE_PARAMS,
+        'classes': sorted(TRAINING_DATA),
+        'sklearn': sklearn.__version__,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def create_online_classifier():
+    """
+    Creates a hashed-feature Naive Bayes pipeline seeded with TRAINING_DATA.
+    Returns (classifier, state).
+    """
+    classifier = Pipeline([
+        ('hashing', HashingVectorizer(**ONLINE_PARAMS['hashing'])),
+        ('clf', MultinomialNB(**ONLINE_PARAMS['clf']))
+    ])
+    
+    texts = []
+    labels = []
+    for category, examples in TRAINING_DATA.items():
+        texts.extend(examples)
+        labels.extend([category] * len(examples))
+    
+    classifier[-1].partial_fit(classifier[:-1].transform(texts), labels, classes=list(TRAINING_DATA))
+    
+    state = {
+        'watermark': None,  # (updated_at, report_id) of the last learned incident
+        'samples_seen': len(texts),
+        'updates': 0,
+        'checkpointed_at': 0.0,
+    }
+    return classifier, state
+
+
+def _online_checkpoint_path(cache_dir=None):
+    return os.path.join(cache_dir or MODEL_CACHE_DIR, f"online-{online_fingerprint()}.joblib")
+
+
+def load_online_classifier(cache_dir=None):
+    """
+    Loads the latest online checkpoint, or creates a new online classifier.
+    Returns (classifier, state).
+    """
+    path = _online_checkpoint_path(cache_dir)
+    
+    if os.path.exists(path):
+        try:
+            checkpoint = joblib.load(path)
+            return checkpoint['classifier'], checkpoint['state']
+        except Exception as e:
+            print(f"Online checkpoint load error, starting fresh: {e}")
+    
+    return create_online_classifier()
+
+
+def save_online_checkpoint(cache_dir=None):
+    """
+    Saves the online classifier and its state so new processes start from
+    the latest model. Returns True on success.
+    """
+    path = _online_checkpoint_path(cache_dir)
+    
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _online_state['checkpointed_at'] = time.time()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump({'classifier': _classifier, 'state': _online_state}, tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Online checkpoint save error: {e}")
+        return False
+
+
+def partial_fit_incidents(texts, labels, checkpoint=True):
+    """
+    Updates the online classifier with labelled texts. Labels that aren't
+    known categories are skipped.
+    The model is updated on a copy and swapped in, so concurrent requests
+    never see a half-updated model. Returns the number of texts learned.
+    """
+    global _classifier, MODEL_FINGERPRINT
+    
+    if CLASSIFIER_MODE != 'online':
+        print("Online learning requires CLASSIFIER_MODE=online")
+        return 0
+    
+    pairs = [(preprocess_text(text), label) for text, label in zip(texts, labels)
+             if label in TRAINING_DATA]
+    pairs = [(text, label) for text, label in pairs if text]
+    if not pairs:
+        return 0
+    
+    with _online_lock:
+        classifier = copy.deepcopy(_classifier)
+        features = classifier[:-1].transform([text for text, _ in pairs])
+        classifier[-1].partial_fit(features, [label for _, label in pairs])
+        
+        _classifier = classifier
+        _online_state['samples_seen'] += len(pairs)
+        _online_state['updates'] += 1
+        MODEL_FINGERPRINT = f"online-{online_fingerprint()}-{_online_state['updates']}"
+        
+        if checkpoint and time.time() - _online_state['checkpointed_at'] >= ONLINE_CHECKPOINT_INTERVAL:
+            save_online_checkpoint()
+    
+    return len(pairs)
+
+
+def stream_training_jsonl(path, chunk_size=1000):
+    """
+    Trains the online classifier from a JSONL file of
+    {"text": ..., "label": ...} lines (or "description"/"category"),
+    reading chunk_size lines at a time. Returns the number of texts learned.
+    """
+    learned = 0
+    texts, labels = [], []
+    
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            texts.append(record.get('text') or record.get('description'))
+            labels.append(record.get('label') or record.get('category'))
+            if len(texts) >= chunk_size:
+                learned += partial_fit_incidents(texts, labels, checkpoint=False)
+                texts, labels = [], []
+    
+    if texts:
+        learned += partial_fit_incidents(texts, labels, checkpoint=False)
+    
+    if learned:
+        save_online_checkpoint()
+    return learned
+
+
+def learn_from_resolved_incidents(batch_size=500):
+    """
+    Learns from incidents resolved by admins since the last watermark,
+    fetching them from the database in batches. Only new rows are read.
+    Returns the number of incidents learned.
+    """
+    from database import get_resolved_incidents
+    
+    if CLASSIFIER_MODE != 'online':
+        print("Online learning requires CLASSIFIER_MODE=online")
+        return 0
+    
+    learned = 0
+    while True:
+        rows = get_resolved_incidents(since=_online_state['watermark'], limit=batch_size)
+        if not rows:
+            break
+        learned += partial_fit_incidents(
+            [row.get('description') for row in rows],
+            [row.get('category') for row in rows],
+            checkpoint=False
+        )
+        last = rows[-1]
+        _online_state['watermark'] = (last.get('updated_at'), last.get('report_id'))
+        if len(rows) < batch_size:
+            break
+    
+    if learned:
+        save_online_checkpoint()
+    return learned
+
+
+def use_classifier(mode, cache_dir=None):
+    """
+    Loads the 'batch' or 'online' classifier (from cache_dir, default
+    MODEL_CACHE_DIR, which checkpoints then also go to) and makes it the
+    one this process uses.
+    """
+    global CLASSIFIER_MODE, MODEL_CACHE_DIR, MODEL_FINGERPRINT, _classifier, _online_state
+    with _online_lock:
+        MODEL_CACHE_DIR = cache_dir or MODEL_CACHE_DIR
+        CLASSIFIER_MODE = mode
+        if mode == 'online':
+            _classifier, _online_state = load_online_classifier()
+            MODEL_FINGERPRINT = f"online-{online_fingerprint()}-{_online_state['updates']}"
+        else:
+            _classifier, _online_state = load_classifier(), None
+            MODEL_FINGERPRINT = classifier_fingerprint()
+
+
 # Initialize the classifier
-_classifier = create_classifier()
+use_classifier(CLASSIFIER_MODE)
+
+
+# ==================== ANALYSIS CONTEXT ====================
+
+class AnalysisContext:
+    """
+    Holds the intermediate results for one report so every stage shares them.
+    The cleaned text, tokens, TF-IDF row, class probabilities, sentiment and
+    lexicon scores are each computed once, on first access.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    @cached_property
+    def cleaned_text(self):
+        return preprocess_text(self.text)
+
+    @cached_property
+    def tokens(self):
+        return tokenize_text(self.cleaned_text)
+
+    @cached_property
+    def features(self):
+        # Every pipeline step except the final estimator
+        return _classifier[:-1].transform([self.cleaned_text])
+
+    @cached_property
+    def probabilities(self):
+        return _classifier[-1].predict_proba(self.features)[0]
+
+    @cached_property
+    def sentiment(self):
+        return _score_sentiments([self])[0]
+
+    @cached_property
+    def lexicon_scores(self):
+        hits, _ = scan_tokens(self.tokens)
+        return lexicon_group_scores(hits)
+
+
+def get_context(text):
+    """
+    Returns an AnalysisContext for the text, or the text itself if it
+    already is one.
+    """
+    if isinstance(text, AnalysisContext):
+        return text
+    return AnalysisContext(text)
 
 
 def classify_incident(text, return_confidence=False):
@@ -487,26 +999,25 @@ def classify_incident(text, return_confidence=False):
     Classifies incident text into categories using ML.
     
     Args:
-        text: Input text to classify
+        text: Input text (or AnalysisContext) to classify
         return_confidence: If True, returns (category, confidence)
     
     Returns:
         category name or (category, confidence) tuple
     """
-    # Preprocess text
-    cleaned_text = preprocess_text(text)
+    context = get_context(text)
     
-    if not cleaned_text:
+    if not context.cleaned_text:
         return ("Other", 0.0) if return_confidence else "Other"
     
     try:
-        # Get prediction
-        category = _classifier.predict([cleaned_text])[0]
+        # Get prediction from the probability scores
+        probabilities = context.probabilities
+        best = int(np.argmax(probabilities))
+        category = _classifier.classes_[best]
         
         if return_confidence:
-            # Get probability scores
-            probabilities = _classifier.predict_proba([cleaned_text])[0]
-            confidence = float(np.max(probabilities))
+            confidence = float(probabilities[best])
             return category, confidence
         
         return category
@@ -518,22 +1029,219 @@ def classify_incident(text, return_confidence=False):
 
 # ==================== SENTIMENT ANALYSIS ====================
 
-def sentiment_score(text):
+# 'lexicon' scores with the built-in engine below, 'textblob' with TextBlob.
+# The lexicon engine falls back to TextBlob if the lexicon can't be loaded.
+SENTIMENT_ENGINE = os.environ.get('SENTIMENT_ENGINE', 'lexicon')
+
+# Polarity lexicon compiled from TextBlob's (Pattern) en-sentiment.xml,
+# see build_sentiment_lexicon
+SENTIMENT_LEXICON_PATH = os.environ.get(
+    'SENTIMENT_LEXICON_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_lexicon.tsv')
+)
+
+SENTIMENT_NEGATIONS = ('no', 'not', "n't", 'never')
+
+
+def build_sentiment_lexicon(path=None):
     """
-    Analyzes sentiment of text using TextBlob.
-    Returns polarity score between -1 (negative) and 1 (positive).
+    Compiles TextBlob's sentiment lexicon into a TSV of
+    word, polarity, intensity and modifier flag (1 for adverbs such as
+    "very" that scale the next word). Word senses and part-of-speech tags
+    are averaged the same way TextBlob does for plain strings.
+    Requires TextBlob; only needed to regenerate sentiment_lexicon.tsv.
+    """
+    from textblob.en import sentiment as pattern_sentiment
+    
+    path = path or SENTIMENT_LEXICON_PATH
+    pattern_sentiment.load()
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# word\tpolarity\tintensity\tmodifier\n")
+        for word, tags in sorted(dict.items(pattern_sentiment)):
+            # Multi-word entries never match a single token
+            if not re.fullmatch(r"[\w'-]+", word):
+                continue
+            polarity, _, intensity = tags[None]
+            modifier = int('RB' in tags)
+            f.write(f"{word}\t{polarity!r}\t{intensity!r}\t{modifier}\n")
+
+
+def load_sentiment_lexicon(path=None):
     """
-    cleaned_text = preprocess_text(text)
+    Loads the polarity lexicon into NumPy arrays indexed by word id.
+    Returns None if the lexicon file is missing or unreadable.
+    """
+    path = path or SENTIMENT_LEXICON_PATH
     
-    if not cleaned_text:
-        return 0.0
+    try:
+        words, polarity, intensity, modifier = [], [], [], []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#') or not line.strip():
+                    continue
+                word, p, i, m = line.rstrip('\n').split('\t')
+                words.append(word)
+                polarity.append(float(p))
+                intensity.append(float(i))
+                modifier.append(m == '1')
+    except Exception as e:
+        print(f"Sentiment lexicon load error: {e}")
+        return None
+    
+    return {
+        'index': {word: i for i, word in enumerate(words)},
+        'polarity': np.array(polarity, dtype=np.float64),
+        'intensity': np.array(intensity, dtype=np.float64),
+        'modifier': np.array(modifier, dtype=bool),
+    }
+
+
+_sentiment_lexicon = load_sentiment_lexicon() if SENTIMENT_ENGINE == 'lexicon' else None
+
+
+def _previous_index(mask, doc):
+    """
+    For every token, the index of the closest earlier token in the same text
+    where mask is True, or -1.
+    """
+    positions = np.arange(len(mask))
+    last = np.maximum.accumulate(np.where(mask, positions, -1))
+    previous = np.concatenate(([-1], last[:-1]))
+    same_doc = doc[np.maximum(previous, 0)] == doc
+    return np.where((previous >= 0) & same_doc, previous, -1)
+
+
+def lexicon_polarities(token_lists, lexicon=None):
+    """
+    Scores a batch of tokenized, lowercased texts with the polarity lexicon.
+    Returns an array with one polarity per text (0.0 if no word is known).
+    
+    Follows TextBlob's rules in vectorized form over the flattened batch:
+    - An assessment is started by each known word
+    - A known modifier ("very") merges with the next known word, scaling
+      its polarity by the modifier's intensity ("very bad")
+    - A preceding negation ("not good") inverts the intensity and halves
+      and flips the final polarity
+    - Each "!" after an assessment boosts its polarity by 25%
+    - The text polarity is the mean over assessments
+    """
+    lexicon = lexicon or _sentiment_lexicon
+    n_docs = len(token_lists)
+    tokens = [token for token_list in token_lists for token in token_list]
+    if not tokens:
+        return np.zeros(n_docs)
+    
+    doc = np.repeat(np.arange(n_docs), [len(token_list) for token_list in token_lists])
+    index = lexicon['index']
+    ids = np.fromiter((index.get(token, -1) for token in tokens), dtype=np.int64, count=len(tokens))
+    lengths = np.fromiter((len(token.strip("'")) for token in tokens), dtype=np.int64, count=len(tokens))
+    negation = np.fromiter((token in SENTIMENT_NEGATIONS for token in tokens), dtype=bool, count=len(tokens))
+    exclamation = np.fromiter((token == '!' for token in tokens), dtype=bool, count=len(tokens))
+    
+    known = ids >= 0
+    safe_ids = np.where(known, ids, 0)
+    polarity = np.where(known, lexicon['polarity'][safe_ids], 0.0)
+    intensity = np.where(known, lexicon['intensity'][safe_ids], 1.0)
+    modifier = known & lexicon['modifier'][safe_ids]
+    
+    # Unknown words of up to two letters keep a pending modifier
+    # ("really is good"), single characters keep a pending negation
+    blocks_modifier = known | (lengths > 2)
+    prev_m = _previous_index(blocks_modifier, doc)
+    
+    # A negation right after an "-ly" modifier negates the modifier's
+    # assessment and keeps the modifier pending ("seriously not safe")
+    ly_modifier = modifier & np.fromiter((token.endswith('ly') for token in tokens), dtype=bool, count=len(tokens))
+    attached = negation & ~known & (prev_m >= 0) & ly_modifier[np.maximum(prev_m, 0)]
+    if attached.any():
+        prev_m = _previous_index(blocks_modifier & ~attached, doc)
+    
+    prev_n = _previous_index(known | (lengths > 1), doc)
+    
+    merges = known & (prev_m >= 0) & modifier[np.maximum(prev_m, 0)]
+    negated = (known & (prev_n >= 0) & negation[np.maximum(prev_n, 0)]
+               & ~attached[np.maximum(prev_n, 0)])
+    starts = known & ~merges
+    
+    intensity = np.where(negated, 1.0 / intensity, intensity)
+    scaled = np.clip(polarity * intensity[np.maximum(prev_m, 0)], -1.0, 1.0)
+    polarity = np.where(merges, scaled, polarity)
+    
+    # Group each start and its merged words into one assessment
+    n_assessments = int(starts.sum())
+    if n_assessments == 0:
+        return np.zeros(n_docs)
+    assessment = np.cumsum(starts) - 1
+    known_positions = np.flatnonzero(known)
+    last_position = np.full(n_assessments, -1)
+    np.maximum.at(last_position, assessment[known_positions], known_positions)
+    
+    values = polarity[last_position]
+    is_negated = np.bincount(assessment[known_positions], weights=negated[known_positions],
+                             minlength=n_assessments) > 0
+    is_negated[assessment[np.flatnonzero(attached)]] = True
+    
+    # "!" boosts the latest assessment, unless a later word merges into it
+    prev_start = _previous_index(starts, doc)
+    boosted = exclamation & (prev_start >= 0)
+    targets = assessment[prev_start[boosted]]
+    targets = targets[last_position[targets] < np.flatnonzero(boosted)]
+    boosts = np.bincount(targets, minlength=n_assessments)
+    values = np.clip(values * 1.25 ** boosts, -1.0, 1.0)
+    
+    values = np.where(is_negated, values * -0.5, values)
+    
+    assessment_doc = doc[starts]
+    totals = np.bincount(assessment_doc, weights=values, minlength=n_docs)
+    counts = np.bincount(assessment_doc, minlength=n_docs)
+    return totals / np.maximum(counts, 1)
+
+
+def _score_sentiments(contexts):
+    """
+    Returns rounded polarity scores for a list of AnalysisContexts.
+    """
+    scores = [0.0] * len(contexts)
+    pending = [i for i, context in enumerate(contexts) if context.cleaned_text]
+    if not pending:
+        return scores
     
     try:
-        blob = TextBlob(cleaned_text)
-        return round(blob.sentiment.polarity, 3)
+        if _sentiment_lexicon is not None:
+            polarities = lexicon_polarities([contexts[i].tokens for i in pending])
+            for i, polarity in zip(pending, polarities):
+                scores[i] = round(float(polarity), 3)
+        else:
+            for i in pending:
+                blob = TextBlob(contexts[i].cleaned_text)
+                scores[i] = round(blob.sentiment.polarity, 3)
     except Exception as e:
         print(f"Sentiment analysis error: {e}")
-        return 0.0
+    
+    return scores
+
+
+def sentiment_score(text):
+    """
+    Analyzes sentiment of text (or AnalysisContext).
+    Returns polarity score between -1 (negative) and 1 (positive).
+    """
+    return get_context(text).sentiment
+
+
+def sentiment_scores(texts):
+    """
+    Batch form of sentiment_score for a list of texts or AnalysisContexts.
+    Scores all texts in one vectorized lexicon pass.
+    """
+    contexts = [get_context(text) for text in texts]
+    pending = [context for context in contexts if 'sentiment' not in vars(context)]
+    
+    for context, score in zip(pending, _score_sentiments(pending)):
+        context.sentiment = score
+    
+    return [context.sentiment for context in contexts]
 
 
 def get_sentiment_label(polarity):
@@ -548,32 +1256,179 @@ def get_sentiment_label(polarity):
         return "Neutral"
 
 
+# ==================== LEXICON SCANNER ====================
+
+# Emotion keywords. A term is a word or phrase, optionally with a weight:
+# ('terrified', 1.5). Unweighted terms count 1.
+EMOTION_KEYWORDS = {
+    'fear': ['scared', 'afraid', 'terrified', 'frightened', 'worried', 'anxious', 'panic',
+             'panicked', 'panicking'],
+    'anger': ['angry', 'furious', 'mad', 'outraged', 'irritated', 'annoyed', 'frustrated'],
+    'sadness': ['sad', 'depressed', 'upset', 'hurt', 'disappointed', 'miserable', 'unhappy',
+                'hurts', 'hurting'],
+    'disgust': ['disgusted', 'revolted', 'sick', 'repulsed', 'appalled'],
+    'distress': ['distressed', 'troubled', 'disturbed', 'uncomfortable', 'uneasy', 'helpless']
+}
+
+# High urgency keywords. A trailing '*' matches any word starting with the
+# stem ('attack*' matches attacks, attacked, attacker, ...).
+URGENCY_KEYWORDS = ['emergenc*', 'urgent*', 'immediate*', 'danger*', 'threat*', 'weapon*',
+                    'assault*', 'attack*', 'bleed*', 'injur*', 'help', 'helps', 'helping', 'now']
+
+# A term is negated if one of these appears up to LEXICON_NEGATION_WINDOW
+# tokens before it ("not scared", "never felt so afraid"). Apostrophes are
+# removed by preprocessing, so contractions appear as "dont", "isnt", ...
+LEXICON_NEGATIONS = ('no', 'not', 'never', 'dont', 'didnt', 'doesnt', 'isnt',
+                     'wasnt', 'arent', 'werent', 'cant', 'cannot', 'wont')
+LEXICON_NEGATION_WINDOW = 3
+
+# Urgency terms are only negated right after the negation ("no danger"):
+# "there is no one to help me" is still a cry for help
+URGENCY_NEGATION_WINDOW = 1
+
+# Punctuation ends the reach of a negation
+_CLAUSE_BREAKS = frozenset('.,!?')
+
+
+def compile_lexicon_scanner(groups, negation_windows=None):
+    """
+    Compiles {group: [term or (term, weight), ...]} into a token-level
+    scanner. Terms only match whole tokens, so "now" does not match "know"
+    and "help" does not match "helpful"; a single-word term ending in '*'
+    matches any token with that prefix. negation_windows overrides
+    LEXICON_NEGATION_WINDOW per group.
+    """
+    negation_windows = negation_windows or {}
+    terms, term_groups, weights, windows = [], [], [], []
+    index, prefixes = {}, {}
+    
+    for group_id, (group, group_terms) in enumerate(groups.items()):
+        for term in group_terms:
+            term, weight = (term, 1.0) if isinstance(term, str) else term
+            phrase = tuple(term.lower().split())
+            if len(phrase) == 1 and phrase[0].endswith('*'):
+                prefixes[phrase[0][:-1]] = len(terms)
+            else:
+                index.setdefault(phrase[0], []).append((phrase, len(terms)))
+            terms.append(term)
+            term_groups.append(group_id)
+            weights.append(float(weight))
+            windows.append(negation_windows.get(group, LEXICON_NEGATION_WINDOW))
+    
+    # Try longer phrases first at each position
+    for candidates in index.values():
+        candidates.sort(key=lambda candidate: -len(candidate[0]))
+    
+    return {
+        'groups': list(groups),
+        'terms': terms,
+        'term_groups': np.array(term_groups, dtype=np.int64),
+        'weights': np.array(weights, dtype=np.float64),
+        'index': index,
+        'prefixes': prefixes,
+        # Longest stem first
+        'prefix_lengths': sorted({len(stem) for stem in prefixes}, reverse=True),
+        'negation_windows': windows,
+        'negations': frozenset(LEXICON_NEGATIONS),
+    }
+
+
+_lexicon_scanner = compile_lexicon_scanner({**EMOTION_KEYWORDS, 'urgency': URGENCY_KEYWORDS},
+                                           {'urgency': URGENCY_NEGATION_WINDOW})
+
+# Part of the analysis cache key, so keyword changes don't serve stale urgency
+LEXICON_FINGERPRINT = cache_key(*_lexicon_scanner['terms'], *_lexicon_scanner['negation_windows'])[:12]
+
+
+def scan_tokens(tokens, scanner=None):
+    """
+    Scans a token list once for every lexicon term.
+    Returns (hits, negated): dicts of term id -> occurrence count, for plain
+    and negated occurrences.
+    """
+    scanner = scanner or _lexicon_scanner
+    index = scanner['index']
+    prefixes = scanner['prefixes']
+    windows = scanner['negation_windows']
+    negations = scanner['negations']
+    hits, negated = {}, {}
+    no_negation = -max(windows, default=0) - 1
+    last_negation = no_negation
+    
+    for position, token in enumerate(tokens):
+        if token in negations:
+            last_negation = position
+            continue
+        if token in _CLAUSE_BREAKS:
+            last_negation = no_negation
+            continue
+        term_id = None
+        for phrase, candidate in index.get(token, ()):
+            if tuple(tokens[position:position + len(phrase)]) == phrase:
+                term_id = candidate
+                break
+        else:
+            for length in scanner['prefix_lengths']:
+                term_id = prefixes.get(token[:length])
+                if term_id is not None:
+                    break
+        if term_id is not None:
+            target = negated if position - last_negation <= windows[term_id] else hits
+            target[term_id] = target.get(term_id, 0) + 1
+    
+    return hits, negated
+
+
+def scan_lexicon(texts, scanner=None):
+    """
+    Batch form of scan_tokens for a list of texts or AnalysisContexts.
+    Returns (counts, negated): sparse matrices of shape (texts, terms).
+    """
+    from scipy.sparse import csr_matrix
+    
+    scanner = scanner or _lexicon_scanner
+    shape = (len(texts), len(scanner['terms']))
+    entries = ([], [], []), ([], [], [])
+    
+    for row, text in enumerate(texts):
+        for (data, rows, cols), found in zip(entries, scan_tokens(get_context(text).tokens, scanner)):
+            for term_id, count in found.items():
+                data.append(count)
+                rows.append(row)
+                cols.append(term_id)
+    
+    return tuple(csr_matrix((data, (rows, cols)), shape=shape, dtype=np.int64)
+                 for data, rows, cols in entries)
+
+
+def lexicon_group_scores(hits, scanner=None):
+    """
+    Turns scan hits into {group: score}; a group scores the summed weights
+    of its distinct matched terms. Groups without matches are left out.
+    """
+    scanner = scanner or _lexicon_scanner
+    scores = {}
+    
+    for term_id in hits:
+        group = scanner['groups'][scanner['term_groups'][term_id]]
+        scores[group] = scores.get(group, 0.0) + float(scanner['weights'][term_id])
+    
+    # Keep the group definition order
+    return {group: scores[group] for group in scanner['groups'] if group in scores}
+
+
 def analyze_emotions(text):
     """
-    Detects emotional tone in text.
+    Detects emotional tone in text (or AnalysisContext).
     Returns primary emotion and intensity.
     """
-    cleaned_text = preprocess_text(text)
+    context = get_context(text)
     
-    if not cleaned_text:
+    if not context.cleaned_text:
         return "Neutral", 0.0
     
-    # Emotion keywords
-    emotions = {
-        'fear': ['scared', 'afraid', 'terrified', 'frightened', 'worried', 'anxious', 'panic'],
-        'anger': ['angry', 'furious', 'mad', 'outraged', 'irritated', 'annoyed', 'frustrated'],
-        'sadness': ['sad', 'depressed', 'upset', 'hurt', 'disappointed', 'miserable', 'unhappy'],
-        'disgust': ['disgusted', 'revolted', 'sick', 'repulsed', 'appalled'],
-        'distress': ['distressed', 'troubled', 'disturbed', 'uncomfortable', 'uneasy', 'helpless']
-    }
-    
-    text_lower = cleaned_text.lower()
-    emotion_scores = {}
-    
-    for emotion, keywords in emotions.items():
-        score = sum(1 for keyword in keywords if keyword in text_lower)
-        if score > 0:
-            emotion_scores[emotion] = score
+    emotion_scores = {group: score for group, score in context.lexicon_scores.items()
+                      if group in EMOTION_KEYWORDS}
     
     if not emotion_scores:
         return "Neutral", 0.0
@@ -587,17 +1442,11 @@ def analyze_emotions(text):
 
 def get_urgency_suggestion(text, category, sentiment):
     """
-    Suggests urgency level based on text analysis.
+    Suggests urgency level based on text (or AnalysisContext) analysis.
     Returns: 'Low', 'Medium', or 'High'
     """
-    text_lower = text.lower()
-    
-    # High urgency keywords
-    high_urgency_words = ['emergency', 'urgent', 'immediate', 'danger', 'threat', 'weapon', 
-                          'assault', 'attack', 'bleeding', 'injured', 'help', 'now']
-    
-    # Check for high urgency
-    if any(word in text_lower for word in high_urgency_words):
+    # Check for high urgency keywords (negated ones don't count)
+    if 'urgency' in get_context(text).lexicon_scores:
         return 'High'
     
     # Category-based urgency
@@ -616,10 +1465,42 @@ def get_urgency_suggestion(text, category, sentiment):
 
 # ==================== COMPREHENSIVE ANALYSIS ====================
 
-def analyze_incident(text):
+# Results of _complete_analysis keyed by cleaned text and MODEL_FINGERPRINT,
+# so reruns and repeated texts skip the model work (see result_cache.py)
+_analysis_cache = ResultCache()
+
+
+def _analysis_key(cleaned_text):
+    return cache_key(MODEL_FINGERPRINT, SENTIMENT_ENGINE, LEXICON_FINGERPRINT, cleaned_text)
+
+
+def analysis_cache_stats():
     """
-    Performs comprehensive analysis on incident text.
-    Returns dictionary with all analysis results.
+    Returns the analysis cache hit/miss counters.
+    """
+    return _analysis_cache.stats()
+
+
+def clear_analysis_cache():
+    """
+    Empties the analysis cache (memory and disk).
+    """
+    _analysis_cache.clear()
+
+
+def model_version():
+    """
+    Identifies the classifier and sentiment engine behind stored category
+    and sentiment values (the incidents' model_version column).
+    """
+    return f"{MODEL_FINGERPRINT}-{SENTIMENT_ENGINE}"
+
+
+def _screen_incident(text):
+    """
+    Runs the text-only stages of the analysis: validation, fake detection
+    and preprocessing.
+    Returns (rejection, cleaned_text); rejection is None if the text passed.
     """
     # Validate input
     is_valid, error_msg = validate_input(text)
@@ -627,7 +1508,7 @@ def analyze_incident(text):
         return {
             'valid': False,
             'error': error_msg
-        }
+        }, ""
     
     # Check for fake/test reports
     is_fake, fake_reason = detect_fake_report(text)
@@ -636,13 +1517,21 @@ def analyze_incident(text):
             'valid': False,
             'error': fake_reason,
             'is_fake': True
-        }
+        }, ""
     
     # Preprocess
-    cleaned_text = preprocess_text(text)
+    return None, preprocess_text(text)
+
+
+def _complete_analysis(context):
+    """
+    Runs classification and the stages that follow it on a screened
+    AnalysisContext and builds the result dict.
+    """
+    cleaned_text = context.cleaned_text
     
     # Classification
-    category, confidence = classify_incident(cleaned_text, return_confidence=True)
+    category, confidence = classify_incident(context, return_confidence=True)
     
     # Secondary fake detection: Check if classified as Fake/Spam
     is_likely_fake = False
@@ -664,14 +1553,14 @@ def analyze_incident(text):
             fake_warning = "⚠️ Warning: This report appears suspicious. Please ensure it's a genuine incident."
     
     # Sentiment analysis
-    sentiment = sentiment_score(cleaned_text)
+    sentiment = sentiment_score(context)
     sentiment_label = get_sentiment_label(sentiment)
     
     # Emotion detection
-    emotion, emotion_intensity = analyze_emotions(cleaned_text)
+    emotion, emotion_intensity = analyze_emotions(context)
     
     # Urgency suggestion
-    urgency = get_urgency_suggestion(cleaned_text, category, sentiment)
+    urgency = get_urgency_suggestion(context, category, sentiment)
     
     result = {
         'valid': True,
@@ -691,3 +1580,138 @@ def analyze_incident(text):
         result['is_suspicious'] = True
     
     return result
+
+
+@timed('analyze_incident')
+def analyze_incident(text, check_duplicates=True):
+    """
+    Performs comprehensive analysis on incident text.
+    Returns dictionary with all analysis results.
+    
+    With check_duplicates, the text is compared against recently stored
+    incidents: near-verbatim copies are rejected, close variants flagged.
+    """
+    rejection, cleaned_text = _screen_incident(text)
+    if rejection is not None:
+        return rejection
+    
+    # Near-duplicate check before any model work
+    duplicate = find_near_duplicate(text) if check_duplicates else None
+    if duplicate and duplicate[1] >= DUPLICATE_REJECT_THRESHOLD:
+        return {
+            'valid': False,
+            'error': "This report is nearly identical to one that was already submitted. Please don't submit the same incident twice.",
+            'is_duplicate': True,
+            'duplicate_of': duplicate[0],
+            'similarity': duplicate[1]
+        }
+    
+    # Screening always runs on the raw text; everything after it only
+    # depends on the cleaned text and the model, so it can be cached
+    key = _analysis_key(cleaned_text)
+    result = _analysis_cache.get(key)
+    if result is None:
+        # Share the cleaned text, TF-IDF row and probabilities across stages
+        context = AnalysisContext(text)
+        context.cleaned_text = cleaned_text
+        
+        result = _complete_analysis(context)
+        _analysis_cache.put(key, result)
+    
+    if duplicate and result['valid']:
+        result['duplicate_of'] = duplicate[0]
+        result['similarity'] = duplicate[1]
+        result['is_suspicious'] = True
+        result.setdefault('warning', "⚠️ Warning: This report is very similar to a recent submission.")
+    
+    return result
+
+
+def analyze_incidents(texts, n_jobs=None, chunksize=256):
+    """
+    Performs comprehensive analysis on a batch of incident texts.
+    Returns a list of result dicts, one per text, identical to what
+    analyze_incident(text, check_duplicates=False) would return for each
+    text.
+    
+    Validation, fake detection and preprocessing run over the whole batch
+    first (in a process pool if n_jobs > 1). The accepted texts are then
+    classified with a single TF-IDF transform and predict_proba call and
+    scored for sentiment in one vectorized pass.
+    """
+    texts = list(texts)
+    
+    if n_jobs and n_jobs > 1 and len(texts) > chunksize:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            screened = list(pool.map(_screen_incident, texts, chunksize=chunksize))
+    else:
+        screened = [_screen_incident(text) for text in texts]
+    
+    results = [rejection for rejection, _ in screened]
+    contexts = {}
+    keys = {}
+    pending_keys = set()
+    repeats = {}
+    for i, (rejection, cleaned_text) in enumerate(screened):
+        if rejection is None:
+            key = _analysis_key(cleaned_text)
+            if key in pending_keys:
+                # Same cleaned text earlier in the batch: analyse it once
+                repeats[i] = key
+                continue
+            cached = _analysis_cache.get(key)
+            if cached is not None:
+                results[i] = cached
+                continue
+            context = AnalysisContext(texts[i])
+            context.cleaned_text = cleaned_text
+            contexts[i] = context
+            keys[i] = key
+            pending_keys.add(key)
+    
+    # Classification: one vectorizer transform and one predict_proba call,
+    # stored on each context so the per-text stages reuse them
+    pending = [i for i, context in contexts.items() if context.cleaned_text]
+    if pending:
+        try:
+            features = _classifier[:-1].transform([contexts[i].cleaned_text for i in pending])
+            probabilities = _classifier[-1].predict_proba(features)
+            for row, i in enumerate(pending):
+                contexts[i].features = features[row]
+                contexts[i].probabilities = probabilities[row]
+        except Exception as e:
+            print(f"Classification error: {e}")
+    
+    # Sentiment: one vectorized lexicon pass over the batch
+    sentiment_scores(list(contexts.values()))
+    
+    by_key = {}
+    for i, context in contexts.items():
+        results[i] = _complete_analysis(context)
+        _analysis_cache.put(keys[i], results[i])
+        by_key[keys[i]] = results[i]
+    
+    for i, key in repeats.items():
+        source = by_key.get(key)
+        results[i] = dict(source) if source is not None else _analysis_cache.get(key)
+    
+    return results
+
+
+# ==================== WARM-UP ====================
+
+def warm_up():
+    """
+    Preloads resources that are otherwise initialised on the first request:
+    the sentiment engine (TextBlob's lexicon when it is the active engine)
+    and the classifier's memory-mapped arrays.
+    Call once per process at startup. Returns True if warm-up succeeded.
+    """
+    try:
+        sentiment_score("warm up the sentiment lexicon")
+        classify_incident("warm up the classifier", return_confidence=True)
+        return True
+    except Exception as e:
+        print(f"Warm-up error: {e}")
+        return False
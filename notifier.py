@@ -0,0 +1,94 @@
+import os
+import json
+import requests
+from metrics import timed
+
+# Discord webhook for new-report alerts (override with DISCORD_WEBHOOK_URL)
+DISCORD_WEBHOOK_URL = os.environ.get(
+    "DISCORD_WEBHOOK_URL",
+    "https://discordapp.com/api/webhooks/1464631979491201211/gVERDrnBmxhLnIpJIZyHTabE7psdCxrG4WA7Y4frYQ3pOwaB6alyw80OLRMZ7Tvo_Lav"
+)
+
+# Seconds before a webhook post is abandoned
+DISCORD_TIMEOUT = float(os.environ.get("DISCORD_TIMEOUT", "10"))
+
+
+def build_embed(report_id, report_data):
+    """
+    Builds the Discord embed for a new report.
+    """
+    return {
+        "title": f"🚨 New Incident Report: {report_id}",
+        "description": report_data['description'],
+        "color": 0xFF6B6B,
+        "fields": [
+            {"name": "📂 Category", "value": report_data['category'], "inline": True},
+            {"name": "⚠️ Urgency", "value": report_data['urgency'], "inline": True},
+            {"name": "📍 Location", "value": report_data['location'], "inline": True},
+            {"name": "🧠 Sentiment Score", "value": str(report_data['sentiment']), "inline": True},
+            {"name": "Status", "value": "Pending", "inline": True},
+        ],
+        "footer": {"text": "CampusSafe • Secure Reporting"}
+    }
+
+
+def _read_proof(proof_file):
+    """
+    Returns (name, file, content_type) for an uploaded file, or None.
+    The file is handed to requests as is rather than copied into memory.
+    """
+    if not proof_file:
+        return None
+    proof_file.seek(0)
+    return proof_file.name, proof_file, proof_file.type
+
+
+# Discord limits per webhook message
+DISCORD_MAX_EMBEDS = 10
+DISCORD_MAX_EMBED_CHARS = 6000
+DISCORD_MAX_FILES = 10
+DISCORD_MAX_UPLOAD_BYTES = int(os.environ.get("DISCORD_MAX_UPLOAD_BYTES", str(8 * 1024 * 1024)))
+
+
+def embed_size(embed):
+    """
+    Characters of an embed that count towards DISCORD_MAX_EMBED_CHARS.
+    """
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += sum(len(field["name"]) + len(str(field["value"])) for field in embed.get("fields", []))
+    return size + len(embed.get("footer", {}).get("text", ""))
+
+
+def post_webhook(session, payload, proofs=None, url=None):
+    """
+    Posts one webhook message on a requests session (or the requests
+    module), with evidence files attached. proofs is a list of
+    (name, bytes, content_type) tuples, or a single tuple. url defaults
+    to DISCORD_WEBHOOK_URL.
+    Returns the response; raises on connection errors.
+    """
+    url = url or DISCORD_WEBHOOK_URL
+    if isinstance(proofs, tuple):
+        proofs = [proofs]
+    if proofs:
+        files = {f"files[{i}]": proof for i, proof in enumerate(proofs)}
+        return session.post(url, data={"payload_json": json.dumps(payload)},
+                            files=files, timeout=DISCORD_TIMEOUT)
+    return session.post(url, json=payload, timeout=DISCORD_TIMEOUT)
+
+
+@timed('send_to_discord', failed=lambda ok: not ok)
+def send_to_discord(report_id, proof_file, report_data):
+    """
+    Posts a new-report alert (with the evidence file attached, if any) to
+    the Discord webhook right away. Returns True on success.
+    Reports are normally alerted through the outbox (see outbox.py).
+    """
+    payload = {"embeds": [build_embed(report_id, report_data)]}
+
+    try:
+        response = post_webhook(requests, payload, _read_proof(proof_file))
+        return response.ok
+    except Exception as e:
+        print(f"Discord Error: {e}")
+        return False
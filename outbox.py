@@ -0,0 +1,503 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+import requests
+import metrics
+from evidence import EVIDENCE_CHUNK_BYTES
+from notifier import (build_embed, embed_size, post_webhook, DISCORD_MAX_EMBEDS,
+                      DISCORD_MAX_EMBED_CHARS, DISCORD_MAX_FILES, DISCORD_MAX_UPLOAD_BYTES)
+
+# ==================== CONFIGURATION ====================
+
+# Durable queue of Discord alerts (SQLite in WAL mode)
+OUTBOX_PATH = os.environ.get(
+    'OUTBOX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data', 'outbox.db')
+)
+
+# Retry policy for failed deliveries: exponential backoff with jitter,
+# capped at OUTBOX_MAX_BACKOFF seconds, given up after OUTBOX_MAX_ATTEMPTS
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_BASE_BACKOFF = float(os.environ.get('OUTBOX_BASE_BACKOFF', '2'))
+OUTBOX_MAX_BACKOFF = float(os.environ.get('OUTBOX_MAX_BACKOFF', '300'))
+
+# Seconds the worker sleeps when the queue is empty (it is also woken on enqueue)
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', '5'))
+
+# High-urgency alerts go out immediately; Low/Medium ones wait up to this
+# many seconds and are sent together as a digest (or ride along with a
+# High alert that has room left)
+NOTIFY_DIGEST_SECONDS = float(os.environ.get('NOTIFY_DIGEST_SECONDS', '300'))
+IMMEDIATE_URGENCIES = ('High',)
+
+# Claimed alerts carry the attachment size, not the attachment itself
+_CLAIM_COLUMNS = ("rowid, report_id, payload, proof_name, proof_type, length(proof) AS proof_size, "
+                  "urgency, attempts")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    report_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    proof_name TEXT,
+    proof_type TEXT,
+    proof BLOB,
+    urgency TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    delivered_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_due ON alerts (status, next_attempt_at);
+"""
+
+
+# ==================== OUTBOX ====================
+
+class Outbox:
+    """
+    Durable queue of webhook alerts with per-report delivery status.
+    Rows go pending -> delivered, or -> failed after a permanent error or
+    OUTBOX_MAX_ATTEMPTS tries. Alerts are posted to webhook_url
+    (default DISCORD_WEBHOOK_URL).
+    """
+
+    def __init__(self, path=OUTBOX_PATH, webhook_url=None):
+        self.path = path
+        self.webhook_url = webhook_url
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(alerts)")}
+        if 'urgency' not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN urgency TEXT")
+        # Alerts that were being sent when the process died go out again
+        with conn:
+            conn.execute("UPDATE alerts SET status = 'pending' WHERE status = 'sending'")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, report_id, payload, proof=None, urgency=None, delay=0.0):
+        """
+        Queues a webhook payload for report_id, due in delay seconds.
+        proof is an optional (name, content, content_type) attachment, where
+        content is bytes or a binary file object; files are streamed into
+        the queue in chunks. Re-queuing a report replaces it.
+        """
+        now = time.time()
+        name, content, content_type = proof if proof else (None, None, None)
+        streamed = content is not None and not isinstance(content, (bytes, bytearray))
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR REPLACE INTO alerts (report_id, payload, proof_name, proof_type, proof, urgency, "
+                "status, attempts, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, " + ("zeroblob(?)" if streamed else "?") + ", ?, 'pending', 0, ?, ?)",
+                (report_id, json.dumps(payload), name, content_type, proof_size(content) if streamed else content,
+                 urgency, now + delay, now)
+            )
+            if streamed:
+                content.seek(0)
+                with conn.blobopen('alerts', 'proof', cursor.lastrowid) as blob:
+                    for chunk in iter(lambda: content.read(EVIDENCE_CHUNK_BYTES), b''):
+                        blob.write(chunk)
+
+    def open_proof(self, alert):
+        """
+        Opens a claimed alert's attachment for streaming reads.
+        """
+        return self._connect().blobopen('alerts', 'proof', alert['rowid'], readonly=True)
+
+    def claim_batch(self, now=None):
+        """
+        Claims the alerts for one webhook message and marks them sending.
+        Due alerts come first (High urgency ahead of digests, then oldest);
+        if there is room, waiting digest alerts ride along. The batch stays
+        within Discord's embed, character and attachment limits.
+        Returns the claimed alerts, or [] if none are due.
+        """
+        now = time.time() if now is None else now
+        conn = self._connect()
+        with conn:
+            rows = conn.execute(
+                f"SELECT {_CLAIM_COLUMNS} FROM alerts WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY urgency = 'High' DESC, created_at LIMIT ?", (now, DISCORD_MAX_EMBEDS)
+            ).fetchall()
+            if not rows:
+                return []
+            if len(rows) < DISCORD_MAX_EMBEDS:
+                # Digest alerts that haven't failed yet, sent early for free
+                # (not-yet-due High alerts are held for an attachment swap)
+                immediate = ', '.join('?' for _ in IMMEDIATE_URGENCIES)
+                rows += conn.execute(
+                    f"SELECT {_CLAIM_COLUMNS} FROM alerts WHERE status = 'pending' AND next_attempt_at > ? "
+                    f"AND attempts = 0 AND COALESCE(urgency, '') NOT IN ({immediate}) "
+                    "ORDER BY created_at LIMIT ?", (now, *IMMEDIATE_URGENCIES, DISCORD_MAX_EMBEDS - len(rows))
+                ).fetchall()
+
+            batch = []
+            chars = files = upload_bytes = 0
+            for row in rows:
+                embeds = json.loads(row['payload'])['embeds']
+                size = sum(embed_size(embed) for embed in embeds)
+                proof_bytes = row['proof_size'] or 0
+                if batch and (len(batch) + 1 > DISCORD_MAX_EMBEDS or chars + size > DISCORD_MAX_EMBED_CHARS
+                              or files + (proof_bytes > 0) > DISCORD_MAX_FILES
+                              or upload_bytes + proof_bytes > DISCORD_MAX_UPLOAD_BYTES):
+                    continue
+                batch.append(dict(row))
+                chars += size
+                files += proof_bytes > 0
+                upload_bytes += proof_bytes
+
+            conn.executemany("UPDATE alerts SET status = 'sending' WHERE report_id = ?",
+                             [(alert['report_id'],) for alert in batch])
+        return batch
+
+    def release(self, report_id, due_at, proof=None):
+        """
+        Makes a waiting alert due by due_at at the latest and, if proof is
+        given, replaces its attachment. Alerts already sent or retried are
+        left alone. Returns True if the alert was updated.
+        """
+        conn = self._connect()
+        with conn:
+            if proof:
+                name, content, content_type = proof
+                cursor = conn.execute(
+                    "UPDATE alerts SET proof_name = ?, proof_type = ?, proof = ?, "
+                    "next_attempt_at = MIN(next_attempt_at, ?) "
+                    "WHERE report_id = ? AND status = 'pending' AND attempts = 0",
+                    (name, content_type, content, due_at, report_id))
+            else:
+                cursor = conn.execute(
+                    "UPDATE alerts SET next_attempt_at = MIN(next_attempt_at, ?) "
+                    "WHERE report_id = ? AND status = 'pending' AND attempts = 0", (due_at, report_id))
+        return cursor.rowcount > 0
+
+    def next_due_in(self):
+        """
+        Seconds until the next pending alert is due, or None if there is none.
+        """
+        row = self._connect().execute(
+            "SELECT MIN(next_attempt_at) FROM alerts WHERE status = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def mark_delivered(self, report_id):
+        conn = self._connect()
+        with conn:
+            # The attachment is no longer needed once delivered
+            conn.execute("UPDATE alerts SET status = 'delivered', delivered_at = ?, attempts = attempts + 1, "
+                         "last_error = NULL, proof = NULL WHERE report_id = ?", (time.time(), report_id))
+
+    def mark_retry(self, report_id, error, delay, count_attempt=True):
+        """
+        Schedules another attempt after delay seconds, or marks the alert
+        failed if it has used up its attempts.
+        """
+        conn = self._connect()
+        with conn:
+            attempts = conn.execute("SELECT attempts FROM alerts WHERE report_id = ?",
+                                    (report_id,)).fetchone()[0] + (1 if count_attempt else 0)
+            status = 'failed' if attempts >= OUTBOX_MAX_ATTEMPTS else 'pending'
+            conn.execute("UPDATE alerts SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                         "WHERE report_id = ?", (status, attempts, time.time() + delay, error, report_id))
+
+    def mark_failed(self, report_id, error):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE alerts SET status = 'failed', attempts = attempts + 1, last_error = ? "
+                         "WHERE report_id = ?", (error, report_id))
+
+    def status(self, report_id):
+        """
+        Returns the delivery record for report_id, or None.
+        """
+        row = self._connect().execute(
+            "SELECT report_id, status, attempts, last_error, created_at, delivered_at FROM alerts "
+            "WHERE report_id = ?", (report_id,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """
+        Returns the number of alerts per status.
+        """
+        return dict(self._connect().execute("SELECT status, COUNT(*) FROM alerts GROUP BY status").fetchall())
+
+
+def proof_size(content):
+    """
+    Size of an attachment given as bytes or a seekable file object.
+    """
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    position = content.tell()
+    size = content.seek(0, os.SEEK_END)
+    content.seek(position)
+    return size
+
+
+def backoff_delay(attempts):
+    """
+    Exponential backoff with full jitter for the given attempt number.
+    """
+    return random.uniform(0, min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** attempts))
+
+
+def rate_limit_delay(response):
+    """
+    Returns how many seconds Discord asks us to wait, from a 429 body or
+    the X-RateLimit headers, or 0 if the bucket still has room.
+    """
+    if response.status_code == 429:
+        try:
+            return float(response.json().get('retry_after', 1))
+        except Exception:
+            return float(response.headers.get('Retry-After', 1))
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        return float(response.headers.get('X-RateLimit-Reset-After', 1))
+    return 0.0
+
+
+# ==================== WORKER ====================
+
+class OutboxWorker(threading.Thread):
+    """
+    Background thread that drains the outbox over one persistent HTTP
+    session, packing several alerts into each webhook message and pausing
+    whenever Discord's rate limit says so.
+    """
+
+    def __init__(self, outbox):
+        super().__init__(name='campussafe-outbox', daemon=True)
+        self.outbox = outbox
+        self.session = requests.Session()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.paused_until = 0.0
+        self.stats = {'requests': 0, 'alerts_delivered': 0, 'immediate_messages': 0, 'digest_messages': 0}
+
+    def send(self, batch):
+        """
+        Sends a batch of alerts as one webhook message and records the
+        outcome for each of them.
+        """
+        payload = {"embeds": [embed for alert in batch for embed in json.loads(alert['payload'])['embeds']]}
+        attempts = max(alert['attempts'] for alert in batch)
+
+        self.stats['requests'] += 1
+        blobs = []
+        start = time.perf_counter()
+        try:
+            for alert in batch:
+                if alert['proof_size']:
+                    blobs.append((alert['proof_name'], self.outbox.open_proof(alert), alert['proof_type']))
+            response = post_webhook(self.session, payload, blobs, url=self.outbox.webhook_url)
+            metrics.record('send_to_discord', time.perf_counter() - start, ok=response.ok)
+        except Exception as e:
+            metrics.record('send_to_discord', time.perf_counter() - start, ok=False)
+            for alert in batch:
+                self.outbox.mark_retry(alert['report_id'], str(e), backoff_delay(attempts))
+            return
+        finally:
+            for _, blob, _ in blobs:
+                blob.close()
+
+        delay = rate_limit_delay(response)
+        if delay:
+            self.paused_until = time.time() + delay
+
+        if response.ok:
+            for alert in batch:
+                self.outbox.mark_delivered(alert['report_id'])
+            self.stats['alerts_delivered'] += len(batch)
+            if any(alert['urgency'] in IMMEDIATE_URGENCIES for alert in batch):
+                self.stats['immediate_messages'] += 1
+            else:
+                self.stats['digest_messages'] += 1
+        elif response.status_code == 429:
+            # Not the alerts' fault: retry once the bucket resets
+            for alert in batch:
+                self.outbox.mark_retry(alert['report_id'], "rate limited", delay, count_attempt=False)
+        elif response.status_code >= 500:
+            for alert in batch:
+                self.outbox.mark_retry(alert['report_id'], f"HTTP {response.status_code}", backoff_delay(attempts))
+        elif len(batch) > 1:
+            # One bad alert shouldn't sink the others: send them one by one
+            for alert in batch:
+                self.send([alert])
+        else:
+            self.outbox.mark_failed(batch[0]['report_id'], f"HTTP {response.status_code}: {response.text[:200]}")
+
+    def drain(self):
+        """
+        Sends every due alert. Returns the number of messages sent.
+        """
+        sent = 0
+        while not self.stopped.is_set():
+            pause = self.paused_until - time.time()
+            if pause > 0:
+                time.sleep(pause)
+            batch = self.outbox.claim_batch()
+            if not batch:
+                return sent
+            self.send(batch)
+            sent += 1
+        return sent
+
+    def stop(self):
+        """
+        Ends the worker after the message it is sending, if any.
+        """
+        self.stopped.set()
+        self.wake.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.drain()
+                wait = self.outbox.next_due_in()
+            except Exception as e:
+                print(f"Outbox Error: {e}")
+                wait = None
+            self.wake.wait(OUTBOX_POLL_INTERVAL if wait is None else min(wait, OUTBOX_POLL_INTERVAL))
+            self.wake.clear()
+
+
+_outbox = None
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_outbox():
+    global _outbox
+    with _worker_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+    return _outbox
+
+
+def use_outbox(outbox):
+    """
+    Switches this process to another outbox (e.g. one built for a test or
+    with another webhook_url) and stops the old outbox's worker. The next
+    alert starts a worker for the new one. Returns outbox.
+    """
+    global _outbox, _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.stop()
+        _outbox, _worker = outbox, None
+    return outbox
+
+
+def start_worker():
+    """
+    Starts the process-wide outbox worker if it isn't running.
+    """
+    global _worker
+    outbox = get_outbox()
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(outbox)
+            _worker.start()
+    return _worker
+
+
+def resume_worker():
+    """
+    Starts the worker if the outbox still holds alerts from an earlier run
+    (digests, scheduled retries, alerts reset from 'sending'), so they don't
+    wait for the next report. Returns the number of pending alerts.
+    """
+    try:
+        pending = get_outbox().counts().get('pending', 0)
+        if pending:
+            start_worker()
+        return pending
+    except Exception as e:
+        print(f"Outbox Error: {e}")
+        return 0
+
+
+def _alert_delay(urgency):
+    return 0.0 if urgency in IMMEDIATE_URGENCIES else NOTIFY_DIGEST_SECONDS
+
+
+def enqueue_alert(report_id, report_data, proof=None, hold=0.0):
+    """
+    Durably queues the Discord alert for a new report and wakes the worker.
+    High-urgency alerts are due now, others join the next digest.
+    proof is an optional (name, content, content_type) attachment, content
+    being bytes or a binary file object. Files over Discord's upload limit
+    are linked from the embed instead of attached. hold keeps the alert
+    back for up to that many seconds, until release_alert() swaps in a
+    smaller attachment (an image preview); if nothing does, it goes out
+    with the original.
+    Returns True if the alert was queued.
+    """
+    urgency = report_data.get('urgency')
+    embed = build_embed(report_id, report_data)
+    if proof and proof_size(proof[1]) > DISCORD_MAX_UPLOAD_BYTES:
+        proof = None
+        embed["fields"].append({"name": "📎 Evidence", "value": report_data.get('proof') or "Too large to attach"})
+    try:
+        get_outbox().enqueue(report_id, {"embeds": [embed]}, proof, urgency,
+                             delay=max(_alert_delay(urgency), hold))
+        start_worker().wake.set()
+        return True
+    except Exception as e:
+        print(f"Outbox Enqueue Error: {e}")
+        return False
+
+
+def release_alert(report_id, urgency, proof=None):
+    """
+    Ends the hold on an alert queued with enqueue_alert(..., hold=...),
+    replacing its attachment with proof if given. Returns True if the
+    alert was still waiting.
+    """
+    try:
+        released = get_outbox().release(report_id, time.time() + _alert_delay(urgency), proof)
+        if released:
+            start_worker().wake.set()
+        return released
+    except Exception as e:
+        print(f"Outbox Release Error: {e}")
+        return False
+
+
+def get_delivery_status(report_id):
+    """
+    Returns the alert delivery record for a report ('pending', 'sending',
+    'delivered' or 'failed', with attempts and the last error), or None.
+    """
+    try:
+        return get_outbox().status(report_id)
+    except Exception as e:
+        print(f"Outbox Status Error: {e}")
+        return None
+
+
+def get_notifier_stats():
+    """
+    Returns the worker's counters: webhook requests made, alerts delivered,
+    immediate and digest messages, and requests saved by packing several
+    alerts into one message.
+    """
+    stats = dict(_worker.stats) if _worker is not None else {
+        'requests': 0, 'alerts_delivered': 0, 'immediate_messages': 0, 'digest_messages': 0}
+    stats['requests_saved'] = stats['alerts_delivered'] - stats['immediate_messages'] - stats['digest_messages']
+    return stats
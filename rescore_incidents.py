@@ -0,0 +1,189 @@
+"""
+Re-scores stored incidents after a model upgrade.
+
+    python rescore_incidents.py
+    python rescore_incidents.py --page-size 1000 --max-rps 5
+
+Walks the incidents table in keyset pages ((last_updated, report_id),
+newest first), re-runs the current classifier and sentiment engine on each
+page with nlp_model.analyze_incidents, and writes back the rows whose
+category or sentiment changed, in one bulk update per page. Every scanned
+row records the model_version that checked it (unchanged rows get only the
+stamp), so rows already at the current version are skipped by later runs.
+Categories set by people (category_source 'admin' or 'import') are kept;
+only their sentiment is refreshed.
+Progress is checkpointed after every page, and
+database requests are held to --max-rps so the live app isn't starved.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+# ==================== CONFIGURATION ====================
+
+RESCORE_PAGE_SIZE = int(os.environ.get('RESCORE_PAGE_SIZE', '500'))
+
+# Database requests per second the job may make (page reads + bulk updates)
+RESCORE_MAX_RPS = float(os.environ.get('RESCORE_MAX_RPS', '2'))
+
+RESCORE_CHECKPOINT = os.environ.get(
+    'RESCORE_CHECKPOINT', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data', 'rescore.checkpoint.json')
+)
+
+# Sentiment differences below this are not worth a write
+SENTIMENT_TOLERANCE = 1e-6
+
+SCORE_COLUMNS = ('report_id', 'last_updated', 'description', 'category', 'sentiment', 'model_version',
+                 'category_source')
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart (no limit if rate <= 0).
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+# ==================== CHECKPOINT ====================
+
+def new_checkpoint(version):
+    return {'model_version': version, 'cursor': None, 'scanned': 0, 'changed': 0, 'finished': False}
+
+
+def load_checkpoint(path, version):
+    """
+    Returns the saved progress for this model version, or a fresh one.
+    A checkpoint from another model version starts the walk over.
+    """
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return new_checkpoint(version)
+    return checkpoint if checkpoint.get('model_version') == version else new_checkpoint(version)
+
+
+def save_checkpoint(path, checkpoint):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(checkpoint, updated_at=datetime.now().isoformat()), f)
+    os.replace(tmp_path, path)
+
+
+# ==================== RE-SCORING ====================
+
+def rescore_page(rows, version):
+    """
+    Re-runs the model on a page of incidents. Returns (updates, unchanged):
+    the updates for rows whose category or sentiment changed, and the ids
+    of the rows that only need the model_version stamp.
+    """
+    import nlp_model
+    pending = [row for row in rows if row.get('model_version') != version]
+    results = nlp_model.analyze_incidents([row.get('description') or '' for row in pending])
+
+    updates, unchanged = [], []
+    for row, result in zip(pending, results):
+        category = result.get('category') or row.get('category')
+        if row.get('category_source'):
+            # Corrected or imported by a person: not the model's to change
+            category = row.get('category')
+        sentiment = result.get('sentiment_score', row.get('sentiment'))
+        stored_sentiment = row.get('sentiment')
+        if category == row.get('category') and sentiment is not None and stored_sentiment is not None \
+                and abs(float(sentiment) - float(stored_sentiment)) < SENTIMENT_TOLERANCE:
+            unchanged.append(row['report_id'])
+            continue
+        updates.append({'report_id': row['report_id'], 'category': category,
+                        'sentiment': sentiment, 'model_version': version})
+    return updates, unchanged
+
+
+def run_rescore(page_size=RESCORE_PAGE_SIZE, max_rps=RESCORE_MAX_RPS, checkpoint_path=RESCORE_CHECKPOINT,
+                restart=False, dry_run=False):
+    """
+    Re-scores every incident not yet at the current model version.
+    Returns the final progress dict with 'rows_per_sec' for this run.
+    """
+    import nlp_model
+    import database
+    if not database.backend:
+        raise SystemExit("No database configured")
+
+    version = nlp_model.model_version()
+    checkpoint = load_checkpoint(checkpoint_path, version)
+    if restart or checkpoint['finished']:
+        checkpoint = new_checkpoint(version)
+    if checkpoint['cursor']:
+        print(f"Resuming after {checkpoint['scanned']:,} incidents ({checkpoint['changed']:,} updated so far)")
+
+    limiter = RateLimiter(max_rps)
+    started = time.perf_counter()
+    scanned = 0
+    while True:
+        limiter.wait()
+        cursor = tuple(checkpoint['cursor']) if checkpoint['cursor'] else None
+        rows = database.backend.page(cursor, page_size, SCORE_COLUMNS)
+        if not rows:
+            break
+
+        updates, unchanged = rescore_page(rows, version)
+        if updates and not dry_run:
+            limiter.wait()
+            if database.update_scores(updates) is None:
+                raise SystemExit(f"Update failed after {checkpoint['scanned']:,} incidents; re-run to resume")
+        if unchanged and not dry_run:
+            limiter.wait()
+            if database.stamp_model_version(unchanged, version) is None:
+                raise SystemExit(f"Update failed after {checkpoint['scanned']:,} incidents; re-run to resume")
+
+        checkpoint['cursor'] = [rows[-1]['last_updated'], rows[-1]['report_id']]
+        checkpoint['scanned'] += len(rows)
+        checkpoint['changed'] += len(updates)
+        scanned += len(rows)
+        if not dry_run:
+            save_checkpoint(checkpoint_path, checkpoint)
+        rate = scanned / max(time.perf_counter() - started, 1e-9)
+        print(f"  {checkpoint['scanned']:,} scanned | {checkpoint['changed']:,} changed | {rate:,.0f} rows/sec")
+        if len(rows) < page_size:
+            break
+
+    checkpoint['finished'] = True
+    if not dry_run:
+        save_checkpoint(checkpoint_path, checkpoint)
+    elapsed = time.perf_counter() - started
+    checkpoint['rows_per_sec'] = scanned / elapsed if elapsed else 0.0
+    print(f"Done: {checkpoint['scanned']:,} incidents scanned, {checkpoint['changed']:,} re-scored "
+          f"to model {version} ({checkpoint['rows_per_sec']:,.0f} rows/sec)")
+    return checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored incidents with the current model.")
+    parser.add_argument('--page-size', type=int, default=RESCORE_PAGE_SIZE, help="incidents per page")
+    parser.add_argument('--max-rps', type=float, default=RESCORE_MAX_RPS,
+                        help="database requests per second (0 for no limit)")
+    parser.add_argument('--checkpoint', default=RESCORE_CHECKPOINT, help="checkpoint file")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--dry-run', action='store_true', help="count changes without writing them")
+    args = parser.parse_args(argv)
+
+    run_rescore(args.page_size, args.max_rps, args.checkpoint, args.restart, args.dry_run)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ==================== CONFIGURATION ====================
+
+# Number of analysis results kept in memory (0 disables the cache)
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '1024'))
+
+# Optional SQLite file that keeps results across restarts, bounded to
+# ANALYSIS_CACHE_DISK_SIZE rows
+ANALYSIS_CACHE_PATH = os.environ.get('ANALYSIS_CACHE_PATH')
+ANALYSIS_CACHE_DISK_SIZE = int(os.environ.get('ANALYSIS_CACHE_DISK_SIZE', '50000'))
+
+
+def cache_key(*parts):
+    """
+    Returns a SHA-256 hex key for the given string parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+# ==================== LRU CACHE ====================
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of JSON-serialisable values with optional
+    SQLite persistence. Memory misses fall through to disk and are promoted.
+    Values are copied on the way in and out, so callers may mutate them.
+    """
+
+    def __init__(self, max_entries=ANALYSIS_CACHE_SIZE, path=ANALYSIS_CACHE_PATH,
+                 max_disk_entries=ANALYSIS_CACHE_DISK_SIZE):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS results "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_last_used ON results (last_used)")
+                self._db.commit()
+            except Exception as e:
+                print(f"Result cache disk error, using memory only: {e}")
+                self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        Returns a copy of the cached value, or None on a miss.
+        """
+        if self.max_entries <= 0:
+            return None
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(value)
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+                        self._db.commit()
+                        self._remember(key, row[0])
+                        self.disk_hits += 1
+                        return json.loads(row[0])
+                except Exception as e:
+                    print(f"Result cache disk error: {e}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Stores a copy of value under key.
+        """
+        if self.max_entries <= 0:
+            return
+
+        encoded = json.dumps(value, default=float)
+        with self._lock:
+            self._remember(key, encoded)
+
+            if self._db is not None:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO results (key, value, last_used) VALUES (?, ?, ?)",
+                                     (key, encoded, time.time()))
+                    # Trim the least recently used rows
+                    self._db.execute(
+                        "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used DESC "
+                        "LIMIT -1 OFFSET ?)", (self.max_disk_entries,)
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    print(f"Result cache disk error: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the hit rate.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
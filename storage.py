@@ -0,0 +1,507 @@
+import io
+import os
+import base64
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+import requests
+
+# ==================== CONFIGURATION ====================
+
+# 'supabase' (default) or 'sqlite' for an offline, embedded deployment
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'supabase')
+
+# Embedded backend locations
+SQLITE_PATH = os.environ.get(
+    'SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data', 'campussafe.db')
+)
+PROOF_STORE_DIR = os.environ.get(
+    'PROOF_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data', 'proofs')
+)
+
+# Proofs larger than this go to Supabase through the resumable (TUS)
+# endpoint in SUPABASE_UPLOAD_CHUNK_BYTES chunks (Supabase requires 6MB)
+SUPABASE_RESUMABLE_BYTES = int(os.environ.get('SUPABASE_RESUMABLE_BYTES', str(6 * 1024 * 1024)))
+SUPABASE_UPLOAD_CHUNK_BYTES = int(os.environ.get('SUPABASE_UPLOAD_CHUNK_BYTES', str(6 * 1024 * 1024)))
+SUPABASE_UPLOAD_RETRIES = int(os.environ.get('SUPABASE_UPLOAD_RETRIES', '3'))
+
+# Columns of the incidents table, in schema order
+INCIDENT_COLUMNS = ('report_id', 'description', 'location', 'urgency', 'category', 'sentiment',
+                    'last_updated', 'status', 'proof_type', 'proof', 'admin_remark', 'proof_sha256',
+                    'model_version', 'updated_at', 'category_source')
+
+STAT_DIMENSIONS = ('category', 'urgency', 'status', 'day')
+
+
+def _select_list(columns):
+    if columns == '*':
+        return '*'
+    columns = [c.strip() for c in columns.split(',')] if isinstance(columns, str) else list(columns)
+    unknown = set(columns) - set(INCIDENT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    return ', '.join(columns)
+
+
+def _content_size(content):
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    position = content.tell()
+    size = content.seek(0, os.SEEK_END)
+    content.seek(position)
+    return size
+
+
+def _content_bytes(content):
+    if isinstance(content, (bytes, bytearray)):
+        return bytes(content)
+    content.seek(0)
+    return content.read()
+
+
+# ==================== SUPABASE BACKEND ====================
+
+class SupabaseBackend:
+    """
+    Incidents in the Supabase 'incidents' table, proofs in the 'proofs'
+    storage bucket.
+    """
+
+    name = "Supabase"
+
+    def __init__(self, client, bucket="proofs", url=None, key=None):
+        self.client = client
+        self.bucket = bucket
+        # Needed for resumable uploads, which go straight to the storage API
+        self.url = url
+        self.key = key
+
+    def _table(self):
+        return self.client.table('incidents')
+
+    def check(self):
+        self._table().select('count', count='exact').limit(0).execute()
+        return True
+
+    def proof_url(self, file_name):
+        # Built locally, no request
+        return self.client.storage.from_(self.bucket).get_public_url(file_name)
+
+    def proof_exists(self, file_name):
+        folder, _, name = file_name.rpartition('/')
+        listing = self.client.storage.from_(self.bucket).list(folder, {"search": name, "limit": 1})
+        return any(item.get('name') == name for item in listing or [])
+
+    def upload_proof(self, file_name, content, content_type=None):
+        """
+        Uploads bytes or a binary file object. Large files are streamed in
+        chunks through the resumable endpoint.
+        """
+        if self.url and self.key and _content_size(content) > SUPABASE_RESUMABLE_BYTES:
+            self._upload_resumable(file_name, content, content_type)
+        else:
+            self.client.storage.from_(self.bucket).upload(file=_content_bytes(content), path=file_name,
+                                                          file_options={"content-type": content_type, "upsert": "true"})
+        return self.proof_url(file_name)
+
+    def _upload_resumable(self, file_name, content, content_type=None, session=requests, chunk_size=None):
+        """
+        TUS upload: create the upload, then PATCH it chunk by chunk
+        (SUPABASE_UPLOAD_CHUNK_BYTES unless chunk_size is given). After a
+        failed chunk the server's offset is fetched and the upload resumes
+        from there, up to SUPABASE_UPLOAD_RETRIES times per chunk.
+        """
+        chunk_size = chunk_size or SUPABASE_UPLOAD_CHUNK_BYTES
+        if isinstance(content, (bytes, bytearray)):
+            content = io.BytesIO(content)
+        size = _content_size(content)
+        headers = {"Authorization": f"Bearer {self.key}", "apikey": self.key, "Tus-Resumable": "1.0.0"}
+
+        def encode(value):
+            return base64.b64encode(str(value).encode()).decode()
+
+        metadata = {"bucketName": self.bucket, "objectName": file_name,
+                    "contentType": content_type or "application/octet-stream"}
+        response = session.post(
+            f"{self.url.rstrip('/')}/storage/v1/upload/resumable",
+            headers=dict(headers, **{"Upload-Length": str(size), "x-upsert": "true",
+                                     "Upload-Metadata": ",".join(f"{k} {encode(v)}" for k, v in metadata.items())}),
+            timeout=30
+        )
+        response.raise_for_status()
+        location = response.headers["Location"]
+
+        offset = 0
+        failures = 0
+        while offset < size:
+            content.seek(offset)
+            chunk = content.read(chunk_size)
+            try:
+                response = session.patch(location, data=chunk, timeout=60, headers=dict(
+                    headers, **{"Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"}))
+                response.raise_for_status()
+                offset = int(response.headers.get("Upload-Offset", offset + len(chunk)))
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures > SUPABASE_UPLOAD_RETRIES:
+                    raise
+                print(f"Supabase Upload chunk at {offset} failed, resuming: {e}")
+                response = session.head(location, headers=headers, timeout=30)
+                response.raise_for_status()
+                offset = int(response.headers["Upload-Offset"])
+
+    def insert(self, payload):
+        response = self._table().insert(payload).execute()
+        return response.data[0] if response.data else dict(payload)
+
+    def insert_many(self, payloads):
+        # One request per chunk; rows whose report_id exists are skipped, so
+        # a chunk can be re-sent after an interruption
+        self._table().upsert(payloads, on_conflict='report_id', ignore_duplicates=True,
+                             returning='minimal').execute()
+        return len(payloads)
+
+    def get(self, report_id, columns='*'):
+        response = self._table().select(_select_list(columns)).eq('report_id', report_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def select_all(self):
+        return self._table().select('*').order('last_updated', desc=True).execute().data or []
+
+    def reported_since(self, since, columns, changed_since=None):
+        query = self._table().select(_select_list(columns)).gte('last_updated', since)
+        if changed_since:
+            query = query.gte('updated_at', changed_since)
+        return query.order('last_updated').execute().data or []
+
+    def count(self):
+        return self._table().select('report_id', count='exact').limit(1).execute().count
+
+    def page(self, cursor, limit, columns, status=None):
+        query = self._table().select(_select_list(columns))
+        if status:
+            query = query.eq('status', status)
+        if cursor:
+            last_updated, report_id = cursor
+            query = query.or_(f'last_updated.lt."{last_updated}",'
+                              f'and(last_updated.eq."{last_updated}",report_id.lt."{report_id}")')
+        return query.order('last_updated', desc=True).order('report_id', desc=True) \
+            .limit(limit).execute().data or []
+
+    def resolved_since(self, since, limit):
+        query = self._table().select('report_id, description, category, updated_at').eq('status', 'Resolved')
+        if since and since[0]:
+            updated_at, report_id = since
+            query = query.or_(f'updated_at.gt."{updated_at}",'
+                              f'and(updated_at.eq."{updated_at}",report_id.gt."{report_id}")')
+        return query.order('updated_at').order('report_id').limit(limit).execute().data or []
+
+    def stats(self):
+        try:
+            rows = self.client.rpc('incident_stats').execute().data or []
+        except Exception as e:
+            # Function not installed: count the grouping columns only
+            print(f"Supabase Stats RPC unavailable, counting locally: {e}")
+            return count_stats(self._table().select('category, urgency, status, last_updated').execute().data or [])
+        stats = {dimension: {} for dimension in STAT_DIMENSIONS}
+        for row in rows:
+            if row['dimension'] in stats:
+                stats[row['dimension']][row['value']] = row['count']
+        return stats
+
+    def update(self, report_id, changes):
+        response = self._table().update(changes).eq('report_id', report_id).execute()
+        return response.data[0] if response.data else None
+
+    def update_scores(self, rows):
+        """
+        Writes category, sentiment and model_version for many incidents in
+        one request. Returns the number of rows updated.
+        """
+        try:
+            return self.client.rpc('bulk_update_incidents', {'rows': rows}).execute().data or 0
+        except Exception as e:
+            # Function not installed: one request per row
+            print(f"Supabase Bulk update RPC unavailable, updating row by row: {e}")
+            return sum(1 for row in rows if self.update(row['report_id'], {
+                key: value for key, value in row.items() if key != 'report_id'}))
+
+    def stamp_model_version(self, report_ids, version):
+        """
+        Sets model_version on many incidents whose scores didn't change.
+        Returns the number of rows updated.
+        """
+        report_ids = list(report_ids)
+        updated = 0
+        # Chunked to keep the request URL short
+        for start in range(0, len(report_ids), 200):
+            updated += len(self._table().update({'model_version': version})
+                           .in_('report_id', report_ids[start:start + 200]).execute().data or [])
+        return updated
+
+    def delete(self, report_id):
+        self._table().delete().eq('report_id', report_id).execute()
+        return True
+
+
+def count_stats(rows):
+    """
+    Groups incident rows into {dimension: {value: count}}.
+    """
+    stats = {dimension: {} for dimension in STAT_DIMENSIONS}
+    for row in rows:
+        row = dict(row, day=str(row.get('last_updated') or '')[:10])
+        for dimension in STAT_DIMENSIONS:
+            counts = stats[dimension]
+            counts[row.get(dimension)] = counts.get(row.get(dimension), 0) + 1
+    return stats
+
+
+# ==================== SQLITE BACKEND ====================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    report_id TEXT PRIMARY KEY,
+    description TEXT,
+    location TEXT,
+    urgency TEXT,
+    category TEXT,
+    sentiment REAL,
+    last_updated TEXT,
+    status TEXT,
+    proof_type TEXT,
+    proof TEXT,
+    admin_remark TEXT,
+    proof_sha256 TEXT,
+    model_version TEXT,
+    updated_at TEXT,
+    category_source TEXT
+);
+-- Keyset pages by report time
+CREATE INDEX IF NOT EXISTS idx_incidents_updated ON incidents (last_updated, report_id);
+CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents (status, last_updated, report_id);
+-- Dashboard GROUP BYs
+CREATE INDEX IF NOT EXISTS idx_incidents_category ON incidents (category);
+CREATE INDEX IF NOT EXISTS idx_incidents_urgency ON incidents (urgency);
+"""
+
+# Created after the migrations, since older databases lack updated_at
+_CHANGE_INDEXES = """
+-- The resolved-incidents watermark (updated_at is the time of the last
+-- write; last_updated stays the report time)
+CREATE INDEX IF NOT EXISTS idx_incidents_resolved ON incidents (status, updated_at, report_id);
+"""
+
+
+class SQLiteBackend:
+    """
+    Incidents in an embedded SQLite database (WAL mode, one connection per
+    thread), proofs as files under proof_dir.
+    """
+
+    name = "SQLite"
+
+    def __init__(self, path=SQLITE_PATH, proof_dir=PROOF_STORE_DIR):
+        self.path = path
+        self.proof_dir = proof_dir
+        self._local = threading.local()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        # Databases created before these columns were added
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(incidents)")}
+        for column in ('proof_sha256', 'model_version', 'updated_at', 'category_source'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE incidents ADD COLUMN {column} TEXT")
+        if 'updated_at' not in columns:
+            with conn:
+                conn.execute("UPDATE incidents SET updated_at = last_updated")
+        conn.executescript(_CHANGE_INDEXES)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params=()):
+        return [dict(row) for row in self._connect().execute(sql, params).fetchall()]
+
+    def check(self):
+        self._connect().execute("SELECT 1 FROM incidents LIMIT 1")
+        return True
+
+    def proof_url(self, file_name):
+        return (Path(self.proof_dir) / os.path.basename(file_name)).resolve().as_uri()
+
+    def proof_exists(self, file_name):
+        return (Path(self.proof_dir) / os.path.basename(file_name)).is_file()
+
+    def upload_proof(self, file_name, content, content_type=None):
+        path = Path(self.proof_dir) / os.path.basename(file_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if isinstance(content, (bytes, bytearray)):
+            tmp_path.write_bytes(content)
+        else:
+            content.seek(0)
+            with open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(content, out, 1024 * 1024)
+        os.replace(tmp_path, path)
+        return self.proof_url(file_name)
+
+    def insert(self, payload):
+        columns = _select_list(list(payload))
+        placeholders = ', '.join('?' for _ in payload)
+        conn = self._connect()
+        with conn:
+            conn.execute(f"INSERT INTO incidents ({columns}) VALUES ({placeholders})", tuple(payload.values()))
+        return self.get(payload.get('report_id'))
+
+    def insert_many(self, payloads):
+        """
+        Inserts rows in one transaction, skipping report_ids that already
+        exist. Returns the number of rows inserted.
+        """
+        columns = [c for c in INCIDENT_COLUMNS if any(c in payload for payload in payloads)]
+        unknown = set().union(*payloads) - set(columns) if payloads else set()
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        conn = self._connect()
+        before = conn.total_changes
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO incidents ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [tuple(payload.get(column) for column in columns) for payload in payloads]
+            )
+        return conn.total_changes - before
+
+    def get(self, report_id, columns='*'):
+        rows = self._query(f"SELECT {_select_list(columns)} FROM incidents WHERE report_id = ? LIMIT 1",
+                           (report_id,))
+        return rows[0] if rows else None
+
+    def select_all(self):
+        return self._query("SELECT * FROM incidents ORDER BY last_updated DESC, report_id DESC")
+
+    def reported_since(self, since, columns, changed_since=None):
+        sql = f"SELECT {_select_list(columns)} FROM incidents WHERE last_updated >= ?"
+        params = [since]
+        if changed_since:
+            sql += " AND updated_at >= ?"
+            params.append(changed_since)
+        return self._query(sql + " ORDER BY last_updated", params)
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+
+    def page(self, cursor, limit, columns, status=None):
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if cursor:
+            where.append("(last_updated, report_id) < (?, ?)")
+            params.extend(cursor)
+        sql = f"SELECT {_select_list(columns)} FROM incidents"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY last_updated DESC, report_id DESC LIMIT ?"
+        return self._query(sql, params + [limit])
+
+    def resolved_since(self, since, limit):
+        sql = "SELECT report_id, description, category, updated_at FROM incidents WHERE status = 'Resolved'"
+        params = []
+        if since and since[0]:
+            sql += " AND (updated_at, report_id) > (?, ?)"
+            params.extend(since)
+        sql += " ORDER BY updated_at, report_id LIMIT ?"
+        return self._query(sql, params + [limit])
+
+    def stats(self):
+        stats = {dimension: {} for dimension in STAT_DIMENSIONS}
+        rows = self._connect().execute("""
+            SELECT 'category', category, COUNT(*) FROM incidents GROUP BY category
+            UNION ALL SELECT 'urgency', urgency, COUNT(*) FROM incidents GROUP BY urgency
+            UNION ALL SELECT 'status', status, COUNT(*) FROM incidents GROUP BY status
+            UNION ALL SELECT 'day', substr(last_updated, 1, 10), COUNT(*) FROM incidents
+                GROUP BY substr(last_updated, 1, 10)
+        """)
+        for dimension, value, count in rows:
+            stats[dimension][value] = count
+        return stats
+
+    def update(self, report_id, changes):
+        assignments = ', '.join(f"{column} = ?" for column in _select_list(list(changes)).split(', '))
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(f"UPDATE incidents SET {assignments} WHERE report_id = ?",
+                                  tuple(changes.values()) + (report_id,))
+        return self.get(report_id) if cursor.rowcount else None
+
+    def update_scores(self, rows):
+        """
+        Writes category, sentiment and model_version for many incidents in
+        one transaction. Returns the number of rows updated.
+        """
+        conn = self._connect()
+        before = conn.total_changes
+        with conn:
+            conn.executemany(
+                "UPDATE incidents SET category = ?, sentiment = ?, model_version = ? WHERE report_id = ?",
+                [(row['category'], row['sentiment'], row['model_version'], row['report_id']) for row in rows]
+            )
+        return conn.total_changes - before
+
+    def stamp_model_version(self, report_ids, version):
+        """
+        Sets model_version on many incidents whose scores didn't change, in
+        one transaction. Returns the number of rows updated.
+        """
+        report_ids = list(report_ids)
+        conn = self._connect()
+        before = conn.total_changes
+        with conn:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(report_ids), 500):
+                chunk = report_ids[start:start + 500]
+                conn.execute(f"UPDATE incidents SET model_version = ? "
+                             f"WHERE report_id IN ({', '.join('?' for _ in chunk)})", [version] + chunk)
+        return conn.total_changes - before
+
+    def delete(self, report_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM incidents WHERE report_id = ?", (report_id,))
+        return True
+
+
+def create_backend(name=STORAGE_BACKEND, url=None, key=None):
+    """
+    Creates the configured storage backend, or returns None if it can't be
+    initialised (e.g. missing Supabase credentials).
+    """
+    if name == 'sqlite':
+        try:
+            return SQLiteBackend()
+        except Exception as e:
+            print(f"Failed to initialize SQLite backend: {e}")
+            return None
+
+    if not url or not key:
+        # Don't raise error immediately to allow importing safely, but operations will fail
+        print("Warning: Supabase URL and SERVICE_ROLE_KEY not found. Set STORAGE_BACKEND=sqlite to run offline.")
+        return None
+    try:
+        from supabase import create_client
+        return SupabaseBackend(create_client(url, key), url=url, key=key)
+    except Exception as e:
+        print(f"Failed to initialize Supabase client: {e}")
+        return None
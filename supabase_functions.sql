@@ -0,0 +1,53 @@
+-- Columns, indexes and database functions used by database.py.
+-- Run in the Supabase SQL editor after creating the incidents table, and
+-- again before deploying an upgrade: report inserts fail until the columns
+-- below exist. Safe to re-run.
+
+-- SHA-256 of each report's evidence; proofs are stored under this hash.
+alter table incidents add column if not exists proof_sha256 text;
+
+-- Classifier/sentiment version that produced each row's category and sentiment.
+alter table incidents add column if not exists model_version text;
+
+-- Time of the last write (insert or admin update). last_updated stays the
+-- report time; the near-duplicate index and online learning read changes by updated_at.
+alter table incidents add column if not exists updated_at text;
+update incidents set updated_at = last_updated where updated_at is null;
+create index if not exists idx_incidents_resolved on incidents (status, updated_at, report_id);
+
+-- Who set the category when it wasn't the model: 'admin' (corrected on the
+-- Admin page) or 'import' (kept from an imported file). Re-scoring keeps these.
+alter table incidents add column if not exists category_source text;
+
+-- Dashboard aggregates: one row per (dimension, value) with its count.
+-- Called by database.get_incident_stats() via supabase.rpc('incident_stats').
+create or replace function incident_stats()
+returns table (dimension text, value text, count bigint)
+language sql stable
+as $$
+    select 'category', category::text, count(*) from incidents group by category
+    union all
+    select 'urgency', urgency::text, count(*) from incidents group by urgency
+    union all
+    select 'status', status::text, count(*) from incidents group by status
+    union all
+    select 'day', left(last_updated::text, 10), count(*) from incidents group by left(last_updated::text, 10)
+$$;
+
+-- Bulk write-back for the re-scoring job (rescore_incidents.py): rows is a
+-- JSON array of {report_id, category, sentiment, model_version}.
+-- Returns the number of incidents updated.
+create or replace function bulk_update_incidents(rows jsonb)
+returns integer
+language sql
+as $$
+    with updated as (
+        update incidents i
+        set category = r.category, sentiment = r.sentiment, model_version = r.model_version
+        from jsonb_to_recordset(rows) as r(report_id text, category text, sentiment double precision,
+                                           model_version text)
+        where i.report_id = r.report_id
+        returning 1
+    )
+    select count(*)::integer from updated
+$$;
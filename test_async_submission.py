@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Async Submission Test
+Checks that saving a report and uploading its evidence overlap, and that the
+Discord alert is delivered from the outbox off the request path, using the
+SQLite backend and a local stand-in webhook
+"""
+
+import io
+import os
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+STEP_DELAY = 0.3
+
+
+class SlowWebhook(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(STEP_DELAY)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+server = HTTPServer(('127.0.0.1', 0), SlowWebhook)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+import media
+import outbox
+import storage
+import database
+from async_database import submit_report
+from outbox import get_delivery_status
+
+# Built here rather than from the environment, which only the first import
+# of each module in a process reads
+data_dir = tempfile.mkdtemp()
+database.use_backend(storage.SQLiteBackend(os.path.join(data_dir, 'campussafe.db'), os.path.join(data_dir, 'proofs')))
+outbox.use_outbox(outbox.Outbox(os.path.join(data_dir, 'outbox.db'),
+                                webhook_url=f"http://127.0.0.1:{server.server_port}/webhook"))
+outbox.NOTIFY_DIGEST_SECONDS = 0.5
+media.MEDIA_WORKERS = 0  # the evidence here is placeholder bytes, not a real image
+
+# Make each storage call as slow as a network round trip
+for name in ('insert', 'upload_proof'):
+    original = getattr(database.backend, name)
+    setattr(database.backend, name,
+            lambda *args, _original=original: (time.sleep(STEP_DELAY), _original(*args))[1])
+
+print("=" * 80)
+print("Async Submission Test")
+print("=" * 80)
+
+
+
+def make_proof(content):
+    proof = io.BytesIO(content)
+    proof.name = "evidence.png"
+    proof.type = "image/png"
+    return proof
+
+
+proof = make_proof(b"\x89PNG evidence bytes")
+
+data = {
+    'report_id': "async01",
+    'description': "My bag was taken from the canteen table",
+    'location': "Canteen",
+    'urgency': "Medium",
+    'category': "Theft",
+    'sentiment': -0.2,
+    'timestamp': "2026-03-01 12:00:00",
+    'status': "Pending",
+    'proof_type': proof.type,
+}
+
+# The first submission also starts the event loop, worker threads and HTTP client
+submit_report(dict(data, report_id="warmup01"), make_proof(b"\x89PNG warm-up bytes"))
+
+# Different bytes, so the upload isn't skipped as already stored
+result = submit_report(data, proof)
+timings = result['timings']
+sequential = timings['insert'] + timings['upload']
+
+print(f"\nSteps: insert + queue alert {timings['insert']:.2f}s, upload {timings['upload']:.2f}s, "
+      f"webhook {STEP_DELAY:.2f}s")
+print(f"Sequential: {sequential:.2f}s, submission: {timings['total']:.2f}s")
+
+ok = (result['saved'] and result['proof_uploaded'] and not result['proof_reused'] and result['notified']
+      and database.get_incident("async01")['proof'] == result['proof_url']
+      and timings['upload'] >= STEP_DELAY and timings['total'] < sequential * 0.8)
+print(f"\n{'✅' if ok else '❌'} Report saved and evidence uploaded concurrently, alert queued")
+
+deadline = time.time() + 5
+while time.time() < deadline and (get_delivery_status("async01") or {}).get('status') != 'delivered':
+    time.sleep(0.05)
+delivery = get_delivery_status("async01")
+print(f"{'✅' if delivery['status'] == 'delivered' else '❌'} Alert delivered by the outbox worker: {delivery}")
+
+print("=" * 80)
+server.shutdown()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Analysis Test
+Checks that analyze_incidents returns the same results as analyze_incident
+"""
+
+import time
+from nlp_model import analyze_incident, analyze_incidents, clear_analysis_cache, TRAINING_DATA
+
+print("=" * 80)
+print("Batch Analysis Test")
+print("=" * 80)
+
+texts = [example for examples in TRAINING_DATA.values() for example in examples]
+texts += [
+    "test1 test2",
+    "Short",
+    "My laptop was stolen from the library while I went to the restroom",
+    "@#$%^&*()!!",
+]
+
+start = time.perf_counter()
+single_results = [analyze_incident(text, check_duplicates=False) for text in texts]
+single_time = time.perf_counter() - start
+
+# Start the batch from an empty result cache so it does the model work itself
+clear_analysis_cache()
+
+start = time.perf_counter()
+batch_results = analyze_incidents(texts)
+batch_time = time.perf_counter() - start
+
+mismatches = 0
+for text, single, batch in zip(texts, single_results, batch_results):
+    if single != batch:
+        mismatches += 1
+        print(f"\n❌ MISMATCH: \"{text[:60]}\"")
+        print(f"   analyze_incident:  {single}")
+        print(f"   analyze_incidents: {batch}")
+
+print(f"\nTexts analyzed: {len(texts)}")
+print(f"Matching results: {len(texts) - mismatches}/{len(texts)}")
+print(f"One at a time: {single_time:.3f}s")
+print(f"Batched:       {batch_time:.3f}s")
+
+if mismatches == 0:
+    print("\n✅ Batch results match single-text analysis")
+else:
+    print(f"\n❌ {mismatches} results differ")
+
+print("=" * 80)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Near-Duplicate Detection Test
+Checks that spam variants of a stored report are caught by the MinHash/LSH index
+"""
+
+import time
+from dedup import add_incident, find_near_duplicate, rebuild_index, DUPLICATE_REJECT_THRESHOLD
+
+print("=" * 80)
+print("Near-Duplicate Detection Test")
+print("=" * 80)
+
+stored = [
+    {"report_id": "r1", "description": "my laptop got stolen lol 1"},
+    {"report_id": "r2", "description": "Seniors forced me to clean their room in hostel block A"},
+    {"report_id": "r3", "description": "The stairs in Block C are broken and there's no warning sign"},
+]
+rebuild_index(stored)
+
+duplicates = [
+    ("my laptop got stolen lol 2", "r1"),
+    ("My laptop got stolen, lol 3!!", "r1"),
+    ("Seniors forced me to clean their room in hostel block B", "r2"),
+]
+
+distinct = [
+    "My phone was stolen from the library desk during the lecture",
+    "A classmate keeps making inappropriate comments about my appearance",
+]
+
+caught = 0
+print("\n🔁 Variants (should be matched):")
+for text, expected in duplicates:
+    match = find_near_duplicate(text)
+    if match and match[0] == expected:
+        caught += 1
+        action = "REJECT" if match[1] >= DUPLICATE_REJECT_THRESHOLD else "FLAG"
+        print(f"✅ \"{text}\" → {match[0]} (similarity {match[1]:.2f}, {action})")
+    else:
+        print(f"❌ \"{text}\" → {match}")
+
+passed = 0
+print("\n🆕 Distinct reports (should not be matched):")
+for text in distinct:
+    match = find_near_duplicate(text)
+    if match is None:
+        passed += 1
+        print(f"✅ \"{text[:60]}\"")
+    else:
+        print(f"❌ \"{text[:60]}\" → {match}")
+
+# Query latency with a larger index
+for i in range(5000):
+    add_incident(f"bulk{i}", f"incident {i} reported near building {i % 40} involving student group {i % 17}")
+
+start = time.perf_counter()
+for _ in range(1000):
+    find_near_duplicate("my laptop got stolen lol 4")
+elapsed_ms = (time.perf_counter() - start)
+
+print(f"\nVariants matched: {caught}/{len(duplicates)}")
+print(f"Distinct reports kept: {passed}/{len(distinct)}")
+print(f"Average query time: {elapsed_ms:.3f} ms (5000+ indexed reports)")
+print("=" * 80)
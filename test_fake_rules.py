@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Fake Rule Pack Reload Test
+Checks that detect_fake_report reports the matching rule id, and that a
+rule pack file is picked up again when it is swapped on disk
+"""
+
+import os
+import json
+import time
+import tempfile
+
+import nlp_model
+from nlp_model import detect_fake_report, reload_fake_rules
+
+print("=" * 80)
+print("Fake Rule Pack Reload Test")
+print("=" * 80)
+
+genuine = "My bicycle was stolen from the library parking area yesterday evening"
+spam = "Win a free voucher now, click the link in the hostel group chat"
+
+ok = detect_fake_report("this is a test report", return_rule=True)[2] == 'test_pattern'
+ok = ok and detect_fake_report(genuine, return_rule=True) == (False, "", None)
+print(f"\n{'✅' if ok else '❌'} return_rule gives the matching rule id, None for a genuine report")
+
+rules_path = os.path.join(tempfile.mkdtemp(), 'fake_rules.json')
+
+
+def write_pack(phrases, mtime):
+    with open(rules_path, 'w', encoding='utf-8') as f:
+        json.dump({'spam_phrases': phrases, 'messages': {'placeholder': "Spam wave detected."}}, f)
+    os.utime(rules_path, (mtime, mtime))
+
+
+check_seconds = nlp_model.FAKE_RULES_CHECK_SECONDS
+nlp_model.FAKE_RULES_CHECK_SECONDS = 0
+write_pack(["free voucher"], time.time() - 60)
+ok = reload_fake_rules(rules_path)
+result = detect_fake_report(spam, return_rule=True)
+ok = ok and result == (True, "Spam wave detected.", 'placeholder')
+print(f"{'✅' if ok else '❌'} Rule pack file loaded: {result}")
+
+# Swap the file; the next call notices the new modification time
+write_pack(["bicycle was stolen"], time.time())
+result = detect_fake_report(genuine, return_rule=True)
+ok = result[2] == 'placeholder' and not detect_fake_report(spam)[0]
+print(f"{'✅' if ok else '❌'} Swapped rule pack picked up without a reload call: {result}")
+
+# A broken file keeps the rules that were last loaded
+with open(rules_path, 'w', encoding='utf-8') as f:
+    f.write("{not json")
+os.utime(rules_path, (time.time() + 60, time.time() + 60))
+ok = detect_fake_report(genuine, return_rule=True)[2] == 'placeholder'
+print(f"{'✅' if ok else '❌'} Broken rule pack file ignored, previous rules kept")
+
+ok = reload_fake_rules() and not detect_fake_report(genuine)[0] and not nlp_model._fake_rules_file['path']
+print(f"{'✅' if ok else '❌'} Default rules restored")
+nlp_model.FAKE_RULES_CHECK_SECONDS = check_seconds
+print("=" * 80)
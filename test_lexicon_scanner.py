@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Lexicon Scanner Test
+Checks whole-word and stem matching of the emotion and urgency keywords,
+how negation applies to each, and the sparse batch output of scan_lexicon
+"""
+
+from nlp_model import get_urgency_suggestion, analyze_emotions, scan_lexicon, _lexicon_scanner
+
+print("=" * 80)
+print("Lexicon Scanner Test")
+print("=" * 80)
+
+passed = 0
+total = 0
+
+URGENCY_CASES = [
+    # Whole words: no match inside other words
+    ("I know the canteen food is cold", "Medium"),
+    ("The hostel staff were helpful about my lost book", "Medium"),
+    # Inflections of the urgency terms
+    ("He attacks juniors every night", "High"),
+    ("They threaten to beat me", "High"),
+    ("Someone assaults students near the gate", "High"),
+    ("Two emergencies were reported in the hostel", "High"),
+    ("Nobody is helping the new students", "High"),
+    # Negation only right before the term
+    ("There is no one to help me here", "High"),
+    ("I cannot get help, he has locked the door", "High"),
+    ("There is no danger, just a broken bench", "Medium"),
+]
+
+print()
+for text, expected in URGENCY_CASES:
+    total += 1
+    urgency = get_urgency_suggestion(text, "Other", 0.0)
+    ok = urgency == expected
+    passed += ok
+    print(f"{'✅' if ok else '❌'} {urgency:<6} (expected {expected:<6}) {text}")
+
+EMOTION_CASES = [
+    ("I am not scared of them", "Neutral"),
+    ("I am scared to go back to my room", "Fear"),
+    ("He made me clean the bathroom", "Neutral"),
+]
+
+print()
+for text, expected in EMOTION_CASES:
+    total += 1
+    emotion, _ = analyze_emotions(text)
+    ok = emotion == expected
+    passed += ok
+    print(f"{'✅' if ok else '❌'} {emotion:<8} (expected {expected:<8}) {text}")
+
+# Batch form: one row per text, one column per term
+texts = ["He attacked me and I am scared", "I am not scared", "Nothing happened today"]
+counts, negated = scan_lexicon(texts)
+terms = _lexicon_scanner['terms']
+rows = [sorted(terms[i] for i in counts[row].indices) for row in range(len(texts))]
+negated_rows = [sorted(terms[i] for i in negated[row].indices) for row in range(len(texts))]
+
+total += 1
+ok = counts.shape == (3, len(terms)) and counts.nnz == 2 and hasattr(counts, 'indices')
+passed += ok
+print(f"\n{'✅' if ok else '❌'} scan_lexicon returns sparse {counts.shape[0]}x{counts.shape[1]} "
+      f"matrices ({counts.nnz} stored counts)")
+
+total += 1
+ok = rows == [['attack*', 'scared'], [], []] and negated_rows == [[], ['scared'], []]
+passed += ok
+print(f"{'✅' if ok else '❌'} Matches {rows}, negated {negated_rows}")
+
+print("\n" + "=" * 80)
+print(f"Passed {passed}/{total}")
+print("=" * 80)
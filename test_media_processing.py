@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Evidence Media Processing Test
+Checks that a large phone photo is shrunk in the worker pool: metadata is
+stripped, the preview and thumbnail are downscaled, the preview is what
+the Discord alert carries, the original is stored untouched, and the
+submission doesn't wait for the processing
+"""
+
+import io
+import os
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+received = []
+
+
+class Webhook(BaseHTTPRequestHandler):
+    def do_POST(self):
+        received.append(self.rfile.read(int(self.headers['Content-Length'])))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def make_photo():
+    """
+    A 4000x3000 JPEG with a GPS EXIF tag, like a phone camera produces.
+    """
+    from PIL import Image
+    image = Image.radial_gradient('L').resize((4000, 3000)).convert('RGB')
+    exif = Image.Exif()
+    exif[0x8825] = {1: 'N', 2: (18.0, 31.0, 12.0)}  # GPSInfo
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=95, exif=exif)
+    out.seek(0)
+    out.name = "IMG_2041.jpeg"
+    out.type = "image/jpeg"
+    return out
+
+
+def main():
+    server = HTTPServer(('127.0.0.1', 0), Webhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    import media
+    import outbox
+    import storage
+    import database
+    from PIL import Image
+    from async_database import submit_report
+    from outbox import get_delivery_status
+
+    # Built here rather than from the environment, which only the first
+    # import of each module in a process reads
+    data_dir = tempfile.mkdtemp()
+    database.use_backend(storage.SQLiteBackend(os.path.join(data_dir, 'campussafe.db'),
+                                               os.path.join(data_dir, 'proofs')))
+    outbox.use_outbox(outbox.Outbox(os.path.join(data_dir, 'outbox.db'),
+                                    webhook_url=f"http://127.0.0.1:{server.server_port}/webhook"))
+    media.MEDIA_WORKERS = 2
+
+    print("=" * 80)
+    print("Evidence Media Processing Test")
+    print("=" * 80)
+
+    photo = make_photo()
+    original = photo.getvalue()
+    report = {
+        'report_id': "media01",
+        'description': "Broken glass on the stairs near the canteen",
+        'location': "Canteen",
+        'urgency': "High",
+        'category': "Infrastructure",
+        'sentiment': -0.2,
+        'timestamp': "2024-03-01 10:00:00",
+        'status': "Pending",
+        'proof_type': photo.type,
+    }
+    started = time.perf_counter()
+    result = submit_report(report, photo)
+
+    sha256 = result['evidence']['sha256']
+    proofs = os.path.join(data_dir, 'proofs')
+    deadline = time.time() + 10
+    while time.time() < deadline and not os.path.exists(os.path.join(proofs, media.thumbnail_name(sha256))):
+        time.sleep(0.01)
+    processed_after = time.perf_counter() - started
+
+    # Blocking on the pool would put the whole processing time inside the submission
+    ok = result['timings']['total'] < processed_after / 2
+    print(f"\n{'✅' if ok else '❌'} Submission returned in {result['timings']['total']:.2f}s, "
+          f"image processed after {processed_after:.2f}s")
+
+    sizes = media.media_stats()
+    ok = sizes['files'] == 1 and sizes['bytes_saved'] > 0
+    print(f"{'✅' if ok else '❌'} Photo shrunk: {sizes['original_bytes'] / 1024:.0f}KB -> "
+          f"{sizes['preview_bytes'] / 1024:.0f}KB preview, {sizes['thumbnail_bytes'] / 1024:.0f}KB thumbnail "
+          f"({sizes['bytes_saved'] / 1024:.0f}KB saved)")
+
+    with open(os.path.join(proofs, f"{sha256}.jpeg"), 'rb') as f:
+        ok = f.read() == original
+    print(f"{'✅' if ok else '❌'} Original stored untouched")
+
+    with Image.open(os.path.join(proofs, media.preview_name(sha256))) as preview, \
+            Image.open(os.path.join(proofs, media.thumbnail_name(sha256))) as thumbnail:
+        ok = (max(preview.size) == media.MEDIA_PREVIEW_SIZE and max(thumbnail.size) == media.MEDIA_THUMBNAIL_SIZE
+              and not preview.getexif() and not thumbnail.getexif())
+        print(f"{'✅' if ok else '❌'} Preview {preview.size[0]}x{preview.size[1]} and thumbnail "
+              f"{thumbnail.size[0]}x{thumbnail.size[1]} stored without EXIF/GPS metadata")
+
+    deadline = time.time() + 10
+    while time.time() < deadline and get_delivery_status("media01")['status'] != 'delivered':
+        time.sleep(0.05)
+    body = received[-1] if received else b""
+    ok = b"IMG_2041.jpg" in body and len(body) < len(original)
+    print(f"{'✅' if ok else '❌'} Discord alert carried the preview ({len(body) / 1024:.0f}KB request)")
+
+    # A photo spooled to disk is streamed to the worker's file in chunks,
+    # never read whole into this process, and the file is removed afterwards
+    from evidence import Evidence
+    photo.seek(0)
+    chunk_size = 64 * 1024
+    evidence = Evidence.from_upload(photo, chunk_size=chunk_size, spool_bytes=chunk_size)
+    job = media.submit_processing(evidence, chunk_size=chunk_size)
+    processed = job.result(media.MEDIA_TIMEOUT) if job else None
+    time.sleep(0.1)
+    leftovers = [name for name in os.listdir(tempfile.gettempdir()) if name.startswith('campussafe-media-')]
+    ok = (processed is not None and processed['original_bytes'] == len(original)
+          and evidence.peak_memory <= chunk_size and not leftovers)
+    print(f"{'✅' if ok else '❌'} Worker read the photo from a temp file "
+          f"(peak {evidence.peak_memory / 1024:.0f}KB in memory, temp file removed)")
+    evidence.close()
+
+    print("=" * 80)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    # The media pool spawns processes, which import this file again
+    main()
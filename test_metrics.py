@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Stage Metrics Test
+Checks the rolling latency histograms: percentiles from known timings,
+error counting through the timed decorator, the one-hour window, the
+bucket export file, and that a real submission times each stage
+"""
+
+import os
+import json
+import random
+import tempfile
+
+import metrics
+from metrics import StageMetrics, timed
+
+print("=" * 80)
+print("Stage Metrics Test")
+print("=" * 80)
+
+# Known distribution: 1,000 timings spread evenly over 1-100ms
+data_dir = tempfile.mkdtemp()
+export_path = os.path.join(data_dir, 'metrics.jsonl')
+stage_metrics = StageMetrics(window=3600, bucket_seconds=60, export_path=export_path)
+latencies = [0.001 + 0.099 * i / 999 for i in range(1000)]
+random.Random(0).shuffle(latencies)
+now = 1_700_000_000.0
+for i, seconds in enumerate(latencies):
+    stage_metrics.record('upload_proof', seconds, ok=i % 20 != 0, now=now + i * 0.01)
+
+row = stage_metrics.summary(now=now + 10)[0]
+checks = [(q, row[f'p{q}_ms'], 1 + 99 * q / 100) for q in (50, 95, 99)]
+ok = all(abs(measured - expected) / expected < 0.15 for _, measured, expected in checks)
+print(f"\n{'✅' if ok else '❌'} Percentiles within 15%: " +
+      ", ".join(f"p{q} {measured:.1f}ms (exact {expected:.1f}ms)" for q, measured, expected in checks))
+
+ok = row['calls'] == 1000 and row['errors'] == 50 and abs(row['error_rate'] - 0.05) < 1e-9
+print(f"{'✅' if ok else '❌'} {row['calls']} calls, {row['errors']} errors ({row['error_rate']:.0%})")
+
+# An hour later the old bucket is out of the window; the new one is exported on rotation
+stage_metrics.record('upload_proof', 0.002, now=now + 3700)
+row = stage_metrics.summary(now=now + 3700)[0]
+ok = row['calls'] == 1
+print(f"{'✅' if ok else '❌'} Timings older than the window dropped ({row['calls']} call left)")
+
+with open(export_path) as f:
+    exported = [json.loads(line) for line in f]
+ok = len(exported) == 1 and exported[0]['stage'] == 'upload_proof' and exported[0]['calls'] > 0
+print(f"{'✅' if ok else '❌'} Finished bucket exported ({len(exported)} line, {exported[0]['calls']} calls)")
+
+
+@timed('flaky_stage', failed=metrics.failed_if_none)
+def flaky(value):
+    if value == 'boom':
+        raise ValueError(value)
+    return value
+
+
+flaky('ok')
+flaky(None)
+try:
+    flaky('boom')
+except ValueError:
+    pass
+row = {row['stage']: row for row in metrics.stage_summary()}['flaky_stage']
+ok = row['calls'] == 3 and row['errors'] == 2
+print(f"{'✅' if ok else '❌'} timed() counts None results and exceptions as errors ({row['errors']}/{row['calls']})")
+
+# A real submission (no Discord alert) times the analysis, upload and insert
+import io
+import storage
+import database
+import nlp_model
+from async_database import submit_report
+
+database.use_backend(storage.SQLiteBackend(os.path.join(data_dir, 'campussafe.db'), os.path.join(data_dir, 'proofs')))
+
+analysis = nlp_model.analyze_incident("Someone stole my laptop from the library reading room")
+proof = io.BytesIO(b"evidence bytes")
+proof.name, proof.type = "note.txt", "text/plain"
+submit_report({'report_id': "met001", 'description': "Someone stole my laptop from the library reading room",
+               'location': "Library", 'urgency': "Medium", 'category': analysis['category'],
+               'sentiment': analysis['sentiment_score'], 'timestamp': "2024-03-01 10:00:00",
+               'status': "Pending", 'proof_type': proof.type}, proof, notify=False)
+stages = {row['stage'] for row in metrics.stage_summary()}
+expected = {'analyze_incident', 'upload_proof', 'insert_incident', 'submit_report'}
+ok = expected <= stages
+print(f"{'✅' if ok else '❌'} Submission stages recorded: {', '.join(sorted(stages & expected))}")
+
+print("=" * 80)
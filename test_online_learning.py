@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Online Learning Test
+Checks that the hashed online classifier learns new phrasing with partial_fit
+and that its checkpoint and JSONL streaming work
+"""
+
+import os
+import json
+import tempfile
+
+import nlp_model
+from nlp_model import classify_incident, partial_fit_incidents, stream_training_jsonl, load_online_classifier
+
+# Switched here rather than through CLASSIFIER_MODE, which only the first
+# import of nlp_model in a process reads; restored at the end
+cache_dir = tempfile.mkdtemp()
+previous_mode, previous_cache_dir = nlp_model.CLASSIFIER_MODE, nlp_model.MODEL_CACHE_DIR
+nlp_model.use_classifier('online', cache_dir)
+
+print("=" * 80)
+print("Online Learning Test")
+print("=" * 80)
+
+passed = 0
+total = 0
+
+# Seeded from TRAINING_DATA, it should classify the usual cases
+seed_cases = [
+    ("Seniors forced me to do push-ups in the hostel", "Ragging"),
+    ("My laptop was stolen from the library", "Theft"),
+]
+print("\n🌱 Seed model:")
+for text, expected in seed_cases:
+    total += 1
+    category = classify_incident(text)
+    ok = category == expected
+    passed += ok
+    print(f"{'✅' if ok else '❌'} \"{text}\" → {category} (expected {expected})")
+
+# New campus slang the seed data has never seen
+new_phrase = "someone nicked my scooty from the parking shed"
+before = classify_incident(new_phrase)
+fingerprint_before = nlp_model.MODEL_FINGERPRINT
+
+corrections = [
+    "someone nicked my scooty from the parking shed",
+    "my scooty got nicked near the parking shed",
+    "they nicked the scooty keys and the scooty",
+] * 3
+learned = partial_fit_incidents(corrections, ["Theft"] * len(corrections))
+
+print("\n📚 partial_fit with admin corrections:")
+total += 1
+after = classify_incident(new_phrase)
+ok = learned == len(corrections) and after == "Theft"
+passed += ok
+print(f"{'✅' if ok else '❌'} \"{new_phrase}\": {before} → {after} (learned {learned})")
+
+total += 1
+ok = nlp_model.MODEL_FINGERPRINT != fingerprint_before
+passed += ok
+print(f"{'✅' if ok else '❌'} Fingerprint changed: {fingerprint_before} → {nlp_model.MODEL_FINGERPRINT}")
+
+total += 1
+ok = partial_fit_incidents(["some text"], ["Not A Category"]) == 0
+passed += ok
+print(f"{'✅' if ok else '❌'} Unknown labels are skipped")
+
+# JSONL streaming saves a checkpoint that a new process would load
+jsonl_path = os.path.join(cache_dir, "history.jsonl")
+with open(jsonl_path, "w", encoding="utf-8") as f:
+    for _ in range(5):
+        f.write(json.dumps({"text": "the wifi router in the hostel sparks and smells burnt",
+                            "label": "Safety Concern"}) + "\n")
+
+print("\n💾 JSONL streaming and checkpoint:")
+total += 1
+streamed = stream_training_jsonl(jsonl_path, chunk_size=2)
+restored, state = load_online_classifier()
+ok = streamed == 5 and restored.predict(["my scooty got nicked"])[0] == "Theft"
+passed += ok
+print(f"{'✅' if ok else '❌'} Streamed {streamed} rows; restored checkpoint has {state['samples_seen']} samples")
+
+nlp_model.use_classifier(previous_mode, previous_cache_dir)
+
+print("\n" + "=" * 80)
+print(f"Results: {passed}/{total} passed")
+print("=" * 80)
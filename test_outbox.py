@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Alert Outbox Test
+Checks that queued Discord alerts survive rate limits and server errors,
+using a local stand-in webhook that fails before accepting
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Responses the stand-in webhook gives, in order; then it accepts everything
+SCRIPT = [
+    (429, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.2"}, {"retry_after": 0.2}),
+    (502, {}, None),
+]
+received = []
+
+
+class FlakyWebhook(BaseHTTPRequestHandler):
+    def do_POST(self):
+        received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+        status, headers, body = SCRIPT.pop(0) if SCRIPT else (204, {}, None)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+server = HTTPServer(('127.0.0.1', 0), FlakyWebhook)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+webhook_url = f"http://127.0.0.1:{server.server_port}/webhook"
+
+import outbox
+from outbox import enqueue_alert, release_alert, get_delivery_status, get_notifier_stats
+
+# Built here rather than from the environment, which only the first import
+# of outbox in a process reads
+outbox.use_outbox(outbox.Outbox(os.path.join(tempfile.mkdtemp(), 'outbox.db'), webhook_url=webhook_url))
+outbox.OUTBOX_BASE_BACKOFF = 0.1
+outbox.NOTIFY_DIGEST_SECONDS = 1
+
+print("=" * 80)
+print("Alert Outbox Test")
+print("=" * 80)
+
+report = {
+    'description': "Fight outside hostel block B, people are injured",
+    'category': "Violence",
+    'urgency': "High",
+    'location': "Hostel Block B",
+    'sentiment': -0.6,
+}
+
+start = time.perf_counter()
+queued = enqueue_alert("outbox01", report)
+enqueue_time = time.perf_counter() - start
+print(f"\n{'✅' if queued else '❌'} Alert queued in {enqueue_time * 1000:.1f}ms")
+
+deadline = time.time() + 10
+while time.time() < deadline and get_delivery_status("outbox01")['status'] not in ('delivered', 'failed'):
+    time.sleep(0.05)
+
+delivery = get_delivery_status("outbox01")
+ok = delivery['status'] == 'delivered' and len(received) == 3
+print(f"{'✅' if ok else '❌'} Delivered after a 429 and a 502: {len(received)} requests, "
+      f"{delivery['attempts']} counted attempts")
+
+ok = delivery['attempts'] == 2
+print(f"{'✅' if ok else '❌'} Rate-limited request not counted as a failed attempt")
+
+
+# A burst of alerts is packed into a few messages; Low/Medium ones wait for the digest
+before = len(received)
+reports = [(f"burst{i:02d}", dict(report, urgency="High")) for i in range(25)]
+reports += [(f"digest{i:02d}", dict(report, urgency="Low")) for i in range(5)]
+start = time.time()
+for report_id, data in reports:
+    enqueue_alert(report_id, data)
+
+deadline = time.time() + 10
+while time.time() < deadline and any(get_delivery_status(report_id)['status'] != 'delivered'
+                                     for report_id, _ in reports):
+    time.sleep(0.05)
+
+requests_made = len(received) - before
+embeds = sum(len(message['embeds']) for message in received[before:])
+ok = embeds == len(reports) and requests_made <= 6
+print(f"{'✅' if ok else '❌'} {len(reports)} alerts delivered in {requests_made} requests "
+      f"(at most 10 embeds each) in {time.time() - start:.2f}s")
+
+stats = get_notifier_stats()
+ok = stats['requests_saved'] >= len(reports) - requests_made
+print(f"{'✅' if ok else '❌'} Requests saved by coalescing: {stats['requests_saved']} "
+      f"({stats['immediate_messages']} immediate, {stats['digest_messages']} digest messages)")
+
+
+# An alert held for its image preview goes out as soon as it is released
+enqueue_alert("held01", report, hold=60)
+time.sleep(0.5)
+held_status = get_delivery_status("held01")['status']
+start = time.time()
+release_alert("held01", report['urgency'])
+deadline = time.time() + 10
+while time.time() < deadline and get_delivery_status("held01")['status'] != 'delivered':
+    time.sleep(0.05)
+ok = held_status == 'pending' and get_delivery_status("held01")['status'] == 'delivered'
+print(f"{'✅' if ok else '❌'} Held alert stayed {held_status}, delivered {time.time() - start:.2f}s after release")
+
+# After a restart, alerts left pending go out without waiting for a new report
+restart_path = os.path.join(tempfile.mkdtemp(), 'outbox.db')
+outbox.Outbox(restart_path).enqueue("restart01", {"embeds": [{"title": "Left over from the last run"}]},
+                                    urgency="Low")
+before = len(received)
+child = subprocess.run(
+    [sys.executable, "-c", "import time, outbox\n"
+                           "print(outbox.resume_worker())\n"
+                           "deadline = time.time() + 10\n"
+                           "while time.time() < deadline and outbox.get_delivery_status('restart01')['status'] != 'delivered':\n"
+                           "    time.sleep(0.05)\n"
+                           "print(outbox.get_delivery_status('restart01')['status'])"],
+    env=dict(os.environ, OUTBOX_PATH=restart_path, DISCORD_WEBHOOK_URL=webhook_url),
+    capture_output=True, text=True, timeout=30
+)
+ok = child.stdout.split() == ["1", "delivered"] and len(received) == before + 1
+print(f"{'✅' if ok else '❌'} Pending alert delivered by a restarted process: {' '.join(child.stdout.split())}")
+
+print("=" * 80)
+server.shutdown()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Re-scoring Job Test
+Stores incidents with stale categories and sentiment in a temporary SQLite
+database, interrupts the re-scoring job part-way and checks that the re-run
+resumes, rewrites only the stale rows, keeps a category corrected by an
+admin, stamps every row with the model version so a re-run analyses
+nothing, and keeps to the request rate limit
+"""
+
+import os
+import time
+import tempfile
+
+import storage
+import database
+import nlp_model
+from rescore_incidents import run_rescore
+
+# Built here rather than from the environment, which only the first import
+# of database in a process reads
+data_dir = tempfile.mkdtemp()
+database.use_backend(storage.SQLiteBackend(os.path.join(data_dir, 'campussafe.db'), os.path.join(data_dir, 'proofs')))
+
+print("=" * 80)
+print("Re-scoring Job Test")
+print("=" * 80)
+
+texts = [text for category, examples in nlp_model.TRAINING_DATA.items() if category != "Fake/Spam"
+         for text in examples][:300]
+analyses = nlp_model.analyze_incidents(texts)
+rows, stale = [], set()
+for i, (text, analysis) in enumerate(zip(texts, analyses)):
+    row = {'report_id': f"rs{i:04d}", 'description': text, 'location': "Library", 'urgency': "Low",
+           'category': analysis['category'], 'sentiment': analysis['sentiment_score'],
+           'timestamp': f"2023-01-01 00:{i // 60:02d}:{i % 60:02d}", 'status': "Resolved"}
+    if i % 3 == 0:
+        # Scored by an older model
+        row['category'], row['sentiment'] = "Other", 0.0
+        if (analysis['category'], analysis['sentiment_score']) != ("Other", 0.0):
+            stale.add(row['report_id'])
+    rows.append(row)
+database.insert_incidents(rows)
+
+# An admin corrects a category the model got wrong
+corrected_id = next(row['report_id'] for row, analysis in zip(rows, analyses)
+                    if row['report_id'] not in stale and analysis['category'] != "Harassment")
+database.update_incident(corrected_id, "Resolved", "Re-labelled by admin", category="Harassment")
+checkpoint_path = os.path.join(data_dir, 'rescore.json')
+
+# Interrupt the first run on its third bulk update
+real_update = database.update_scores
+calls = []
+
+def flaky_update(updates):
+    calls.append(len(updates))
+    return None if len(calls) == 3 else real_update(updates)
+
+database.update_scores = flaky_update
+try:
+    run_rescore(page_size=50, max_rps=0, checkpoint_path=checkpoint_path)
+except SystemExit as e:
+    print(f"  (interrupted: {e})")
+database.update_scores = real_update
+
+result = run_rescore(page_size=50, max_rps=0, checkpoint_path=checkpoint_path)
+version = nlp_model.model_version()
+stored = {row['report_id']: row for row in database.backend.select_all()}
+original = {row['report_id']: row for row in rows}
+rewritten = {report_id for report_id, row in stored.items() if report_id != corrected_id
+             and (row['category'], row['sentiment']) != (original[report_id]['category'], original[report_id]['sentiment'])}
+ok = rewritten == stale and result['scanned'] == len(rows) and result['changed'] == len(stale)
+print(f"\n{'✅' if ok else '❌'} Resumed job rewrote exactly the {len(stale)} stale rows of {len(rows)}")
+
+stamped = sum(row['model_version'] == version for row in stored.values())
+ok = stamped == len(rows)
+print(f"{'✅' if ok else '❌'} Model version stamped on all {stamped} scanned rows")
+
+ok = stored[corrected_id]['category'] == "Harassment"
+print(f"{'✅' if ok else '❌'} Admin-corrected category kept ({stored[corrected_id]['category']})")
+
+ok = all(stored[report_id]['category'] != "Other" or original[report_id]['category'] == "Other"
+         for report_id in stale) and all(stored[r]['last_updated'] == original[r]['timestamp'] for r in stored)
+print(f"{'✅' if ok else '❌'} Categories and sentiment restored, report times untouched")
+
+# A re-run at the same model version has nothing to do, within 10 requests/sec
+real_analyze = nlp_model.analyze_incidents
+analyzed = []
+
+def counting_analyze(texts):
+    analyzed.extend(texts)
+    return real_analyze(texts)
+
+nlp_model.analyze_incidents = counting_analyze
+start = time.perf_counter()
+result = run_rescore(page_size=50, max_rps=10, checkpoint_path=checkpoint_path, restart=True)
+elapsed = time.perf_counter() - start
+nlp_model.analyze_incidents = real_analyze
+reads = -(-len(rows) // 50)
+ok = result['changed'] == 0 and not analyzed and elapsed >= (reads - 1) / 10
+print(f"{'✅' if ok else '❌'} Re-run analysed {len(analyzed)} rows and rewrote nothing; "
+      f"{reads} page reads at 10/sec took {elapsed:.2f}s")
+
+print("=" * 80)
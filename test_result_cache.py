@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Result Cache Test
+Checks that repeated analyses are served from the LRU cache and that
+results persist on disk across cache instances
+"""
+
+import os
+import time
+import tempfile
+from result_cache import ResultCache
+from nlp_model import analyze_incident, analysis_cache_stats, clear_analysis_cache
+
+print("=" * 80)
+print("Analysis Result Cache Test")
+print("=" * 80)
+
+passed = 0
+total = 0
+
+clear_analysis_cache()
+# The counters are process-wide; earlier analyses in this process count too
+before = analysis_cache_stats()
+text = "Seniors forced me to clean their room and threatened me in the hostel"
+
+start = time.perf_counter()
+first = analyze_incident(text, check_duplicates=False)
+miss_time = time.perf_counter() - start
+
+start = time.perf_counter()
+# Same report with different spacing and case (a Streamlit rerun after fixing another field)
+second = analyze_incident("  SENIORS forced me to clean   their room and threatened me in the hostel ", check_duplicates=False)
+hit_time = time.perf_counter() - start
+
+stats = analysis_cache_stats()
+total += 1
+ok = first == second and stats['hits'] - before['hits'] == 1 and stats['misses'] - before['misses'] == 1
+passed += ok
+print(f"\n{'✅' if ok else '❌'} Rerun served from cache: {miss_time * 1000:.2f}ms → {hit_time * 1000:.2f}ms ({stats})")
+
+total += 1
+second['category'] = "Changed by caller"
+ok = analyze_incident(text, check_duplicates=False)['category'] == first['category']
+passed += ok
+print(f"{'✅' if ok else '❌'} Cached results are copies")
+
+# LRU eviction
+cache = ResultCache(max_entries=2, path=None)
+cache.put("a", {"v": 1})
+cache.put("b", {"v": 2})
+cache.get("a")
+cache.put("c", {"v": 3})
+total += 1
+ok = cache.get("b") is None and cache.get("a") == {"v": 1} and cache.stats()['evictions'] == 1
+passed += ok
+print(f"{'✅' if ok else '❌'} Least recently used entry evicted")
+
+# Disk persistence across restarts
+path = os.path.join(tempfile.mkdtemp(), "analysis_cache.sqlite")
+ResultCache(max_entries=10, path=path).put("key", first)
+restarted = ResultCache(max_entries=10, path=path)
+total += 1
+ok = restarted.get("key") == first and restarted.stats()['disk_hits'] == 1
+passed += ok
+print(f"{'✅' if ok else '❌'} Result restored from disk after restart")
+
+print("\n" + "=" * 80)
+print(f"Results: {passed}/{total} passed")
+print("=" * 80)
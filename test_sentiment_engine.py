@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Sentiment Engine Test
+Compares the built-in lexicon engine with TextBlob on the training corpus
+"""
+
+import time
+from nlp_model import TRAINING_DATA, preprocess_text, sentiment_scores, get_sentiment_label
+
+# Maximum allowed difference in polarity from TextBlob
+TOLERANCE = 0.01
+
+try:
+    from textblob import TextBlob
+except ImportError:
+    TextBlob = None
+
+print("=" * 80)
+print("Sentiment Engine Test - Lexicon Engine vs TextBlob")
+print("=" * 80)
+
+texts = [example for examples in TRAINING_DATA.values() for example in examples]
+texts += [
+    "I'm so scared and terrified of what might happen next",
+    "This is not good at all, I feel very bad!",
+    "The staff were really helpful and kind",
+    "The stairs are not very safe, someone could get seriously hurt!!",
+    "Someone keeps following me around campus and making me uncomfortable",
+]
+
+start = time.perf_counter()
+lexicon_scores = sentiment_scores(texts)
+lexicon_time = time.perf_counter() - start
+
+if TextBlob is None:
+    print("\nTextBlob not installed, skipping comparison.")
+else:
+    start = time.perf_counter()
+    textblob_scores = [round(TextBlob(preprocess_text(text)).sentiment.polarity, 3) for text in texts]
+    textblob_time = time.perf_counter() - start
+
+    max_diff = 0.0
+    label_matches = 0
+    for text, ours, theirs in zip(texts, lexicon_scores, textblob_scores):
+        diff = abs(ours - theirs)
+        max_diff = max(max_diff, diff)
+        if get_sentiment_label(ours) == get_sentiment_label(theirs):
+            label_matches += 1
+        if diff > TOLERANCE:
+            print(f"\n❌ \"{text[:60]}\"")
+            print(f"   Lexicon: {ours:.3f}  TextBlob: {theirs:.3f}")
+
+    print(f"\nTexts scored: {len(texts)}")
+    print(f"Max polarity difference: {max_diff:.3f} (tolerance {TOLERANCE})")
+    print(f"Matching labels: {label_matches}/{len(texts)}")
+    print(f"Lexicon engine: {lexicon_time:.3f}s")
+    print(f"TextBlob:       {textblob_time:.3f}s")
+
+    if max_diff <= TOLERANCE:
+        print("\n✅ Lexicon engine is score-compatible with TextBlob")
+    else:
+        print("\n❌ Lexicon engine differs from TextBlob beyond tolerance")
+
+print("=" * 80)
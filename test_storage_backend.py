@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Storage Backend Test
+Runs the database.py API against the embedded SQLite backend
+"""
+
+import io
+import os
+import tempfile
+
+import storage
+import database
+
+# Built here rather than from the environment, which only the first import
+# of database in a process reads
+data_dir = tempfile.mkdtemp()
+db_path = os.path.join(data_dir, 'campussafe.db')
+proof_dir = os.path.join(data_dir, 'proofs')
+database.use_backend(storage.SQLiteBackend(db_path, proof_dir))
+
+print("=" * 80)
+print("Storage Backend Test (SQLite)")
+print("=" * 80)
+
+passed = 0
+total = 0
+
+
+def check(ok, label):
+    global passed, total
+    total += 1
+    passed += bool(ok)
+    print(f"{'✅' if ok else '❌'} {label}")
+
+
+check(database.init_db(), "init_db connects")
+
+for i in range(30):
+    database.insert_incident({
+        'report_id': f"r{i:03d}",
+        'description': f"Incident number {i} near the library entrance",
+        'location': "Library",
+        'urgency': ["Low", "Medium", "High"][i % 3],
+        'category': ["Theft", "Ragging"][i % 2],
+        'sentiment': -0.1,
+        'timestamp': f"2026-02-{1 + i % 20:02d} 10:00:00",
+        'status': "Pending",
+        'proof_type': None,
+    })
+
+check(database.get_status("r005") == ("Pending", None), "get_status returns (status, remark)")
+
+rows = database.get_all_incidents()
+check(len(rows) == 30 and rows[0]['timestamp'] >= rows[-1]['timestamp'], "get_all_incidents returns newest first")
+
+# Keyset pages cover every row exactly once
+seen = []
+cursor = None
+while True:
+    page, cursor = database.get_incident_page(cursor, page_size=7)
+    seen.extend(row['report_id'] for row in page)
+    if cursor is None:
+        break
+check(sorted(seen) == sorted(r['report_id'] for r in rows) and 'description' not in page[0],
+      f"Keyset pagination: {len(seen)} rows in pages of 7, list columns only")
+
+database.update_incident("r003", "Resolved", "Handled by security", category="Violence")
+record = database.get_incident("r003")
+check(record['status'] == "Resolved" and record['category'] == "Violence", "update_incident writes status and category")
+check(record['last_updated'] == "2026-02-04 10:00:00" and record['updated_at'] > record['last_updated'],
+      f"update_incident keeps the report time and sets updated_at ({record['updated_at']})")
+resolved = database.get_resolved_incidents()
+check([r['report_id'] for r in resolved] == ["r003"], "get_resolved_incidents")
+check(database.get_resolved_incidents(since=(resolved[-1]['updated_at'], "r003")) == [],
+      "get_resolved_incidents skips reports up to the watermark")
+
+stats = database.get_incident_stats(use_cache=False)
+check(sum(stats['category'].values()) == 30 and stats['status'] == {"Pending": 29, "Resolved": 1},
+      f"GROUP BY stats: {stats['category']}")
+
+database.delete_incident("r010")
+check(database.get_incident("r010") is None and len(database.get_all_incidents()) == 29, "delete_incident")
+
+# Cached counts follow writes without waiting for INCIDENT_CACHE_TTL
+database.invalidate_incident_cache()
+before = database.get_incident_stats()
+database.insert_incident({'report_id': "r100", 'description': "Bike stolen from the stand", 'location': "Gate",
+                          'urgency': "Low", 'category': "Theft", 'sentiment': -0.2,
+                          'timestamp': "2026-03-01 09:00:00", 'status': "Pending", 'proof_type': None})
+after = database.get_incident_stats()
+check(sum(after['status'].values()) == sum(before['status'].values()) + 1 and after['day'].get("2026-03-01") == 1,
+      f"Stats include a new report right away ({sum(after['status'].values())} reports)")
+database.update_incident("r100", "Under Review", None)
+after = database.get_incident_stats()
+check(after['status'].get("Under Review") == 1, "Stats include a status change right away")
+
+# The near-duplicate index is seeded with the reports in its window only,
+# then picks up reports written by another process
+import dedup
+from datetime import datetime, timedelta
+other = storage.SQLiteBackend(db_path, proof_dir)
+database.INCIDENT_CACHE_TTL = 0
+hour_ago = (datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+other.insert_many([
+    {'report_id': "dup01", 'description': "Someone keeps stealing cycles from the hostel stand at night",
+     'location': "Hostel", 'urgency': "Low", 'category': "Theft", 'sentiment': -0.3,
+     'last_updated': hour_ago, 'updated_at': hour_ago, 'status': "Pending"},
+    {'report_id': "old01", 'description': "Laptop stolen from the computer lab during the 2020 exams",
+     'location': "Lab", 'urgency': "Low", 'category': "Theft", 'sentiment': -0.3,
+     'last_updated': "2020-05-01 12:00:00", 'updated_at': "2020-05-01 12:00:00", 'status': "Resolved"},
+])
+recent = database.get_recent_incidents((datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S"))
+check([row['report_id'] for row in recent] == ["dup01"] and set(recent[0]) == set(database.DEDUP_COLUMNS),
+      f"Recent incidents query selects the window and {len(recent[0])} columns only")
+database.sync_duplicate_index()
+check(dedup.find_near_duplicate("Someone keeps stealing cycles from the hostel stand at night") is not None
+      and dedup.find_near_duplicate("Laptop stolen from the computer lab during the 2020 exams") is None,
+      "Duplicate index seeded with the reports in its window")
+other.insert_many([{'report_id': "dup02", 'description': "Water cooler on the second floor gives electric shocks",
+                    'location': "Block C", 'urgency': "High", 'category': "Safety Concern", 'sentiment': -0.5,
+                    'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'status': "Pending"}])
+database.sync_duplicate_index()
+match = dedup.find_near_duplicate("Water cooler on the second floor gives electric shocks")
+check(match is not None and match[0] == "dup02", "Duplicate index picks up a report from another process")
+
+proof = io.BytesIO(b"\x89PNG fake image bytes")
+proof.type = "image/png"
+url = database.upload_proof(proof, "r001.png")
+check(url and url.startswith("file://") and open(url[len("file://"):], "rb").read() == proof.getvalue(),
+      f"Local proof store: {url}")
+
+print("\n" + "=" * 80)
+print(f"Results: {passed}/{total} passed")
+print("=" * 80)